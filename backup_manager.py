@@ -1,6 +1,10 @@
-import shutil
 import os
+import gzip
+import json
+import sqlite3
+import hashlib
 import datetime
+import threading
 import logging
 from apscheduler.schedulers.background import BackgroundScheduler
 
@@ -8,46 +12,250 @@ logger = logging.getLogger(__name__)
 
 # Config
 BACKUP_DIR = "backups"
-FILES_TO_BACKUP = ["brain.db", "behavior_logs.json", "user_routines.json"]
+FILES_TO_BACKUP = ["brain.db", "user_routines.json", "routine_patterns.json", "learned_intents.json"]
+
+# ==========================================
+# SNAPSHOT STORE (content-addressed, chunked)
+# ==========================================
+# backups/objects/ab/abcdef....gz   gzip'd chunk, named by sha256 of the RAW chunk
+# backups/manifests/20240112_010000.json   {file: {sha256, size, chunks: [...]}}
+# backups/manifests/*.json.failed   incomplete / unverified snapshots (never listed/restored)
+# Files are split into fixed-size chunks, so a snapshot only writes the chunks that
+# changed since the last one (brain.db mostly grows at the end). SQLite files are
+# copied with the online backup API (consistent, never a torn mid-write copy).
+
+OBJECTS_DIR = os.path.join(BACKUP_DIR, "objects")
+MANIFESTS_DIR = os.path.join(BACKUP_DIR, "manifests")
+CHUNK_SIZE = int(os.getenv("BACKUP_CHUNK_KB", "1024")) * 1024
+BACKUP_INTERVAL_HOURS = float(os.getenv("BACKUP_INTERVAL_HOURS", "1"))
+
+# Retention: newest snapshot per hour / day / ISO week
+KEEP_HOURLY = int(os.getenv("BACKUP_KEEP_HOURLY", "24"))
+KEEP_DAILY = int(os.getenv("BACKUP_KEEP_DAILY", "7"))
+KEEP_WEEKLY = int(os.getenv("BACKUP_KEEP_WEEKLY", "4"))
+
+# Online backup: copy this many pages, then sleep so bot writes aren't starved
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_SLEEP = 0.05
+
+_backup_lock = threading.Lock()
+
+for _d in (BACKUP_DIR, OBJECTS_DIR, MANIFESTS_DIR):
+    os.makedirs(_d, exist_ok=True)
+
+
+def _object_path(digest):
+    return os.path.join(OBJECTS_DIR, digest[:2], f"{digest}.gz")
+
+def _write_object(digest, data):
+    """Stores one chunk unless an identical one already exists. Returns bytes written."""
+    path = _object_path(digest)
+    if os.path.exists(path):
+        return 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    blob = gzip.compress(data, compresslevel=6)
+    tmp_path = path + ".part"
+    with open(tmp_path, "wb") as f:
+        f.write(blob)
+    os.replace(tmp_path, path)
+    return len(blob)
+
+def read_object(digest):
+    """Raw chunk bytes; raises ValueError if the stored object doesn't match its hash."""
+    with open(_object_path(digest), "rb") as f:
+        data = gzip.decompress(f.read())
+    if hashlib.sha256(data).hexdigest() != digest:
+        raise ValueError(f"checksum mismatch in object {digest[:12]}")
+    return data
+
+def _store_file(path):
+    """Chunks + stores a file. Returns (entry, bytes_written)."""
+    whole = hashlib.sha256()
+    chunks, written, size = [], 0, 0
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(CHUNK_SIZE)
+            if not data:
+                break
+            digest = hashlib.sha256(data).hexdigest()
+            written += _write_object(digest, data)
+            whole.update(data)
+            chunks.append(digest)
+            size += len(data)
+    return {"sha256": whole.hexdigest(), "size": size, "chunks": chunks}, written
+
+def _sqlite_snapshot(src_path, dst_path):
+    """Consistent copy of a live SQLite DB via the online backup API (yields between steps)."""
+    src = sqlite3.connect(src_path, check_same_thread=False)
+    dst = sqlite3.connect(dst_path)
+    try:
+        with dst:
+            src.backup(dst, pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_STEP_SLEEP)
+    finally:
+        dst.close()
+        src.close()
+
+
+# --- Manifests ---
+def list_snapshots():
+    """Snapshot ids (manifest names), oldest first."""
+    return sorted(name[:-5] for name in os.listdir(MANIFESTS_DIR) if name.endswith(".json"))
+
+def load_manifest(snapshot_id):
+    with open(os.path.join(MANIFESTS_DIR, f"{snapshot_id}.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _save_manifest(snapshot_id, manifest):
+    path = os.path.join(MANIFESTS_DIR, f"{snapshot_id}.json")
+    tmp_path = path + ".part"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)  # A manifest only appears once all its chunks exist
+
+def _quarantine(snapshot_id):
+    """Renames a manifest to <id>.json.failed: kept for inspection, invisible to list/restore/retention."""
+    path = os.path.join(MANIFESTS_DIR, f"{snapshot_id}.json")
+    os.replace(path, path + ".failed")
+
+def materialize(entry, dest_path):
+    """Rebuilds one backed-up file at dest_path. Raises ValueError on any checksum mismatch."""
+    whole = hashlib.sha256()
+    with open(dest_path, "wb") as f:
+        for digest in entry["chunks"]:
+            data = read_object(digest)
+            whole.update(data)
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    if whole.hexdigest() != entry["sha256"]:
+        raise ValueError("file checksum mismatch")
+
+def verify_snapshot(snapshot_id):
+    """Re-reads every chunk and checks chunk + whole-file sha256. Returns a list of problems."""
+    problems = []
+    for name, entry in load_manifest(snapshot_id)["files"].items():
+        whole = hashlib.sha256()
+        try:
+            for digest in entry["chunks"]:
+                whole.update(read_object(digest))
+        except (OSError, ValueError) as e:
+            problems.append(f"{name}: {e}")
+            continue
+        if whole.hexdigest() != entry["sha256"]:
+            problems.append(f"{name}: file checksum mismatch")
+    return problems
 
-if not os.path.exists(BACKUP_DIR):
-    os.makedirs(BACKUP_DIR)
 
 def create_backup():
     """
-    Copies critical data files to backup/ directory with timestamp.
+    Takes one snapshot of FILES_TO_BACKUP, verifies it, then applies retention.
+    Returns the snapshot id (or None if nothing was backed up, a file failed, or it failed verification).
     """
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M")
-    
-    for filename in FILES_TO_BACKUP:
-        if os.path.exists(filename):
+    if not _backup_lock.acquire(blocking=False):
+        logger.warning("💾 Backup already running, skipped.")
+        return None
+    try:
+        started = datetime.datetime.now()
+        snapshot_id = started.strftime("%Y%m%d_%H%M%S")
+        files, written, failed = {}, 0, []
+
+        for filename in FILES_TO_BACKUP:
+            if not os.path.exists(filename):
+                continue
             try:
-                # Backup Name: backups/brain_20240112_0125.db
-                name, ext = os.path.splitext(filename)
-                target = os.path.join(BACKUP_DIR, f"{name}_{timestamp}{ext}")
-                shutil.copy2(filename, target)
-                
-                # Also keep a "latest" copy for easy restore
-                latest_target = os.path.join(BACKUP_DIR, f"{name}_latest{ext}")
-                shutil.copy2(filename, latest_target)
-                
+                if filename.endswith(".db"):
+                    snap_path = os.path.join(BACKUP_DIR, f".{filename}.snap")
+                    if os.path.exists(snap_path):
+                        os.remove(snap_path)
+                    _sqlite_snapshot(filename, snap_path)
+                    try:
+                        files[filename], n = _store_file(snap_path)
+                    finally:
+                        os.remove(snap_path)
+                else:
+                    files[filename], n = _store_file(filename)
+                written += n
             except Exception as e:
                 logger.error(f"Backup Failed for {filename}: {e}")
-    
-    logger.info(f"💾 Backup Complete at {timestamp}")
+                failed.append(f"{filename}: {e}")
+
+        if not files:
+            return None
+        _save_manifest(snapshot_id, {"created_at": started.isoformat(), "files": files})
+
+        # A partial set (e.g. no brain.db) must never become "latest" or a retention keeper
+        problems = failed + verify_snapshot(snapshot_id)
+        if problems:
+            # Quarantine BEFORE retention: a bad snapshot must never count as the hour's/day's keeper
+            _quarantine(snapshot_id)
+            logger.error(f"💾 Backup {snapshot_id} incomplete or unverified (quarantined): {problems}")
+            return None
+
+        secs = (datetime.datetime.now() - started).total_seconds()
+        logger.info(f"💾 Backup {snapshot_id}: {len(files)} files, {written / 1024:.0f} KB new data, {secs:.1f}s")
+        apply_retention()
+        return snapshot_id
+    finally:
+        _backup_lock.release()
+
+
+# --- Retention ---
+def _snapshot_time(snapshot_id):
+    return datetime.datetime.strptime(snapshot_id, "%Y%m%d_%H%M%S")
+
+def select_retained(snapshot_ids, keep_hourly=KEEP_HOURLY, keep_daily=KEEP_DAILY, keep_weekly=KEEP_WEEKLY):
+    """Newest snapshot in each of the last N hours / days / ISO weeks (that have one)."""
+    keep = set()
+    tiers = [
+        (keep_hourly, lambda t: t.strftime("%Y%m%d%H")),
+        (keep_daily, lambda t: t.strftime("%Y%m%d")),
+        (keep_weekly, lambda t: "%d-%02d" % t.isocalendar()[:2]),
+    ]
+    for limit, bucket_of in tiers:
+        seen = set()
+        for sid in sorted(snapshot_ids, reverse=True):
+            bucket = bucket_of(_snapshot_time(sid))
+            if bucket in seen:
+                continue
+            if len(seen) >= limit:
+                break
+            seen.add(bucket)
+            keep.add(sid)
+    return keep
+
+def apply_retention():
+    """Drops expired manifests, then deletes objects no remaining manifest references."""
+    snapshots = list_snapshots()
+    keep = select_retained(snapshots)
+    for sid in snapshots:
+        if sid not in keep:
+            os.remove(os.path.join(MANIFESTS_DIR, f"{sid}.json"))
+
+    live = set()
+    for sid in keep:
+        for entry in load_manifest(sid)["files"].values():
+            live.update(entry["chunks"])
+
+    removed = 0
+    for root, _, names in os.walk(OBJECTS_DIR):
+        for name in names:
+            if name.split(".")[0] not in live:
+                os.remove(os.path.join(root, name))
+                removed += 1
+    if removed or len(keep) < len(snapshots):
+        logger.info(f"🗑️ Backup Retention: {len(snapshots) - len(keep)} snapshots, {removed} objects removed")
+
 
 def start_backup_scheduler():
     """
-    Runs backup every 6 hours and on startup.
+    Runs a backup every BACKUP_INTERVAL_HOURS (first one right away, on the scheduler thread).
     """
     scheduler = BackgroundScheduler()
-    scheduler.add_job(create_backup, 'interval', hours=6)
+    scheduler.add_job(create_backup, 'interval', hours=BACKUP_INTERVAL_HOURS,
+                      next_run_time=datetime.datetime.now(), max_instances=1, coalesce=True)
     scheduler.start()
-    
-    # Run one immediately
-    create_backup()
     return scheduler
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
-    start_backup_scheduler()
+    create_backup()
@@ -102,7 +102,7 @@ async def learn_schedule_from_text(user_text, user_id, ai_generator):
         # [PHASE 37] Dynamic Timetable Update
         if "True" in is_repeating:
              from timetable_manager import timetable_manager
-             timetable_manager.add_event(day, start, end, label)
+             timetable_manager.add_event(user_id, day, start, end, label)
              logger.info(f"🧠 Learned Routine: {label} on {day}s")
 
         # 1. Set DND (Implicit) if it's for TODAY
@@ -138,34 +138,20 @@ async def learn_schedule_from_text(user_text, user_id, ai_generator):
 # Mock AI generator if not passed, but mainly we expect IT to be passed.
 # In a real app we'd import it, but to avoid circular imports we'll dependency inject.
 
-async def analyze_logs_for_routines(ai_generator, log_file="behavior_logs.json", history_days=7):
+async def analyze_logs_for_routines(ai_generator, history_days=7):
     """
     The Analyst: Reads raw logs and asks AI to find patterns.
-    Result: Updates 'user_routines.json'.
+    Result: Updates 'routine_patterns.json'.
     This should run Nightly (or on demand).
     """
     try:
-        # 1. Read Raw Logs
-        logs = []
-        try:
-            with open(log_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    if line.strip():
-                        logs.append(json.loads(line))
-        except FileNotFoundError:
+        # 1. Read Recent Logs (indexed time range, newest 50 to fit context window)
+        from behavior_log import behavior_log
+        recent_logs = behavior_log.range(datetime.now() - timedelta(days=history_days), limit=50)
+        if not recent_logs:
             logger.info("No behavior logs found yet.")
             return []
 
-        if not logs:
-            return []
-
-        # 2. Filter Recent Logs
-        cutoff = datetime.now() - timedelta(days=history_days)
-        # Assuming logs have ISO format timestamps
-        # recent_logs = [l for l in logs if datetime.fromisoformat(l['timestamp']) > cutoff]
-        # For simplicity, just take last 50 logs to fit context window
-        recent_logs = logs[-50:]
-
         log_summary = []
         for l in recent_logs:
             # Minify for Prompt
@@ -184,8 +170,7 @@ async def analyze_logs_for_routines(ai_generator, log_file="behavior_logs.json",
         media_str = "No Media Data"
         if users:
             uid = users[0]
-            profile = memory_db.get_profile(uid)
-            media = profile.get("profile", {}).get("context", {}).get("media_history", [])
+            media = memory_db.recent_media(uid, 20)
             if media:
                 # Summarize last 20 media items
                 m_lines = [f"- [{m.get('timestamp','?')}] {m['title']} ({m.get('mood','?')})" for m in media[:20]]
@@ -220,9 +205,8 @@ async def analyze_logs_for_routines(ai_generator, log_file="behavior_logs.json",
 
         routines = json.loads(clean_json)
         
-        # Save to DB
-        with open("user_routines.json", "w", encoding="utf-8") as f:
-            json.dump(routines, f, indent=2)
+        # Save (own file: this list used to overwrite the per-user routines in user_routines.json)
+        routine_db.save_patterns(routines)
             
         logger.info(f"🕵️ Analyst found {len(routines)} routines.")
         return routines
@@ -238,10 +222,10 @@ async def run_daily_reflection(user_id, ai_generator):
     Run this at 3 AM.
     """
     try:
-        from memory_core import memory_db, get_recent_context
-        # 1. Fetch Day's History
-        # For prototype, we just grab last 50 messages. In prod, fetch by date.
-        history_str = get_recent_context(user_id, limit=50) 
+        from memory_core import memory_db
+        # 1. Fetch Day's History (rolling summary + raw turns not yet folded into it)
+        await memory_db.update_rolling_summary(user_id, ai_generator)
+        history_str = memory_db.get_tiered_context(user_id)
         if not history_str or len(history_str) < 50:
             return # No sufficient data to dream about
             
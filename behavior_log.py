@@ -0,0 +1,35 @@
+import logging
+from datetime import datetime
+
+from database_adapter import db
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# BEHAVIOUR LOG (append-only, brain.db)
+# ==========================================
+# Replaces behavior_logs.json. Rows live in the behavior_logs table with the mood
+# pulled out into its own column, so every read is an index range scan:
+#   tail(n)          -> newest n entries            (user_id, id) index
+#   range(t0, t1)    -> entries in a time window    (timestamp) index
+#   latest_mood(uid) -> one row, no JSON parsing
+
+def _iso(t):
+    return t.isoformat() if isinstance(t, datetime) else t
+
+class BehaviorLog:
+    def append(self, entry):
+        """entry: the Observer's log dict ({'timestamp', 'user_id', 'raw_text', 'analysis': {...}})."""
+        db.append_behavior_logs([entry])
+
+    def tail(self, n=50, user_id=None):
+        return db.get_behavior_tail(n, user_id)
+
+    def range(self, t0, t1=None, limit=None):
+        """Entries with t0 <= timestamp < t1 (datetimes or ISO strings), oldest first."""
+        return db.get_behavior_range(_iso(t0), _iso(t1 or datetime.now()), limit)
+
+    def latest_mood(self, user_id, default="Neutral"):
+        return db.get_latest_mood(user_id) or default
+
+behavior_log = BehaviorLog()
@@ -1,5 +1,8 @@
 import sqlite3
+import os
 import json
+import gzip
+import base64
 import logging
 import datetime
 from typing import Dict, Any, List, Optional
@@ -26,6 +29,8 @@ class DatabaseAdapter:
         try:
             with self._get_conn() as conn:
                 cursor = conn.cursor()
+                # New DBs free deleted pages with incremental_vacuum (no-op on an existing DB)
+                cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
                 
                 # 1. Users Table (Profile)
                 cursor.execute('''
@@ -55,9 +60,14 @@ class DatabaseAdapter:
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
                         user_id TEXT,
                         timestamp TEXT,
-                        log_json TEXT
+                        log_json TEXT,
+                        mood TEXT
                     )
                 ''')
+                # Pre-mood DBs: add the column latest_mood() reads without parsing log_json
+                cursor.execute("PRAGMA table_info(behavior_logs)")
+                if "mood" not in [col[1] for col in cursor.fetchall()]:
+                    cursor.execute("ALTER TABLE behavior_logs ADD COLUMN mood TEXT")
                 
                 # 4. Events Table (Timeline) - [BUG FIX: Missing Table]
                 cursor.execute('''
@@ -73,8 +83,99 @@ class DatabaseAdapter:
                     )
                 ''')
                 
+                # 5. Media History (YouTube likes, shared links)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS media_history (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id TEXT,
+                        source TEXT,
+                        item_id TEXT,
+                        url TEXT,
+                        title TEXT,
+                        channel TEXT,
+                        mood TEXT,
+                        liked_at TEXT,
+                        logged_at TEXT,
+                        UNIQUE(user_id, source, item_id)
+                    )
+                ''')
+                
+                # 6. Sync Cursors (incremental external syncs)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS sync_cursors (
+                        user_id TEXT,
+                        source TEXT,
+                        last_item_id TEXT,
+                        etag TEXT,
+                        synced_at TEXT,
+                        PRIMARY KEY (user_id, source)
+                    )
+                ''')
+                
+                # 7. Rolling Conversation Summaries (tiered memory)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS conversation_summaries (
+                        user_id TEXT PRIMARY KEY,
+                        summary TEXT,
+                        upto_id INTEGER,  -- last history.id folded into the summary
+                        updated_at TEXT
+                    )
+                ''')
+                
+                # 8. History Archive (cold tier): gzip'd JSON-lines blocks per user per month
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS history_archive (
+                        user_id TEXT,
+                        month TEXT,       -- 'YYYY-MM'
+                        first_id INTEGER,
+                        last_id INTEGER,
+                        row_count INTEGER,
+                        block BLOB,
+                        created_at TEXT,
+                        PRIMARY KEY (user_id, month, first_id)
+                    )
+                ''')
+                
+                # 9. Current Mood per user (MoodState write-through; seeded from the behaviour log)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS mood_state (
+                        user_id TEXT PRIMARY KEY,
+                        mood TEXT,
+                        source TEXT,      -- 'analyzer' / 'emoji' / 'youtube'
+                        updated_at TEXT
+                    )
+                ''')
+                
+                # 10. Timetable: one weekly interval per event (minutes from Monday 00:00;
+                #     end_min > 10080 = Sunday-night event running into Monday)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS timetable (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id TEXT,     -- '*' = shared (legacy timetable.json)
+                        start_min INTEGER,
+                        end_min INTEGER,
+                        label TEXT
+                    )
+                ''')
+                
+                # Hot-path index: every get_history is WHERE user_id=? ORDER BY id DESC
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_history_user_id ON history(user_id, id)")
+                # Embedding backlog: partial index holds only unembedded rows (get_unembedded never scans)
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_history_unembedded ON history(id) WHERE embedding IS NULL")
+                
+                # Timeline indexes (recent_media / media_by_mood never scan the table)
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_media_user_ts ON media_history(user_id, liked_at)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_media_user_mood_ts ON media_history(user_id, mood, liked_at)")
+                
+                # Behaviour log: time ranges + per-user tail/latest mood
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_behavior_ts ON behavior_logs(timestamp)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_behavior_user_id ON behavior_logs(user_id, id)")
+                
                 conn.commit()
             logger.info("🧠 Brain DB (SQLite) Initialized.")
+            self._migrate_profile_media()
+            self._migrate_behavior_file()
+            self._seed_mood_state()
         except Exception as e:
             logger.error(f"DB Init Failed: {e}")
 
@@ -276,7 +377,6 @@ class DatabaseAdapter:
             logger.error(f"DB History Read Error: {e}")
             return []
 
-# Singleton Global Instance
     # --- HISTORY METHODS ---
     def add_history(self, user_id, role, content):
         try:
@@ -306,5 +406,519 @@ class DatabaseAdapter:
             logger.error(f"DB History Read Error: {e}")
             return []
 
+    # --- RETENTION / COMPACTION ---
+    def compact_history(self, hot_days=30, max_rows=20000, vacuum_pages=2000):
+        """
+        Moves history rows older than `hot_days` into history_archive as gzip blocks
+        (one block per user per month per run), then frees pages with incremental VACUUM.
+        Rows not yet folded into the user's rolling summary (or not yet embedded) stay hot;
+        embeddings travel with their rows so semantic recall still finds archived turns.
+        Returns number of rows archived. Blocking: call from a thread.
+        """
+        cutoff = (datetime.datetime.now() - datetime.timedelta(days=hot_days)).isoformat()
+        archived = 0
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT h.id, h.user_id, h.role, h.content, h.timestamp, h.embedding FROM history h
+                    LEFT JOIN conversation_summaries s ON s.user_id = h.user_id
+                    WHERE h.timestamp < ? AND h.id <= COALESCE(s.upto_id, 0) AND h.embedding IS NOT NULL
+                    ORDER BY h.user_id, h.id LIMIT ?
+                ''', (cutoff, max_rows))
+                rows = cursor.fetchall()
+
+                blocks = {}
+                for hid, user_id, role, content, ts, emb in rows:
+                    item = {"id": hid, "role": role, "content": content, "timestamp": ts}
+                    if emb:
+                        item["embedding"] = base64.b64encode(emb).decode("ascii")
+                    blocks.setdefault((user_id, (ts or "")[:7]), []).append(item)
+
+                now = datetime.datetime.now().isoformat()
+                for (user_id, month), items in blocks.items():
+                    payload = "\n".join(json.dumps(it, ensure_ascii=False) for it in items).encode("utf-8")
+                    cursor.execute('''
+                        INSERT OR REPLACE INTO history_archive
+                            (user_id, month, first_id, last_id, row_count, block, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ''', (user_id, month, items[0]["id"], items[-1]["id"], len(items),
+                          gzip.compress(payload, compresslevel=9), now))
+                    cursor.executemany("DELETE FROM history WHERE id=?", [(it["id"],) for it in items])
+                    archived += len(items)
+                conn.commit()
+
+                # Free the deleted pages a batch at a time. DBs created before auto_vacuum was
+                # enabled would need a full VACUUM (locks + rewrites the live DB): skip it, the
+                # freed pages are simply reused by new rows so the file stops growing.
+                if archived and cursor.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                    # executescript steps the pragma to completion (execute() frees a single page)
+                    conn.executescript(f"PRAGMA incremental_vacuum({int(vacuum_pages)});")
+
+            if archived:
+                logger.info(f"🗄️ Archived {archived} history rows older than {hot_days} days ({len(blocks)} blocks).")
+            return archived
+        except Exception as e:
+            logger.error(f"DB Compaction Error: {e}")
+            return archived
+
+    def get_archived_history(self, user_id, month) -> List[Dict]:
+        """Cold-tier read: all archived turns for a user in 'YYYY-MM' (chronological)."""
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT block FROM history_archive WHERE user_id=? AND month=? ORDER BY first_id
+                ''', (user_id, month))
+                items = []
+                for (block,) in cursor.fetchall():
+                    items += [json.loads(line) for line in gzip.decompress(block).decode("utf-8").split("\n") if line]
+                return items
+        except Exception as e:
+            logger.error(f"DB Archive Read Error: {e}")
+            return []
+
+    def get_archived_embeddings(self, user_id) -> List[tuple]:
+        """(id, role, content, embedding_blob) for a user's archived turns that were embedded."""
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT block FROM history_archive WHERE user_id=? ORDER BY first_id", (user_id,))
+                rows = []
+                for (block,) in cursor.fetchall():
+                    for line in gzip.decompress(block).decode("utf-8").split("\n"):
+                        item = json.loads(line) if line else {}
+                        if item.get("embedding"):
+                            rows.append((item["id"], item["role"], item["content"], base64.b64decode(item["embedding"])))
+                return rows
+        except Exception as e:
+            logger.error(f"DB Archive Read Error: {e}")
+            return []
+
+    # --- EMBEDDING METHODS (history.embedding holds float16 BLOBs) ---
+    def get_unembedded(self, limit=100) -> List[tuple]:
+        """(id, user_id, content) rows never embedded, oldest first."""
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT id, user_id, content FROM history
+                    WHERE embedding IS NULL ORDER BY id ASC LIMIT ?
+                ''', (limit,))
+                return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"DB Embedding Read Error: {e}")
+            return []
+
+    def save_embeddings(self, rows):
+        """rows: [(history_id, blob)]. Empty blob = 'skipped' (too short to be worth recalling)."""
+        try:
+            with self._get_conn() as conn:
+                conn.executemany("UPDATE history SET embedding=? WHERE id=?", [(blob, hid) for hid, blob in rows])
+                conn.commit()
+        except Exception as e:
+            logger.error(f"DB Embedding Write Error: {e}")
+
+    def get_embedded_history(self, user_id, after_id=0) -> List[tuple]:
+        """(id, role, content, embedding_blob) for a user's embedded rows with id > after_id."""
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT id, role, content, embedding FROM history
+                    WHERE user_id=? AND id > ? AND length(embedding) > 0
+                    ORDER BY id ASC
+                ''', (user_id, after_id))
+                return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"DB Embedding Read Error: {e}")
+            return []
+
+    # --- ROLLING SUMMARY METHODS ---
+    def get_summary(self, user_id) -> Dict:
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT summary, upto_id, updated_at FROM conversation_summaries WHERE user_id=?", (user_id,))
+                row = cursor.fetchone()
+                if row:
+                    return {"summary": row[0] or "", "upto_id": row[1] or 0, "updated_at": row[2]}
+        except Exception as e:
+            logger.error(f"DB Summary Read Error: {e}")
+        return {"summary": "", "upto_id": 0, "updated_at": None}
+
+    def save_summary(self, user_id, summary, upto_id):
+        try:
+            with self._get_conn() as conn:
+                conn.execute('''
+                    INSERT INTO conversation_summaries (user_id, summary, upto_id, updated_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(user_id) DO UPDATE SET
+                        summary=excluded.summary, upto_id=excluded.upto_id, updated_at=excluded.updated_at
+                ''', (user_id, summary, upto_id, datetime.datetime.now().isoformat()))
+                conn.commit()
+        except Exception as e:
+            logger.error(f"DB Summary Write Error: {e}")
+
+    def get_unsummarised(self, user_id, after_id, keep_tail, limit) -> List[Dict]:
+        """
+        Oldest-first history rows with id > after_id, EXCLUDING the newest `keep_tail` rows
+        (those stay raw in prompts). At most `limit` rows.
+        """
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT id, role, content FROM history
+                    WHERE user_id=? AND id > ? AND id < COALESCE((
+                        SELECT MIN(id) FROM (
+                            SELECT id FROM history WHERE user_id=? ORDER BY id DESC LIMIT ?
+                        )
+                    ), 9223372036854775807)
+                    ORDER BY id ASC LIMIT ?
+                ''', (user_id, after_id, user_id, keep_tail, limit))
+                return [{"id": r[0], "role": r[1], "content": r[2]} for r in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"DB Unsummarised Read Error: {e}")
+            return []
+
+    def get_recent_after(self, user_id, after_id, limit) -> List[Dict]:
+        """Newest `limit` rows with id > after_id (not yet in the summary), chronological."""
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT role, content FROM history
+                    WHERE user_id=? AND id > ?
+                    ORDER BY id DESC LIMIT ?
+                ''', (user_id, after_id, limit))
+                return [{"role": r[0], "content": r[1]} for r in reversed(cursor.fetchall())]
+        except Exception as e:
+            logger.error(f"DB History Read Error: {e}")
+            return []
+
+    def get_users_needing_summary(self, min_new) -> List[str]:
+        """Users with at least `min_new` history rows beyond their summary cursor."""
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT h.user_id FROM history h
+                    LEFT JOIN conversation_summaries s ON s.user_id = h.user_id
+                    WHERE h.id > COALESCE(s.upto_id, 0)
+                    GROUP BY h.user_id HAVING COUNT(*) >= ?
+                ''', (min_new,))
+                return [r[0] for r in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"DB Summary Users Error: {e}")
+            return []
+
+    # --- MEDIA HISTORY METHODS ---
+    def add_media_items(self, user_id, items, cursor_update=None):
+        """
+        Batch insert media rows in ONE transaction (duplicates ignored).
+        cursor_update: optional (source, last_item_id, etag) committed atomically with the rows,
+        so a crash can never advance the sync cursor past unsaved items.
+        Returns number of new rows.
+        """
+        now = datetime.datetime.now().isoformat()
+        rows = [(
+            user_id,
+            it.get("source", "link"),
+            it.get("item_id") or it.get("url"),
+            it.get("url"),
+            it.get("title"),
+            it.get("channel"),
+            it.get("mood"),
+            it.get("liked_at") or now,
+            now,
+        ) for it in items]
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                before = conn.total_changes
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO media_history
+                        (user_id, source, item_id, url, title, channel, mood, liked_at, logged_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                inserted = conn.total_changes - before
+                if cursor_update:
+                    self._save_sync_cursor(cursor, user_id, *cursor_update)
+                conn.commit()
+                return inserted
+        except Exception as e:
+            logger.error(f"DB Media Write Error: {e}")
+            return 0
+
+    def _media_rows(self, rows):
+        # 'timestamp' kept as the key legacy readers (behavior engine, prompts) already use
+        return [{"title": r[0], "url": r[1], "mood": r[2], "source": r[3], "channel": r[4], "timestamp": r[5]}
+                for r in rows]
+
+    def get_recent_media(self, user_id, limit=5) -> List[Dict]:
+        """Newest first."""
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT title, url, mood, source, channel, liked_at FROM media_history
+                    WHERE user_id=? ORDER BY liked_at DESC LIMIT ?
+                ''', (user_id, limit))
+                return self._media_rows(cursor.fetchall())
+        except Exception as e:
+            logger.error(f"DB Media Read Error: {e}")
+            return []
+
+    def get_media_by_mood(self, user_id, mood, limit=20) -> List[Dict]:
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT title, url, mood, source, channel, liked_at FROM media_history
+                    WHERE user_id=? AND mood=? ORDER BY liked_at DESC LIMIT ?
+                ''', (user_id, mood, limit))
+                return self._media_rows(cursor.fetchall())
+        except Exception as e:
+            logger.error(f"DB Media Read Error: {e}")
+            return []
+
+    def clear_media(self, user_id):
+        """Forgets the media timeline AND its sync cursors, so the next sync re-learns from scratch."""
+        try:
+            with self._get_conn() as conn:
+                conn.execute("DELETE FROM media_history WHERE user_id=?", (user_id,))
+                conn.execute("DELETE FROM sync_cursors WHERE user_id=?", (user_id,))
+                conn.commit()
+        except Exception as e:
+            logger.error(f"DB Media Clear Error: {e}")
+
+    def _migrate_profile_media(self):
+        """
+        One-time move of legacy profile['context']['media_history'] JSON lists into media_history.
+        Idempotent: the list is stripped from the profile blob once its rows are inserted.
+        """
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT user_id, profile_json FROM users WHERE profile_json LIKE '%media_history%'")
+                pending = cursor.fetchall()
+                for user_id, profile_json in pending:
+                    profile = json.loads(profile_json) if profile_json else {}
+                    legacy = profile.pop("media_history", None) or []
+                    legacy += (profile.get("context") or {}).pop("media_history", None) or []
+                    rows = [(
+                        user_id, "legacy", m.get("url") or f"{m.get('title')}|{m.get('timestamp')}",
+                        m.get("url"), m.get("title"), m.get("channel"), m.get("mood"),
+                        m.get("timestamp") or m.get("date") or datetime.datetime.now().isoformat(),
+                        datetime.datetime.now().isoformat(),
+                    ) for m in legacy if isinstance(m, dict)]
+                    cursor.executemany('''
+                        INSERT OR IGNORE INTO media_history
+                            (user_id, source, item_id, url, title, channel, mood, liked_at, logged_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', rows)
+                    cursor.execute("UPDATE users SET profile_json=? WHERE user_id=?", (json.dumps(profile), user_id))
+                conn.commit()
+                if pending:
+                    logger.info(f"🎧 Migrated media history for {len(pending)} profiles into media_history table.")
+        except Exception as e:
+            logger.error(f"DB Media Migration Error: {e}")
+
+    def _migrate_behavior_file(self, filepath="behavior_logs.json"):
+        """
+        One-time import of the legacy behavior_logs.json (JSON lines) into behavior_logs.
+        The file is renamed to *.migrated afterwards so it's never parsed again.
+        """
+        if not os.path.exists(filepath):
+            return
+        try:
+            entries = []
+            with open(filepath, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue  # Torn last line / blank line
+            self.append_behavior_logs([e for e in entries if isinstance(e, dict)])
+            os.replace(filepath, filepath + ".migrated")
+            logger.info(f"🧾 Migrated {len(entries)} behaviour log entries into brain.db.")
+        except Exception as e:
+            logger.error(f"DB Behavior Migration Error: {e}")
+
+    # --- BEHAVIOUR LOG METHODS (append-only) ---
+    def append_behavior_logs(self, entries):
+        """entries: dicts with 'timestamp', optional 'user_id' and 'analysis': {'mood': ...}."""
+        rows = [(
+            str(e.get("user_id", "unknown")),
+            e.get("timestamp") or datetime.datetime.now().isoformat(),
+            json.dumps(e, ensure_ascii=False),
+            (e.get("analysis") or {}).get("mood") or e.get("mood"),
+        ) for e in entries]
+        try:
+            with self._get_conn() as conn:
+                conn.executemany(
+                    "INSERT INTO behavior_logs (user_id, timestamp, log_json, mood) VALUES (?, ?, ?, ?)", rows)
+                conn.commit()
+        except Exception as e:
+            logger.error(f"DB Behavior Write Error: {e}")
+
+    def get_behavior_tail(self, n, user_id=None):
+        """Newest n entries (optionally for one user), oldest first."""
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                if user_id is None:
+                    cursor.execute("SELECT log_json FROM behavior_logs ORDER BY id DESC LIMIT ?", (n,))
+                else:
+                    cursor.execute("SELECT log_json FROM behavior_logs WHERE user_id=? ORDER BY id DESC LIMIT ?",
+                                   (str(user_id), n))
+                return [json.loads(row[0]) for row in reversed(cursor.fetchall())]
+        except Exception as e:
+            logger.error(f"DB Behavior Read Error: {e}")
+            return []
+
+    def get_behavior_range(self, t0, t1, limit=None):
+        """Entries with t0 <= timestamp < t1 (ISO strings), oldest first; `limit` keeps the newest."""
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT log_json FROM behavior_logs WHERE timestamp >= ? AND timestamp < ?
+                    ORDER BY timestamp DESC LIMIT ?
+                ''', (t0, t1, -1 if limit is None else limit))
+                return [json.loads(row[0]) for row in reversed(cursor.fetchall())]
+        except Exception as e:
+            logger.error(f"DB Behavior Read Error: {e}")
+            return []
+
+    def get_latest_mood(self, user_id):
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT mood FROM behavior_logs WHERE user_id=? AND mood IS NOT NULL
+                    ORDER BY id DESC LIMIT 1
+                ''', (str(user_id),))
+                row = cursor.fetchone()
+                return row[0] if row else None
+        except Exception as e:
+            logger.error(f"DB Behavior Read Error: {e}")
+            return None
+
+    # --- MOOD STATE METHODS ---
+    def _seed_mood_state(self):
+        """Users with no mood_state row start from their latest logged mood."""
+        try:
+            with self._get_conn() as conn:
+                conn.execute('''
+                    INSERT OR IGNORE INTO mood_state (user_id, mood, source, updated_at)
+                    SELECT b.user_id, b.mood, 'analyzer', b.timestamp FROM behavior_logs b
+                    JOIN (SELECT user_id, MAX(id) AS id FROM behavior_logs WHERE mood IS NOT NULL GROUP BY user_id) last
+                        ON last.id = b.id
+                ''')
+                conn.commit()
+        except Exception as e:
+            logger.error(f"DB Mood Seed Error: {e}")
+
+    def get_mood_states(self) -> Dict[str, tuple]:
+        """{user_id: (mood, source, updated_at)} for every user (loaded once at startup)."""
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT user_id, mood, source, updated_at FROM mood_state")
+                return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"DB Mood Read Error: {e}")
+            return {}
+
+    def save_mood_state(self, user_id, mood, source, updated_at):
+        try:
+            with self._get_conn() as conn:
+                conn.execute('''
+                    INSERT INTO mood_state (user_id, mood, source, updated_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(user_id) DO UPDATE SET
+                        mood=excluded.mood, source=excluded.source, updated_at=excluded.updated_at
+                ''', (user_id, mood, source, updated_at))
+                conn.commit()
+        except Exception as e:
+            logger.error(f"DB Mood Write Error: {e}")
+
+    # --- TIMETABLE METHODS ---
+    def get_timetable(self) -> List[tuple]:
+        """(id, user_id, start_min, end_min, label) for every interval."""
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id, user_id, start_min, end_min, label FROM timetable")
+                return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"DB Timetable Read Error: {e}")
+            return []
+
+    def add_timetable_interval(self, user_id, start_min, end_min, label):
+        """Inserts one event interval. Returns its id (None on failure)."""
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO timetable (user_id, start_min, end_min, label) VALUES (?, ?, ?, ?)",
+                    (user_id, start_min, end_min, label))
+                conn.commit()
+                return cursor.lastrowid
+        except Exception as e:
+            logger.error(f"DB Timetable Write Error: {e}")
+            return None
+
+    def delete_timetable_intervals(self, ids):
+        try:
+            with self._get_conn() as conn:
+                conn.executemany("DELETE FROM timetable WHERE id=?", [(i,) for i in ids])
+                conn.commit()
+        except Exception as e:
+            logger.error(f"DB Timetable Write Error: {e}")
+
+    # --- SYNC CURSOR METHODS ---
+    def _save_sync_cursor(self, cursor, user_id, source, last_item_id, etag):
+        cursor.execute('''
+            INSERT INTO sync_cursors (user_id, source, last_item_id, etag, synced_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, source) DO UPDATE SET
+                last_item_id=COALESCE(excluded.last_item_id, sync_cursors.last_item_id),
+                etag=COALESCE(excluded.etag, sync_cursors.etag),
+                synced_at=excluded.synced_at
+        ''', (user_id, source, last_item_id, etag, datetime.datetime.now().isoformat()))
+
+    def set_sync_cursor(self, user_id, source, last_item_id, etag):
+        try:
+            with self._get_conn() as conn:
+                self._save_sync_cursor(conn.cursor(), user_id, source, last_item_id, etag)
+                conn.commit()
+        except Exception as e:
+            logger.error(f"DB Cursor Write Error: {e}")
+
+    def get_sync_cursor(self, user_id, source) -> Optional[Dict]:
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT last_item_id, etag, synced_at FROM sync_cursors WHERE user_id=? AND source=?",
+                               (user_id, source))
+                row = cursor.fetchone()
+                return {"last_item_id": row[0], "etag": row[1], "synced_at": row[2]} if row else None
+        except Exception as e:
+            logger.error(f"DB Cursor Read Error: {e}")
+            return None
+
+    def get_synced_users(self, source) -> List[str]:
+        """Users who have synced `source` at least once (candidates for scheduled sync)."""
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT user_id FROM sync_cursors WHERE source=?", (source,))
+                return [r[0] for r in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"DB Cursor Users Error: {e}")
+            return []
+
 # Singleton Global Instance
 db = DatabaseAdapter()
@@ -1,7 +1,9 @@
 import httpx
 import base64
+import json
 import logging
 import asyncio
+from network_utils import get_client
 
 # Configure Logger
 logger = logging.getLogger(__name__)
@@ -112,3 +114,112 @@ async def generate_gemini_vision(prompt, image_bytes, key, model="gemini-2.5-fla
     except Exception as e:
         logger.error(f"Gemini Vision Exception: {e}")
         return None
+
+async def generate_gemini_audio(prompt, audio_bytes, key, model="gemini-2.5-flash", mime_type="audio/ogg"):
+    """
+    Pure REST Audio Understanding (inline base64, no File API upload / temp file).
+    Returns (text, status_code) so callers can fall back to another model on 404/429.
+    """
+    url = f"{BASE_URL}/{model}:generateContent?key={key}"
+    headers = {"Content-Type": "application/json"}
+    
+    payload = {
+        "contents": [{
+            "parts": [
+                {"text": prompt},
+                {
+                    "inlineData": {
+                        "mimeType": mime_type,
+                        "data": base64.b64encode(audio_bytes).decode('utf-8')
+                    }
+                }
+            ]
+        }]
+    }
+    
+    try:
+        resp = await get_client().post(url, json=payload, headers=headers, timeout=30.0)
+        
+        if resp.status_code != 200:
+            logger.error(f"Gemini Audio REST Error ({model}, {resp.status_code}): {resp.text[:200]}")
+            return None, resp.status_code
+
+        data = resp.json()
+        if "candidates" in data and len(data["candidates"]) > 0:
+            content = data["candidates"][0].get("content")
+            if content and "parts" in content:
+                return content["parts"][0]["text"].strip(), 200
+        
+        return None, 200
+        
+    except Exception as e:
+        logger.error(f"Gemini Audio Exception: {e}")
+        return None, None
+
+async def stream_gemini_text(prompt, key, model="gemini-1.5-flash", status=None):
+    """
+    Pure REST Streaming (streamGenerateContent, SSE).
+    Async generator of text deltas. Yields nothing on HTTP/network failure (caller falls back).
+    status (optional dict): status["complete"] is set True only once a finishReason arrives,
+    so a stream cut off mid-reply can be told apart from a finished one.
+    """
+    url = f"{BASE_URL}/{model}:streamGenerateContent?alt=sse&key={key}"
+    payload = {
+        "contents": [{
+            "parts": [{"text": prompt}]
+        }],
+        "generationConfig": {
+            "temperature": 0.7,
+            "maxOutputTokens": 800
+        }
+    }
+    
+    try:
+        async with get_client().stream("POST", url, json=payload, timeout=30.0) as resp:
+            if resp.status_code != 200:
+                body = await resp.aread()
+                logger.error(f"Gemini Stream Error ({model}, {resp.status_code}): {body[:200]}")
+                return
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                try:
+                    candidate = json.loads(line[5:].strip())["candidates"][0]
+                except (ValueError, KeyError, IndexError):
+                    continue
+                text = "".join(p.get("text", "") for p in candidate.get("content", {}).get("parts", []))
+                if text:
+                    yield text
+                if candidate.get("finishReason"):
+                    if status is not None:
+                        status["complete"] = True
+                    return
+    except Exception as e:
+        logger.error(f"Gemini Stream Exception: {e}")
+
+async def embed_texts(texts, key, task_type="RETRIEVAL_DOCUMENT", model="text-embedding-004"):
+    """
+    Pure REST Batch Embeddings (batchEmbedContents, up to 100 texts per call).
+    Returns list of vectors (lists of floats) aligned with texts, or None on failure.
+    """
+    url = f"{BASE_URL}/{model}:batchEmbedContents?key={key}"
+    payload = {
+        "requests": [{
+            "model": f"models/{model}",
+            "content": {"parts": [{"text": t}]},
+            "taskType": task_type
+        } for t in texts]
+    }
+    
+    try:
+        resp = await get_client().post(url, json=payload, timeout=20.0)
+        if resp.status_code != 200:
+            logger.error(f"Gemini Embed Error ({resp.status_code}): {resp.text[:200]}")
+            return None
+        embeddings = resp.json().get("embeddings", [])
+        if len(embeddings) != len(texts):
+            return None
+        return [e.get("values", []) for e in embeddings]
+    except Exception as e:
+        logger.error(f"Gemini Embed Exception: {e}")
+        return None
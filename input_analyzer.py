@@ -52,12 +52,17 @@ async def analyze_input_deep(text: str, user_profile: Dict, ai_generator: Any) -
         logger.error(f"Input Analyzer Failed: {e}")
         return {"error": str(e), "timestamp": datetime.datetime.now().isoformat()}
 
-def log_behavior_to_file(log_entry: Dict, filepath="behavior_logs.json"):
+def log_behavior_to_file(log_entry: Dict, filepath=None):
     """
-    Appends the analysis to a local JSON line file (simulating a DB).
+    Appends the analysis to the behaviour log (brain.db, append-only).
+    `filepath` is ignored; kept for old callers.
     """
     try:
-        with open(filepath, "a", encoding="utf-8") as f:
-            f.write(json.dumps(log_entry) + "\n")
+        from behavior_log import behavior_log
+        from mood_manager import mood_state
+        behavior_log.append(log_entry)
+        mood = (log_entry.get("analysis") or {}).get("mood")
+        if mood and log_entry.get("user_id", "unknown") != "unknown":
+            mood_state.set_mood(log_entry["user_id"], mood, source="analyzer")
     except Exception as e:
         logger.error(f"Failed to write behavior log: {e}")
@@ -1,16 +1,97 @@
+import asyncio
 import logging
 import feedparser
-import yfinance as yf
-import requests
 import random
 import urllib.parse
 from datetime import datetime
+from network_utils import get_client, safe_get, TTLCache
+from quote_service import quote_service, resolve_symbol
 
 logger = logging.getLogger(__name__)
 
+# Per-key caches (stale entries are served instantly while a background refresh runs)
+NEWS_CACHE = TTLCache(ttl=600, stale_ttl=1800)      # location -> headlines
+WEATHER_CACHE = TTLCache(ttl=600, stale_ttl=1800)   # (lat, lon) ~11km cell -> current_weather
+
+NEWS_RSS_URL = "https://news.google.com/rss/search?q={query}&hl=en-IN&gl=IN&ceid=IN:en"
+
 # ==========================================
 # 1. GEN Z NEWS (Google RSS + AI Rewrite)
 # ==========================================
+async def _fetch_feed(raw_query):
+    """Downloads RSS on the shared async client; feedparser runs in the thread pool."""
+    url = NEWS_RSS_URL.format(query=urllib.parse.quote(raw_query))
+    try:
+        resp = await get_client().get(url, follow_redirects=True)
+        resp.raise_for_status()
+    except Exception as e:
+        logger.warning(f"News Fetch Failed ({raw_query}): {e}")
+        return []
+    return await parse_headlines(resp.content)
+
+async def parse_headlines(content):
+    """feedparser is CPU-bound: parse RSS bytes in the thread pool. Returns top 7 '- title' lines."""
+    feed = await asyncio.get_running_loop().run_in_executor(None, feedparser.parse, content)
+    return [f"- {s.title}" for s in feed.entries[:7]]
+
+async def _fetch_headlines(raw_query):
+    headlines = await _fetch_feed(raw_query)
+    # [FALLBACK] If local/specific news is dry, fetch broad 'India' news
+    if not headlines and raw_query.lower() != "india":
+        logger.info(f"News: No entries for '{raw_query}'. Trying fallback 'India'.")
+        headlines = await get_headlines("India")
+    return headlines
+
+def news_query(location):
+    # Fallback to 'India' if no location
+    return location.strip() if location and location.strip() else "India"
+
+async def get_headlines(location):
+    """Top headlines for a location (10 min cache, stale-while-revalidate)."""
+    raw_query = news_query(location)
+    return await NEWS_CACHE.get_or_fetch(raw_query.lower(), lambda: _fetch_headlines(raw_query))
+
+async def rewrite_headlines(headlines, location, ai_generator, tier="speed", style="CASUAL", persona=None):
+    """AI rewrite of fetched headlines (shared by on-demand requests and the digest prefetcher)."""
+    # 2. Top Stories (already trimmed to 7 in the cache)
+    headlines_str = "\n".join(headlines)
+    
+    # 3. AI Rewrite 
+    if ai_generator:
+        # Construct dynamic instruction based on Persona
+        persona_instr = ""
+        if persona:
+            persona_instr = f"CURRENT MOOD: {persona.get('prefix', '')} \nSTYLE GUIDE: {persona.get('instruction', '')}"
+        
+        if style == "SERIOUS":
+             prompt = (
+                f"Summarize these headlines professionally.\n"
+                f"{persona_instr}\n"
+                f"Headlines:\n{headlines_str}\n\n"
+                f"Rules:\n"
+                f"- PRIORITIZE URGENT EVENTS (War, Disasters, Attacks) FIRST.\n"
+                f"- Professional, concise tone.\n"
+                f"- header: '📰 **Briefing for {location}**'\n"
+             )
+        else:
+             # Gen Z / Casual Mode
+             prompt = (
+                f"Rewrite these news headlines based on your current Persona.\n"
+                f"{persona_instr}\n"
+                f"Headlines:\n{headlines_str}\n\n"
+                f"CRITICAL RULE: Check for MAJOR GLOBAL/LOCAL EMERGENCIES (War, Earthquakes, riots). If found, DROP the slang and be SERIOUS/WARNING.\n"
+                f"OTHERWISE (Normal News):\n"
+                f"- Use Gen Z slang (no cap, slay, wild, tea, bestie).\n"
+                f"- Gossip tone: 'Did you hear...', 'Omg...'.\n"
+                f"- Keep it under 100 words.\n"
+                f"- Format: '☕ **Tea Time ({location})** ☕\n...'\n"
+            )
+            
+        response = await ai_generator(prompt, tier=tier)
+        return response
+    else:
+        return f"📰 **News (Raw)**:\n{headlines_str[:300]}..."
+
 async def get_genz_news(location, ai_generator, tier="speed", style="CASUAL", persona=None):
     """
     Fetches local news via RSS. 
@@ -18,63 +99,13 @@ async def get_genz_news(location, ai_generator, tier="speed", style="CASUAL", pe
     Now supports Deep Persona Injection and URGENCY FILTER.
     """
     try:
-        # 1. Fetch RSS (Google News)
-        # Fallback to 'India' if no location
-        raw_query = location if location else "India"
-        query = urllib.parse.quote(raw_query)
-        rss_url = f"https://news.google.com/rss/search?q={query}&hl=en-IN&gl=IN&ceid=IN:en"
-        
-        feed = feedparser.parse(rss_url)
-        
-        # [FALLBACK] If local/specific news is dry, fetch broad 'India' news
-        if not feed.entries:
-             logger.info(f"News: No entries for '{query}'. Trying fallback 'India'.")
-             fallback_url = "https://news.google.com/rss/search?q=India&hl=en-IN&gl=IN&ceid=IN:en"
-             feed = feedparser.parse(fallback_url)
+        # 1. Fetch RSS (Google News), cached per location
+        headlines = await get_headlines(location)
 
-        if not feed.entries:
+        if not headlines:
             return "No news found. The world is quiet. 🌍" if style=="SERIOUS" else "Bestie, the news is dry today 🌵"
             
-        # 2. Pick Top Stories (Fetch more to filter)
-        stories = feed.entries[:7] 
-        headlines = [f"- {s.title}" for s in stories]
-        headlines_str = "\n".join(headlines)
-        
-        # 3. AI Rewrite 
-        if ai_generator:
-            # Construct dynamic instruction based on Persona
-            persona_instr = ""
-            if persona:
-                persona_instr = f"CURRENT MOOD: {persona.get('prefix', '')} \nSTYLE GUIDE: {persona.get('instruction', '')}"
-            
-            if style == "SERIOUS":
-                 prompt = (
-                    f"Summarize these headlines professionally.\n"
-                    f"{persona_instr}\n"
-                    f"Headlines:\n{headlines_str}\n\n"
-                    f"Rules:\n"
-                    f"- PRIORITIZE URGENT EVENTS (War, Disasters, Attacks) FIRST.\n"
-                    f"- Professional, concise tone.\n"
-                    f"- header: '📰 **Briefing for {location}**'\n"
-                 )
-            else:
-                 # Gen Z / Casual Mode
-                 prompt = (
-                    f"Rewrite these news headlines based on your current Persona.\n"
-                    f"{persona_instr}\n"
-                    f"Headlines:\n{headlines_str}\n\n"
-                    f"CRITICAL RULE: Check for MAJOR GLOBAL/LOCAL EMERGENCIES (War, Earthquakes, riots). If found, DROP the slang and be SERIOUS/WARNING.\n"
-                    f"OTHERWISE (Normal News):\n"
-                    f"- Use Gen Z slang (no cap, slay, wild, tea, bestie).\n"
-                    f"- Gossip tone: 'Did you hear...', 'Omg...'.\n"
-                    f"- Keep it under 100 words.\n"
-                    f"- Format: '☕ **Tea Time ({location})** ☕\n...'\n"
-                )
-                
-            response = await ai_generator(prompt, tier=tier)
-            return response
-        else:
-            return f"📰 **News (Raw)**:\n{headlines_str[:300]}..."
+        return await rewrite_headlines(headlines, location, ai_generator, tier=tier, style=style, persona=persona)
 
     except Exception as e:
         logger.error(f"News Error: {e}")
@@ -83,21 +114,25 @@ async def get_genz_news(location, ai_generator, tier="speed", style="CASUAL", pe
 # ==========================================
 # 2. WEATHER (Open-Meteo)
 # ==========================================
-def get_weather(location_coords):
+async def _fetch_weather(lat, lon):
+    url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true"
+    data = await safe_get(url)
+    return (data or {}).get("current_weather")
+
+async def get_weather(location_coords):
     """
     Fetches weather from Open-Meteo.
-    Requires (lat, lon) tuple.
+    Requires (lat, lon) tuple. Cached per 0.1° cell (~11km) for 10 min.
     """
     if not location_coords:
         return "I need your location to check the vibes outside! 📍"
         
-    lat, lon = location_coords
-    url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true"
+    lat, lon = round(float(location_coords[0]), 1), round(float(location_coords[1]), 1)
     
     try:
-        r = requests.get(url, timeout=5)
-        data = r.json()
-        current = data.get("current_weather", {})
+        current = await WEATHER_CACHE.get_or_fetch((lat, lon), lambda: _fetch_weather(lat, lon))
+        if not current:
+            return "Clouds are hiding the data. ☁️"
         
         temp = current.get("temperature")
         code = current.get("weathercode")
@@ -125,47 +160,17 @@ def get_weather(location_coords):
 # ==========================================
 # 3. FINANCE (Yahoo Finance)
 # ==========================================
-def get_stock_price(symbol):
+async def get_stock_price(symbol):
     """
-    Fetches live price using yfinance.
-    Symbol must be valid (e.g. RELIANCE.NS, BTC-USD).
+    Live price via the batched QuoteService (30s cache per symbol, multi-ticker downloads).
+    Accepts company names ('tata power') or tickers ('RELIANCE.NS', 'BTC-USD').
     """
-    # Quick Map for common terms
-    symbol = symbol.upper().replace(" PRICE", "").strip()
-    
-    # Common Crypto
-    if "BITCOIN" in symbol: symbol = "BTC-USD"
-    if "ETHEREUM" in symbol: symbol = "ETH-USD"
-    if "DOGE" in symbol: symbol = "DOGE-USD"
-    
-    # Indian Stocks (Default .NS if missing)
-    # Heuristic: If it looks like an Indian company name, append .NS
-    indian_companies = ["RELIANCE", "TATA", "ZOMATO", "HDFC", "ICICI", "INFY", "WIPRO", "ADANI"]
-    if any(x in symbol for x in indian_companies) and ".NS" not in symbol and ".BO" not in symbol:
-        symbol += ".NS"
-        
-    if "TATA" in symbol and "MOTORS" not in symbol and "POWER" not in symbol and "STEEL" not in symbol:
-         # Ambiguous 'Tata', default to Motors or Power? User asked for Tata Power in prompt.
-         # Let's just append .NS and hope, or if it says TATA POWER it becomes TATA POWER.NS which needs underscore?
-         # Yahoo expects 'TATAPOWER.NS' usually.
-         symbol = symbol.replace(" ", "") # Remove spaces for ticker
+    symbol = resolve_symbol(symbol)
 
     try:
-        ticker = yf.Ticker(symbol)
-        
-        # Try Fast Info
-        price = None
-        try:
-            price = ticker.fast_info.last_price
-        except: pass
-        
-        # Fallback to History
-        if not price or str(price) == "nan":
-             hist = ticker.history(period="1d")
-             if not hist.empty:
-                 price = hist["Close"].iloc[-1]
+        price = await quote_service.get_price(symbol)
         
-        if not price or str(price) == "nan":
+        if not price:
             return f"Couldn't find price for {symbol}. Try specific ticker like 'RELIANCE.NS'"
             
         emoji = "📈" 
@@ -0,0 +1,108 @@
+import os
+import asyncio
+import logging
+from collections import OrderedDict
+from telegram.error import BadRequest
+from network_utils import get_client, TTLCache
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_IMAGE = "https://via.placeholder.com/300?text=No+Image"
+
+# Optional private chat/channel where images can be pre-uploaded to get a file_id
+# before the user ever taps "Next" (the message is deleted right after).
+MEDIA_CACHE_CHAT_ID = os.getenv("MEDIA_CACHE_CHAT_ID", "").strip()
+
+# Telegram BadRequest texts that mean the image URL itself is unusable. Anything else
+# (caption Markdown, "message is not modified", timeouts, flood control) says nothing
+# about the URL and must never blacklist it.
+_BROKEN_MEDIA_ERRORS = ("wrong file identifier", "failed to get http url content", "wrong type of the web page content")
+
+def is_broken_media_error(exc):
+    return isinstance(exc, BadRequest) and any(m in str(exc).lower() for m in _BROKEN_MEDIA_ERRORS)
+
+class TelegramMediaCache:
+    """
+    Remembers the file_id Telegram assigns to each remote image URL.
+    Re-sending by file_id skips Telegram's remote fetch entirely, and URLs that
+    are known to be broken are swapped for the placeholder BEFORE we call Telegram
+    (no more failed edit_message_media + caption fallback = 2 round-trips).
+    """
+    def __init__(self, max_items=2000):
+        self.max_items = max_items
+        self.file_ids = OrderedDict()  # url -> file_id
+        # Bounded + expiring: a CDN hiccup or a transient 404 doesn't blacklist an image forever
+        self.bad_urls = TTLCache(ttl=6 * 3600, max_items=max_items)
+        self.good_urls = TTLCache(ttl=3600, max_items=max_items)
+        self._warm_tasks = set()
+
+    def resolve(self, url):
+        """Best thing to hand Telegram for this image: cached file_id > url > placeholder."""
+        if not url or self.bad_urls.get(url):
+            url = PLACEHOLDER_IMAGE
+        file_id = self.file_ids.get(url)
+        if file_id:
+            self.file_ids.move_to_end(url)
+            return file_id
+        return url
+
+    def remember(self, url, message):
+        """Stores the file_id from a Message returned by send_photo / edit_message_media."""
+        if not url or self.bad_urls.get(url):
+            url = PLACEHOLDER_IMAGE
+        photo = getattr(message, "photo", None)
+        if not photo:
+            return
+        self.file_ids[url] = photo[-1].file_id
+        self.file_ids.move_to_end(url)
+        while len(self.file_ids) > self.max_items:
+            self.file_ids.popitem(last=False)
+
+    def mark_bad(self, url):
+        """Only for URLs Telegram itself rejected (see is_broken_media_error) or that 404."""
+        if url and url != PLACEHOLDER_IMAGE:
+            self.bad_urls.set(url, True)
+            self.file_ids.pop(url, None)
+
+    async def validate(self, url):
+        """
+        Cheap HEAD check of what Telegram will fetch. Only a definite 404/410 marks the URL
+        bad; timeouts, 405s and odd content-types are "unknown" and Telegram gets to try.
+        """
+        if self.good_urls.get(url) or url in self.file_ids:
+            return True
+        if self.bad_urls.get(url):
+            return False
+        try:
+            resp = await get_client().head(url, follow_redirects=True, timeout=5.0)
+        except Exception as e:
+            logger.warning(f"🖼️ Image Check Failed ({url[:60]}): {e}")
+            return True
+        if resp.status_code in (404, 410):
+            self.mark_bad(url)
+            return False
+        if resp.status_code == 200 and resp.headers.get("content-type", "").startswith("image/"):
+            self.good_urls.set(url, True)
+        return True
+
+    def prewarm(self, url, bot=None):
+        """Background: validate the NEXT card's image and (optionally) pre-upload it for a file_id."""
+        if not url or url in self.file_ids or self.bad_urls.get(url):
+            return
+        task = asyncio.ensure_future(self._warm(url, bot))
+        self._warm_tasks.add(task)
+        task.add_done_callback(self._warm_tasks.discard)
+
+    async def _warm(self, url, bot):
+        if not await self.validate(url):
+            return
+        if not (bot and MEDIA_CACHE_CHAT_ID):
+            return
+        try:
+            msg = await bot.send_photo(chat_id=MEDIA_CACHE_CHAT_ID, photo=url, disable_notification=True)
+            self.remember(url, msg)
+            await bot.delete_message(chat_id=MEDIA_CACHE_CHAT_ID, message_id=msg.message_id)
+        except Exception as e:
+            logger.warning(f"🖼️ Media Pre-Warm Failed: {e}")
+
+media_cache = TelegramMediaCache()
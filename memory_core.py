@@ -1,4 +1,5 @@
 import logging
+import os
 import json
 from datetime import datetime
 from database_adapter import db # [PHASE 14] Infinite Memory DB
@@ -61,6 +62,65 @@ def update_preference(user_id, key, value):
 # If so, we need to provide a class wrapper.
 
 
+# [PERF] Tiered memory: a rolling summary (folded in the background) + a short raw tail.
+# Prompt size stays flat no matter how long the chat gets.
+SUMMARY_RAW_TAIL = 8       # Newest turns never folded (always raw)
+SUMMARY_RAW_MAX = 16       # Max raw turns in a prompt (tail + not-yet-folded)
+SUMMARY_FOLD_MIN = 12      # Fold once this many turns sit between summary and tail
+SUMMARY_FOLD_MAX = 80      # Turns folded per pass (fixed cost per LLM call)
+SUMMARY_MAX_CHARS = 1200
+
+# [PERF] Retention: turns older than this (and already folded into the summary) move to
+# the compressed history_archive table during the daily compaction job.
+HISTORY_HOT_DAYS = int(os.getenv("HISTORY_HOT_DAYS", "30"))
+
+def _format_turns(history):
+    return "\n".join([f"{'User' if h['role']=='user' else 'Jarvis'}: {h['content']}" for h in history])
+
+def get_conversation_summary(user_id):
+    return db.get_summary(str(user_id))["summary"]
+
+def get_unsummarised_context(user_id, limit=SUMMARY_RAW_MAX):
+    """Raw turns newer than the summary cursor (the part the summary doesn't cover yet)."""
+    state = db.get_summary(str(user_id))
+    return _format_turns(db.get_recent_after(str(user_id), state["upto_id"], limit))
+
+def get_tiered_context(user_id):
+    """Fixed-size context: rolling summary + raw recent turns."""
+    summary = get_conversation_summary(user_id)
+    raw = get_unsummarised_context(user_id)
+    if not summary:
+        return raw
+    return f"SUMMARY OF EARLIER CHAT:\n{summary}\nRECENT:\n{raw}"
+
+async def update_rolling_summary(user_id, ai_generator):
+    """
+    Folds the turns between the summary cursor and the raw tail into the summary.
+    Returns True if the summary advanced. Meant for background keys (see summary job).
+    """
+    user_id = str(user_id)
+    state = db.get_summary(user_id)
+    rows = db.get_unsummarised(user_id, state["upto_id"], SUMMARY_RAW_TAIL, SUMMARY_FOLD_MAX)
+    if len(rows) < SUMMARY_FOLD_MIN:
+        return False
+
+    prompt = (
+        "You maintain a running memory of a chat between a User and Jarvis (their AI companion).\n"
+        f"CURRENT SUMMARY:\n{state['summary'] or '(empty)'}\n\n"
+        f"NEW MESSAGES:\n{_format_turns(rows)}\n\n"
+        "Task: Rewrite the summary to include the new messages.\n"
+        "- Keep facts about the user, plans, promises, preferences, emotional state and open threads.\n"
+        "- Drop greetings and small talk.\n"
+        "- Max 150 words. Plain text bullet points. Output ONLY the summary."
+    )
+    summary = await ai_generator(prompt, tier="standard")
+    if not summary or not summary.strip():
+        return False
+
+    db.save_summary(user_id, summary.strip()[:SUMMARY_MAX_CHARS], rows[-1]["id"])
+    logger.info(f"🧾 Rolling Summary Updated for {user_id} (+{len(rows)} turns)")
+    return True
+
 def get_recent_context(user_id, limit=5):
     """
     Fetches recent conversation history for deep context.
@@ -129,11 +189,27 @@ class MemoryCoreWrapper:
     def get_recent_context(self, user_id, limit=10):
         try:
             history = db.get_history(str(user_id), limit=limit)
-            return "\n".join([f"{'User' if h['role']=='user' else 'Jarvis'}: {h['content']}" for h in history])
+            return _format_turns(history)
         except Exception as e:
             logger.error(f"Context Fetch Error: {e}")
             return ""
 
+    # --- TIERED MEMORY ---
+    def get_tiered_context(self, user_id):
+        return get_tiered_context(user_id)
+
+    def get_conversation_summary(self, user_id):
+        return get_conversation_summary(user_id)
+
+    def get_unsummarised_context(self, user_id, limit=SUMMARY_RAW_MAX):
+        return get_unsummarised_context(user_id, limit)
+
+    async def update_rolling_summary(self, user_id, ai_generator):
+        return await update_rolling_summary(user_id, ai_generator)
+
+    def get_users_needing_summary(self):
+        return db.get_users_needing_summary(SUMMARY_FOLD_MIN + SUMMARY_RAW_TAIL)
+
     def save_memory(self, user_id, data):
         """Pass-through to global save_memory."""
         save_memory(user_id, data)
@@ -141,4 +217,42 @@ class MemoryCoreWrapper:
     def get_all_users(self):
         return db.get_all_users()
 
+    # --- MEDIA HISTORY ---
+    def log_media(self, user_id, url, title, mood=None, source="link", channel=None):
+        """Single media row (shared links). YouTube syncs use log_media_batch."""
+        return db.add_media_items(str(user_id), [{
+            "source": source, "url": url, "title": title, "channel": channel, "mood": mood
+        }])
+
+    def log_media_batch(self, user_id, items, mood=None, cursor_update=None):
+        """All rows in one transaction; mood (if given) applied to every item."""
+        if mood:
+            items = [{**it, "mood": mood} for it in items]
+        return db.add_media_items(str(user_id), items, cursor_update=cursor_update)
+
+    def recent_media(self, user_id, n=5):
+        """Last n media items (newest first): [{title, url, mood, source, channel, timestamp}]"""
+        return db.get_recent_media(str(user_id), n)
+
+    def media_by_mood(self, user_id, mood, n=20):
+        return db.get_media_by_mood(str(user_id), mood, n)
+
+    def clear_media(self, user_id):
+        db.clear_media(str(user_id))
+
+    def compact_history(self, hot_days=HISTORY_HOT_DAYS):
+        return db.compact_history(hot_days)
+
+    def get_archived_history(self, user_id, month):
+        return db.get_archived_history(str(user_id), month)
+
+    def get_sync_cursor(self, user_id, source):
+        return db.get_sync_cursor(str(user_id), source)
+
+    def set_sync_cursor(self, user_id, source, last_item_id, etag):
+        db.set_sync_cursor(str(user_id), source, last_item_id, etag)
+
+    def get_synced_users(self, source):
+        return db.get_synced_users(source)
+
 memory_db = MemoryCoreWrapper()
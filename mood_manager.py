@@ -1,5 +1,9 @@
 import logging
 import random
+import threading
+from datetime import datetime
+
+from database_adapter import db
 
 logger = logging.getLogger(__name__)
 
@@ -139,3 +143,47 @@ def detect_mood_from_emojis(text):
         if char in EMOJI_TO_MOOD:
             return EMOJI_TO_MOOD[char]
     return None
+
+
+# ==========================================
+# CURRENT MOOD STATE (per user)
+# ==========================================
+# One dict lookup per message. Loaded from brain.db (mood_state) on first use and
+# written through only when a user's mood actually changes. Fed by the Observer
+# (input_analyzer), emoji detection and YouTube mood sync.
+
+class MoodState:
+    def __init__(self):
+        self._moods = None   # user_id -> (mood, source, updated_at)
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._moods is None:
+                self._moods = db.get_mood_states()
+        return self._moods
+
+    def get_mood(self, user_id, default="Neutral"):
+        entry = (self._moods if self._moods is not None else self._load()).get(str(user_id))
+        return entry[0] if entry else default
+
+    def set_mood(self, user_id, mood, source="analyzer"):
+        if not mood or not isinstance(mood, str):
+            return
+        user_id, mood = str(user_id), mood.strip().capitalize()
+        moods = self._load()
+        current = moods.get(user_id)
+        if current and current[0] == mood:
+            return  # Unchanged: no DB write
+        updated_at = datetime.now().isoformat()
+        moods[user_id] = (mood, source, updated_at)
+        db.save_mood_state(user_id, mood, source, updated_at)
+
+    def observe_text(self, user_id, text):
+        """Emoji fast-path: records an emoji-detected mood. Returns the user's current mood."""
+        emoji_mood = detect_mood_from_emojis(text or "")
+        if emoji_mood:
+            self.set_mood(user_id, emoji_mood, source="emoji")
+        return self.get_mood(user_id)
+
+mood_state = MoodState()
@@ -17,7 +17,7 @@ async def handle_multimedia(user_text, user_id, send_msg_func, mood_context=None
             profile = memory_db.get_profile(user_id)
             # Default to pop if no preferences
             prefs = profile.get("preferences", {}).get("music_genres", "Pop, Lofi") 
-            history = profile.get("profile", {}).get("media_history", [])[-3:] # Last 3 songs
+            history = memory_db.recent_media(user_id, 3) # Last 3 songs
             
             history_str = ", ".join([h.get('title', 'Unknown') for h in history])
             
@@ -2,6 +2,8 @@ import httpx
 import asyncio
 import logging
 import random
+import time
+from collections import OrderedDict
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +27,72 @@ async def close_client():
     if _client and not _client.is_closed:
         await _client.aclose()
 
+class TTLCache:
+    """
+    Small per-key TTL cache (LRU bounded) with in-flight request coalescing.
+    Identical concurrent lookups share ONE upstream call instead of stampeding the API.
+    With stale_ttl > 0 it serves stale-while-revalidate: an expired entry is still
+    returned instantly for stale_ttl more seconds while a background refresh runs.
+    """
+    def __init__(self, ttl: float, max_items: int = 256, stale_ttl: float = 0):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_items = max_items
+        self._data = OrderedDict()  # key -> (fetched_at, value)
+        self._inflight = {}         # key -> asyncio.Task
+
+    def _lookup(self, key):
+        """Returns (value, is_fresh) or (None, False)."""
+        entry = self._data.get(key)
+        if not entry:
+            return None, False
+        fetched_at, value = entry
+        age = time.time() - fetched_at
+        if age > self.ttl + self.stale_ttl:
+            del self._data[key]
+            return None, False
+        self._data.move_to_end(key)
+        return value, age <= self.ttl
+
+    def get(self, key):
+        value, fresh = self._lookup(key)
+        return value if fresh else None
+
+    def set(self, key, value):
+        self._data[key] = (time.time(), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_items:
+            self._data.popitem(last=False)
+
+    def _start_fetch(self, key, fetcher):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetcher())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._store(key, t))
+        return task
+
+    async def get_or_fetch(self, key, fetcher):
+        """Returns cached value, else awaits fetcher() (shared by all concurrent callers)."""
+        value, fresh = self._lookup(key)
+        if fresh:
+            return value
+        if value is not None:
+            # Stale: answer now, revalidate in background
+            self._start_fetch(key, fetcher)
+            return value
+
+        task = self._start_fetch(key, fetcher)
+        # Shield so one cancelled caller doesn't kill the fetch for everyone else
+        return await asyncio.shield(task)
+
+    def _store(self, key, task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception():
+            return
+        if task.result():  # Don't cache empty/failed results
+            self.set(key, task.result())
+
 async def safe_get(url: str, params: dict = None, headers: dict = None, retries: int = 1) -> dict:
     """Robust GET request (Fail Fast)."""
     client = get_client()
@@ -0,0 +1,159 @@
+import os
+import time
+import asyncio
+import logging
+import hashlib
+import urllib.parse
+from collections import Counter
+
+from network_utils import get_client
+from knowledge_engine import NEWS_CACHE, NEWS_RSS_URL, news_query, parse_headlines, rewrite_headlines
+from mood_manager import get_mood_persona
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# NEWS DIGEST PREFETCHER
+# ==========================================
+# Most users share a handful of locations. A background job polls the RSS for the
+# top-N locations with conditional GETs (ETag / Last-Modified) and only when the
+# feed actually changed re-runs the AI rewrite for every (style, persona) combo.
+# handle_knowledge then answers NEWS straight from here: no RSS, no LLM.
+
+NEWS_PREFETCH_TOP_N = int(os.getenv("NEWS_PREFETCH_TOP_N", "5"))
+NEWS_PREFETCH_INTERVAL = int(os.getenv("NEWS_PREFETCH_INTERVAL", "300"))  # Poll (cheap: mostly 304s)
+NEWS_PREFETCH_MOODS = [m.strip() for m in os.getenv("NEWS_PREFETCH_MOODS", "Neutral").split(",") if m.strip()]
+NEWS_STYLES = ("CASUAL", "SERIOUS")
+
+# A digest is only trusted while the job keeps it fresh (guards against a dead job / failing feed)
+DIGEST_MAX_AGE = NEWS_PREFETCH_INTERVAL * 6
+
+UNCHANGED = "unchanged"  # _conditional_fetch: feed confirmed identical (304 / same fingerprint)
+
+
+def profile_location(prof):
+    """Location string usable as a news query (GPS-only locations fall back to 'India')."""
+    raw = prof.get("profile", {}).get("location") or prof.get("location") or "India"
+    return news_query(raw.split("GPS")[0])  # rudimentary cleanup
+
+
+class NewsDigestCache:
+    def __init__(self):
+        self.feeds = {}    # loc_key -> {"etag", "last_modified", "fingerprint"}
+        self.digests = {}  # (loc_key, style, persona_prefix) -> (built_at, text)
+
+    @staticmethod
+    def _key(location, style, persona):
+        prefix = (persona or {}).get("prefix", "")
+        return (news_query(location).lower(), style, prefix)
+
+    def get(self, location, style, persona):
+        entry = self.digests.get(self._key(location, style, persona))
+        if not entry:
+            return None
+        built_at, text = entry
+        if time.time() - built_at > DIGEST_MAX_AGE:
+            return None
+        return text
+
+    def _touch(self, loc_key):
+        """Feed unchanged: extend the life of every digest built for it."""
+        now = time.time()
+        for key, (_, text) in list(self.digests.items()):
+            if key[0] == loc_key:
+                self.digests[key] = (now, text)
+
+    async def _conditional_fetch(self, location):
+        """
+        Returns (fresh headlines, feed state to commit), (UNCHANGED, None) if the feed is
+        confirmed unchanged (304 / same items), or (None, None) if the fetch failed. The
+        caller commits the state only once the digests are rebuilt, so a failed rewrite is
+        retried on the next poll instead of being hidden behind a 304.
+        """
+        raw_query = news_query(location)
+        loc_key = raw_query.lower()
+        state = self.feeds.setdefault(loc_key, {})
+
+        headers = {}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+
+        url = NEWS_RSS_URL.format(query=urllib.parse.quote(raw_query))
+        try:
+            resp = await get_client().get(url, headers=headers, follow_redirects=True)
+        except Exception as e:
+            logger.warning(f"📰 Digest Fetch Failed ({raw_query}): {e}")
+            return None, None
+
+        if resp.status_code == 304:
+            return UNCHANGED, None
+        if resp.status_code != 200:
+            logger.warning(f"📰 Digest Fetch {raw_query}: HTTP {resp.status_code}")
+            return None, None
+
+        headlines = await parse_headlines(resp.content)
+        if not headlines:
+            return None, None
+
+        new_state = {
+            "etag": resp.headers.get("etag"),
+            "last_modified": resp.headers.get("last-modified"),
+            # Feeds without validators: same top stories == no change
+            "fingerprint": hashlib.sha1("\n".join(headlines).encode("utf-8")).hexdigest(),
+        }
+        NEWS_CACHE.set(loc_key, headlines)  # On-demand path benefits too
+        if new_state["fingerprint"] == state.get("fingerprint"):
+            state.update(new_state)  # Nothing to rebuild: safe to commit now
+            return UNCHANGED, None
+        return headlines, new_state
+
+    async def refresh(self, location, ai_generator):
+        """Rebuilds all digests for one location if its feed changed. Returns number rebuilt."""
+        loc_key = news_query(location).lower()
+        headlines, new_state = await self._conditional_fetch(location)
+        if headlines == UNCHANGED:
+            self._touch(loc_key)  # Only a confirmed-unchanged feed extends the digests' life
+            return 0
+        if headlines is None:
+            return 0  # Failed fetch: let the digests age out (DIGEST_MAX_AGE)
+
+        built, wanted = 0, len(NEWS_PREFETCH_MOODS) * len(NEWS_STYLES)
+        for mood in NEWS_PREFETCH_MOODS:
+            persona = get_mood_persona(mood)
+            for style in NEWS_STYLES:
+                try:
+                    text = await rewrite_headlines(headlines, location, ai_generator, style=style, persona=persona)
+                except Exception as e:
+                    logger.error(f"📰 Digest Rewrite Error ({location}/{style}): {e}")
+                    continue
+                if text:
+                    self.digests[self._key(location, style, persona)] = (time.time(), text)
+                    built += 1
+        if built == wanted:
+            self.feeds[loc_key].update(new_state)
+        else:
+            logger.warning(f"📰 Digest {location}: {built}/{wanted} rebuilt, retrying next poll")
+        return built
+
+
+def top_locations(memory_db, n=NEWS_PREFETCH_TOP_N):
+    """Blocking (one profile read per user): run it via asyncio.to_thread."""
+    counts = Counter()
+    for user_id in memory_db.get_all_users():
+        try:
+            counts[profile_location(memory_db.get_profile(user_id))] += 1
+        except Exception:
+            continue
+    return [loc for loc, _ in counts.most_common(n)]
+
+
+async def prefetch_news_digests(memory_db, ai_generator):
+    """One pass of the background job over the most common user locations."""
+    for location in await asyncio.to_thread(top_locations, memory_db):
+        built = await news_digests.refresh(location, ai_generator)
+        if built:
+            logger.info(f"📰 News Digest Rebuilt: {location} ({built} variants)")
+
+news_digests = NewsDigestCache()
@@ -0,0 +1,127 @@
+import os
+import bisect
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# PROMPT ASSEMBLY (token-budgeted)
+# ==========================================
+# Sections are added in display order with a priority (0 = never dropped).
+# build() grants budget in (priority, insertion) order, so truncation is deterministic:
+# the least important sections shrink first, and a section that doesn't fit is cut to
+# whole lines (history keeps its NEWEST lines, lists keep their FIRST lines).
+# A section added with requires="x" (e.g. a header) only appears if section x does.
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+
+KEEP_ALL = "all"    # Never truncated: whole, or dropped if priority > 0 and it doesn't fit
+KEEP_HEAD = "head"  # Lists: keep the first lines
+KEEP_TAIL = "tail"  # History: keep the most recent lines
+
+Section = namedtuple("Section", ["name", "text", "priority", "keep", "index", "requires"])
+
+def estimate_tokens(text):
+    """~4 chars/token is close enough for budgeting (no tokenizer dependency)."""
+    return (len(text) + 3) // 4
+
+def _fit_lines(text, budget_tokens, keep):
+    lines = text.split("\n")
+    if keep == KEEP_TAIL:
+        lines = lines[::-1]
+    kept, used = [], 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget_tokens:
+            break
+        kept.append(line)
+        used += cost
+    if keep == KEEP_TAIL:
+        kept = kept[::-1]
+    return "\n".join(kept)
+
+
+# --- Prompt Size Metric ---
+PROMPT_SIZE_BUCKETS = [250, 500, 750, 1000, 1500, 2000, 3000, 4000]
+
+class PromptSizeHistogram:
+    """Counts built prompts per estimated-token bucket (last bucket = overflow)."""
+    def __init__(self, buckets=PROMPT_SIZE_BUCKETS, log_every=50):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total_tokens = 0
+        self.log_every = log_every
+
+    def record(self, tokens):
+        self.counts[bisect.bisect_left(self.buckets, tokens)] += 1
+        self.total_tokens += tokens
+        n = sum(self.counts)
+        if n % self.log_every == 0:
+            logger.info(f"📏 Prompt Sizes (n={n}, avg={self.total_tokens // n} tok): {self.snapshot()}")
+
+    def snapshot(self):
+        labels = [f"<={b}" for b in self.buckets] + [f">{self.buckets[-1]}"]
+        return dict(zip(labels, self.counts))
+
+prompt_size_histogram = PromptSizeHistogram()
+
+
+class PromptBuilder:
+    def __init__(self, budget=PROMPT_TOKEN_BUDGET):
+        self.budget = budget
+        self.sections = []
+
+    def add(self, name, text, priority=0, keep=KEEP_ALL, requires=None):
+        if text:
+            self.sections.append(Section(name, text.strip("\n"), priority, keep, len(self.sections), requires))
+        return self
+
+    def build(self):
+        """Returns (prompt, stats). stats: {'tokens', 'dropped': [...], 'truncated': [...]}."""
+        remaining = self.budget
+        granted = {}
+        dropped, truncated = [], []
+
+        for sec in sorted(self.sections, key=lambda s: (s.priority, s.index)):
+            cost = estimate_tokens(sec.text) + 1
+            if cost <= remaining or sec.priority == 0:
+                granted[sec.index] = sec.text
+                remaining -= cost
+                continue
+            if sec.keep == KEEP_ALL:
+                dropped.append(sec.name)
+                continue
+            partial = _fit_lines(sec.text, remaining, sec.keep) if remaining > 0 else ""
+            if sec.keep == KEEP_HEAD and "\n" not in partial:
+                partial = ""  # Only the section title would survive: drop it instead
+            if partial.strip():
+                granted[sec.index] = partial
+                remaining -= estimate_tokens(partial) + 1
+                truncated.append(sec.name)
+            else:
+                dropped.append(sec.name)
+
+        # Headers/footers whose section never made it in (empty or dropped) go too
+        present = {self.sections[i].name for i in granted}
+        for i in sorted(granted):
+            sec = self.sections[i]
+            if sec.requires and sec.requires not in present:
+                del granted[i]
+                if sec.requires in dropped:
+                    dropped.append(sec.name)
+
+        prompt = "\n".join(granted[i] for i in sorted(granted))
+        tokens = estimate_tokens(prompt)
+        prompt_size_histogram.record(tokens)
+        if dropped or truncated:
+            logger.info(f"✂️ Prompt budget {self.budget}: truncated={truncated} dropped={dropped}")
+        return prompt, {"tokens": tokens, "dropped": dropped, "truncated": truncated}
+
+
+def format_user_routines(user_routines, day_name):
+    """Today's learned routine for ONE user (not the whole routines file)."""
+    items = (user_routines or {}).get("weekly", {}).get(day_name, [])
+    if not items:
+        return ""
+    return "\n".join(f"- {r['start']}-{r.get('end', '?')}: {r['label']}" for r in sorted(items, key=lambda r: r["start"]))
@@ -0,0 +1,156 @@
+import os
+import re
+import json
+import asyncio
+import logging
+import yfinance as yf
+from network_utils import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# SYMBOL INDEX (company name -> ticker)
+# ==========================================
+# Built-in aliases; symbol_index.json (same shape) can add/override entries without a deploy.
+SYMBOL_INDEX_FILE = "symbol_index.json"
+
+SYMBOL_INDEX = {
+    # Crypto
+    "bitcoin": "BTC-USD", "btc": "BTC-USD",
+    "ethereum": "ETH-USD", "eth": "ETH-USD",
+    "doge": "DOGE-USD", "dogecoin": "DOGE-USD",
+    "solana": "SOL-USD",
+    # Indian indices
+    "nifty": "^NSEI", "nifty 50": "^NSEI", "sensex": "^BSESN", "bank nifty": "^NSEBANK",
+    # Indian stocks (NSE)
+    "reliance": "RELIANCE.NS",
+    "tata": "TATAMOTORS.NS", "tata motors": "TATAMOTORS.NS",
+    "tata power": "TATAPOWER.NS", "tata steel": "TATASTEEL.NS",
+    "tcs": "TCS.NS", "tata consultancy": "TCS.NS",
+    "zomato": "ZOMATO.NS", "swiggy": "SWIGGY.NS", "paytm": "PAYTM.NS", "nykaa": "NYKAA.NS",
+    "hdfc": "HDFCBANK.NS", "hdfc bank": "HDFCBANK.NS",
+    "icici": "ICICIBANK.NS", "icici bank": "ICICIBANK.NS",
+    "sbi": "SBIN.NS", "state bank": "SBIN.NS",
+    "infosys": "INFY.NS", "infy": "INFY.NS",
+    "wipro": "WIPRO.NS",
+    "adani": "ADANIENT.NS", "adani ports": "ADANIPORTS.NS", "adani green": "ADANIGREEN.NS",
+    "airtel": "BHARTIARTL.NS", "itc": "ITC.NS", "maruti": "MARUTI.NS", "irctc": "IRCTC.NS",
+    # US
+    "apple": "AAPL", "tesla": "TSLA", "nvidia": "NVDA", "microsoft": "MSFT",
+    "google": "GOOGL", "alphabet": "GOOGL", "amazon": "AMZN", "meta": "META", "netflix": "NFLX",
+    # Commodities
+    "gold": "GC=F", "silver": "SI=F", "crude": "CL=F", "crude oil": "CL=F",
+}
+
+if os.path.exists(SYMBOL_INDEX_FILE):
+    try:
+        with open(SYMBOL_INDEX_FILE, "r", encoding="utf-8") as f:
+            SYMBOL_INDEX.update({k.lower(): v.upper() for k, v in json.load(f).items()})
+    except Exception as e:
+        logger.error(f"Symbol Index Load Error: {e}")
+
+_NOISE = {"price", "stock", "stocks", "share", "shares", "value", "of", "the", "rate", "today", "current", "ka", "kya", "hai"}
+_TOKEN_RE = re.compile(r"[a-z0-9&^=.\-]+")
+_MAX_ALIAS_WORDS = max(len(k.split()) for k in SYMBOL_INDEX)
+
+
+def resolve_symbol(text):
+    """
+    'price of tata power' -> 'TATAPOWER.NS', 'btc' -> 'BTC-USD', 'AAPL' -> 'AAPL'.
+    Longest alias phrase in the index wins; otherwise the text is treated as a raw ticker.
+    """
+    tokens = [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in _NOISE]
+    if not tokens:
+        return "BTC-USD"
+
+    for size in range(min(_MAX_ALIAS_WORDS, len(tokens)), 0, -1):
+        for i in range(len(tokens) - size + 1):
+            ticker = SYMBOL_INDEX.get(" ".join(tokens[i:i + size]))
+            if ticker:
+                return ticker
+
+    # Unknown: assume the user typed a ticker ("RELIANCE.NS", "BTC-USD")
+    return "".join(tokens).upper()
+
+
+# ==========================================
+# BATCHED QUOTE SERVICE
+# ==========================================
+def _last_close(frame):
+    closes = frame["Close"].dropna()
+    return float(closes.iloc[-1]) if not closes.empty else None
+
+def _download_prices(symbols):
+    """Blocking: ONE multi-ticker yfinance download for the whole batch (worker thread)."""
+    prices = {}
+    try:
+        df = yf.download(tickers=" ".join(symbols), period="5d", interval="5m",
+                         group_by="ticker", progress=False, threads=True)
+        if df is not None and not df.empty:
+            multi = getattr(df.columns, "nlevels", 1) > 1
+            for sym in symbols:
+                try:
+                    frame = df[sym] if multi else df
+                    prices[sym] = _last_close(frame)
+                except KeyError:
+                    continue
+    except Exception as e:
+        logger.error(f"Quote Batch Error ({symbols}): {e}")
+
+    # Anything the batch missed (new listing, odd exchange) -> per-ticker fast_info
+    for sym in symbols:
+        if prices.get(sym):
+            continue
+        try:
+            price = yf.Ticker(sym).fast_info.last_price
+            prices[sym] = float(price) if price and str(price) != "nan" else None
+        except Exception:
+            prices[sym] = None
+    return prices
+
+
+class QuoteService:
+    """
+    Symbol -> last price with a short TTL (hot symbols answer from memory).
+    Misses arriving within `window` seconds are merged into a single yf.download call.
+    """
+    def __init__(self, window=0.05, ttl=30, stale_ttl=120):
+        self.window = window
+        self.cache = TTLCache(ttl=ttl, max_items=512, stale_ttl=stale_ttl)
+        self._batch = {}     # symbol -> Future (waiting for the next flush)
+        self._flush_handle = None
+
+    async def get_price(self, symbol):
+        return await self.cache.get_or_fetch(symbol, lambda: self._enqueue(symbol))
+
+    async def get_prices(self, symbols):
+        prices = await asyncio.gather(*(self.get_price(s) for s in symbols))
+        return dict(zip(symbols, prices))
+
+    def _enqueue(self, symbol):
+        loop = asyncio.get_running_loop()
+        fut = self._batch.get(symbol)
+        if fut is None:
+            fut = loop.create_future()
+            self._batch[symbol] = fut
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, lambda: asyncio.ensure_future(self._flush()))
+        return fut
+
+    async def _flush(self):
+        batch, self._batch = self._batch, {}
+        self._flush_handle = None
+        if not batch:
+            return
+        symbols = list(batch)
+        try:
+            prices = await asyncio.to_thread(_download_prices, symbols)
+        except Exception as e:
+            prices = {}
+            logger.error(f"Quote Flush Error: {e}")
+        for sym, fut in batch.items():
+            if not fut.done():
+                fut.set_result(prices.get(sym))
+        logger.info(f"💹 Quote Batch: {len(symbols)} symbols in 1 download")
+
+quote_service = QuoteService()
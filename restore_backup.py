@@ -0,0 +1,146 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import datetime
+
+from backup_manager import list_snapshots, load_manifest, verify_snapshot, materialize, BACKUP_DIR
+
+# ==========================================
+# POINT-IN-TIME RESTORE (stop the bot first!)
+# ==========================================
+# python restore_backup.py list
+# python restore_backup.py verify [SNAPSHOT]
+# python restore_backup.py restore [SNAPSHOT|latest] [--files brain.db user_routines.json]
+#
+# Restore is all-or-nothing: every file is rebuilt next to its target and checked
+# (sha256, PRAGMA integrity_check for .db) BEFORE anything is swapped in. The swap is
+# os.replace per file; the previous versions are kept as <file>.pre-restore and put
+# back if any swap fails.
+
+SQLITE_SIDECARS = ["-journal", "-wal", "-shm"]  # A stale hot journal would be replayed onto the restored DB
+
+
+def integrity_check(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        result = conn.execute("PRAGMA integrity_check").fetchall()
+    finally:
+        conn.close()
+    return [row[0] for row in result if row[0] != "ok"]
+
+def resolve_snapshot(name):
+    snapshots = list_snapshots()
+    if not snapshots:
+        sys.exit(f"No snapshots in {BACKUP_DIR}/manifests")
+    if name in (None, "latest"):
+        return snapshots[-1]
+    if name not in snapshots:
+        sys.exit(f"Unknown snapshot '{name}'. Run: python restore_backup.py list")
+    return name
+
+
+def cmd_list(args):
+    for sid in list_snapshots():
+        manifest = load_manifest(sid)
+        total = sum(entry["size"] for entry in manifest["files"].values())
+        print(f"{sid}  {len(manifest['files'])} files  {total / 1024:>9.0f} KB  {', '.join(sorted(manifest['files']))}")
+
+def cmd_verify(args):
+    sid = resolve_snapshot(args.snapshot)
+    started = time.monotonic()
+    problems = verify_snapshot(sid)
+    if not problems:
+        # Checksums only prove the bytes are what we stored; also make sure the DB itself is sound
+        for name, entry in load_manifest(sid)["files"].items():
+            if name.endswith(".db"):
+                tmp_path = os.path.join(BACKUP_DIR, f".{name}.verify")
+                try:
+                    materialize(entry, tmp_path)
+                    problems += [f"{name}: {p}" for p in integrity_check(tmp_path)]
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+    elapsed = time.monotonic() - started
+    if problems:
+        print(f"❌ {sid} FAILED ({elapsed:.1f}s):")
+        for p in problems:
+            print(f"   - {p}")
+        return 1
+    print(f"✅ {sid} OK ({elapsed:.1f}s)")
+    return 0
+
+def cmd_restore(args):
+    sid = resolve_snapshot(args.snapshot)
+    files = load_manifest(sid)["files"]
+    targets = args.files or sorted(files)
+    missing = [name for name in targets if name not in files]
+    if missing:
+        sys.exit(f"Not in snapshot {sid}: {', '.join(missing)}")
+
+    started = time.monotonic()
+    staged = {}
+    try:
+        # 1. Stage + check everything first (nothing live is touched yet)
+        for name in targets:
+            tmp_path = f"{name}.restore"
+            materialize(files[name], tmp_path)
+            staged[name] = tmp_path
+            if name.endswith(".db"):
+                problems = integrity_check(tmp_path)
+                if problems:
+                    raise ValueError(f"{name}: integrity_check failed: {problems[:3]}")
+    except Exception as e:
+        for tmp_path in staged.values():
+            os.remove(tmp_path)
+        print(f"❌ Restore aborted, nothing changed: {e}")
+        return 1
+
+    # 2. Swap in, keeping the current files for rollback
+    moved = []  # (original, backup_path) in swap order
+    swapped = []
+    try:
+        for name in targets:
+            extras = [name + s for s in SQLITE_SIDECARS] if name.endswith(".db") else []
+            for path in [name] + extras:
+                if os.path.exists(path):
+                    os.replace(path, path + ".pre-restore")
+                    moved.append((path, path + ".pre-restore"))
+            os.replace(staged[name], name)
+            del staged[name]  # Only once it's live: a failed swap still cleans up its temp file
+            swapped.append(name)
+    except Exception as e:
+        for name in swapped:
+            os.remove(name)
+        for path, backup_path in reversed(moved):
+            os.replace(backup_path, path)
+        for tmp_path in staged.values():
+            os.remove(tmp_path)
+        print(f"❌ Restore failed, rolled back: {e}")
+        return 1
+
+    elapsed = time.monotonic() - started
+    created = datetime.datetime.fromisoformat(load_manifest(sid)["created_at"])
+    print(f"✅ Restored {len(targets)} files from {sid} (taken {created:%Y-%m-%d %H:%M}) in {elapsed:.1f}s")
+    for name in targets:
+        print(f"   - {name}")
+    if moved:
+        print("   Previous versions kept as *.pre-restore")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Jarvis backup restore tool (stop the bot before restoring).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="List snapshots").set_defaults(func=cmd_list)
+    p = sub.add_parser("verify", help="Check checksums + PRAGMA integrity_check")
+    p.add_argument("snapshot", nargs="?", default="latest")
+    p.set_defaults(func=cmd_verify)
+    p = sub.add_parser("restore", help="Atomically restore a snapshot")
+    p.add_argument("snapshot", nargs="?", default="latest")
+    p.add_argument("--files", nargs="+", help="Only restore these files (default: all in the snapshot)")
+    p.set_defaults(func=cmd_restore)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args) or 0)
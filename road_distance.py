@@ -0,0 +1,117 @@
+import json
+import math
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# OFFLINE ROAD DISTANCE MODEL (Detour Grid)
+# ==========================================
+# Straight-line distance badly underestimates Delhi travel (flyovers, one-ways,
+# river crossings), so quotes multiply the Haversine distance by a "detour factor"
+# (road_km / straight_km). Out of the box that is a FIXED factor (DEFAULT_DETOUR,
+# SHORT_TRIP_DETOUR): the taxi flow is simulated, so there are no real trips to learn
+# from. If SAMPLES_FILE exists (measured road distances, e.g. exported from a maps
+# API), per-grid-cell factors are derived from it at startup.
+# No routing API, pure dict lookups -> sub-millisecond quotes.
+
+SAMPLES_FILE = "road_samples.json"  # [{"from": [lat, lon], "to": [lat, lon], "road_km": 12.4}, ...]
+CELL_DEG = 0.02                     # ~2.2 km cells around Delhi NCR
+
+# Priors (used until samples exist for a cell)
+DEFAULT_DETOUR = 1.38    # Typical Indian metro city circuity
+SHORT_TRIP_DETOUR = 1.6  # Short hops detour the most (U-turns, one-ways)
+SHORT_TRIP_KM = 2.0
+MIN_SAMPLES = 2          # Samples needed before trusting a cell pair
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    R = 6371  # Earth radius in km
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
+    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+
+
+def _cell(lat, lon):
+    return (int(math.floor(lat / CELL_DEG)), int(math.floor(lon / CELL_DEG)))
+
+
+def _median(values):
+    values = sorted(values)
+    mid = len(values) // 2
+    if len(values) % 2:
+        return values[mid]
+    return (values[mid - 1] + values[mid]) / 2
+
+
+class RoadDistanceEstimator:
+    def __init__(self, samples_file=SAMPLES_FILE):
+        self.samples_file = samples_file
+        self.pair_ratios = {}  # (cell_a, cell_b) -> [ratios]
+        self.cell_ratios = {}  # cell -> [ratios]
+        self.all_ratios = []
+        self._factors = {}  # (cell_a, cell_b) -> factor; cleared whenever samples change
+        self._load_samples()
+
+    def _load_samples(self):
+        if not os.path.exists(self.samples_file):
+            return
+        try:
+            with open(self.samples_file, "r", encoding="utf-8") as f:
+                samples = json.load(f)
+            for s in samples:
+                self.add_sample(s["from"][0], s["from"][1], s["to"][0], s["to"][1], s["road_km"])
+            logger.info(f"🛣️ Road Model: learned from {len(self.all_ratios)} sample trips.")
+        except Exception as e:
+            logger.error(f"Road Sample Load Error: {e}")
+
+    def add_sample(self, lat1, lon1, lat2, lon2, road_km):
+        """Feeds one trip with a measured road distance into the grid."""
+        straight = haversine_km(lat1, lon1, lat2, lon2)
+        if straight < 0.2 or not road_km:
+            return  # Too short to say anything about circuity
+        ratio = max(1.0, min(3.0, road_km / straight))  # Clamp GPS junk
+
+        a, b = _cell(lat1, lon1), _cell(lat2, lon2)
+        self.pair_ratios.setdefault(tuple(sorted((a, b))), []).append(ratio)
+        self.cell_ratios.setdefault(a, []).append(ratio)
+        self.cell_ratios.setdefault(b, []).append(ratio)
+        self.all_ratios.append(ratio)
+        self._factors.clear()
+
+    def _factor(self, cell_a, cell_b):
+        """Detour factor between two cells (cached per cell pair)."""
+        key = (cell_a, cell_b)
+        if key not in self._factors:
+            self._factors[key] = self._compute_factor(cell_a, cell_b)
+        return self._factors[key]
+
+    def _compute_factor(self, cell_a, cell_b):
+        # 1. Exact cell pair
+        ratios = self.pair_ratios.get(tuple(sorted((cell_a, cell_b))), [])
+        if len(ratios) >= MIN_SAMPLES:
+            return _median(ratios)
+
+        # 2. Average of the two endpoint cells
+        ends = [_median(self.cell_ratios[c]) for c in (cell_a, cell_b)
+                if len(self.cell_ratios.get(c, [])) >= MIN_SAMPLES]
+        if ends:
+            return sum(ends) / len(ends)
+
+        # 3. City-wide learned value, else prior
+        if len(self.all_ratios) >= MIN_SAMPLES:
+            return _median(self.all_ratios)
+        return DEFAULT_DETOUR
+
+    def road_km(self, lat1, lon1, lat2, lon2):
+        """Estimated driving distance in km (rounded like the old Haversine quote)."""
+        straight = haversine_km(lat1, lon1, lat2, lon2)
+        factor = self._factor(_cell(lat1, lon1), _cell(lat2, lon2))
+        if straight < SHORT_TRIP_KM:
+            factor = max(factor, SHORT_TRIP_DETOUR)
+        return round(straight * factor, 1)
+
+
+road_estimator = RoadDistanceEstimator()
@@ -1,32 +1,53 @@
 import json
 import os
+import atexit
+import tempfile
+import threading
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
 ROUTINE_FILE = "user_routines.json"
+PATTERNS_FILE = "routine_patterns.json"  # The Analyst's list output (was clobbering ROUTINE_FILE)
+SAVE_DELAY = float(os.getenv("ROUTINE_SAVE_DELAY", "2.0"))  # Seconds; bursts of changes = one write
+
+def atomic_write_json(path, data):
+    """temp file in the same dir + os.replace: readers (and crashes) never see half a file."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp_", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
 
 class RoutineManager:
     def __init__(self):
+        self._lock = threading.RLock()
+        self._timer = None
         self.routines = self._load_routines()
-        
+        self._dnd = {}        # user -> datetime (parsed once, not every minute)
+        self._end_index = {}  # (user, day, "HH:MM") -> [labels ending then]
+        self._rebuild_index()
+        atexit.register(self.flush)
+
     def _load_routines(self):
         if not os.path.exists(ROUTINE_FILE):
             return {}
         try:
             with open(ROUTINE_FILE, 'r') as f:
                 data = json.load(f)
-                
-                # [FIX] Handle Corrupted Data (List vs Dict)
+
+                # Legacy: the Analyst used to overwrite this file with its pattern list
                 if isinstance(data, list):
-                     logger.warning("⚠️ Routine File is a LIST (Corrupted). Resetting to empty dict.")
-                     # FIX: Write the clean dict back to disk immediately to stop future warnings
-                     self.routines = {}
-                     with open(ROUTINE_FILE, 'w') as out:
-                         json.dump({}, out, indent=4)
+                     logger.warning("⚠️ Routine File is a LIST (old Analyst output). Resetting to empty dict.")
+                     self._schedule_save()
                      return {}
-                     
+
                 # Validation: Ensure all values are dicts
                 valid_data = {}
                 for k, v in data.items():
@@ -39,13 +60,48 @@ class RoutineManager:
             logger.error(f"Routine Load Error: {e}")
             return {}
 
-    def _save_routines(self):
-        with open(ROUTINE_FILE, 'w') as f:
-            json.dump(self.routines, f, indent=4)
+    def _rebuild_index(self):
+        self._dnd.clear()
+        self._end_index.clear()
+        for user, data in self.routines.items():
+            if data.get("dnd_until"):
+                self._dnd[user] = datetime.fromisoformat(data["dnd_until"])
+            for day, items in (data.get("weekly") or {}).items():
+                for item in items:
+                    self._index_item(user, day, item)
+
+    def _index_item(self, user, day, item):
+        if item.get("end"):
+            self._end_index.setdefault((user, day, item["end"]), []).append(item["label"])
+
+    # --- Persistence (debounced) ---
+    def _schedule_save(self):
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Timer(SAVE_DELAY, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Writes pending changes now (timer callback, atexit, or tests)."""
+        with self._lock:
+            if self._timer is None:
+                return
+            self._timer.cancel()
+            self._timer = None
+            data = json.dumps(self.routines)  # Snapshot under the lock
+        try:
+            atomic_write_json(ROUTINE_FILE, data)
+        except Exception as e:
+            logger.error(f"Routine Save Error: {e}")
 
     def get_routines(self):
         return self.routines
 
+    def _user(self, user_phone):
+        user_phone = str(user_phone)
+        return user_phone, self.routines.setdefault(user_phone, {"dnd_until": None, "weekly": {}})
+
     def add_routine(self, user_phone, day_of_week, start_time, end_time, label):
         """
         Adds a learned routine.
@@ -54,69 +110,82 @@ class RoutineManager:
         end_time: "HH:MM" (item end)
         label: "Lecture", "Gym", "Meeting"
         """
-        if user_phone not in self.routines:
-            self.routines[user_phone] = {"dnd_until": None, "weekly": {}}
-            
-        user_weekly = self.routines[user_phone].setdefault("weekly", {})
-        day_routines = user_weekly.setdefault(day_of_week, [])
-        
-        # Check duplicates
-        for r in day_routines:
-            if r['start'] == start_time and r['label'] == label:
-                return # Already exists
-                
-        day_routines.append({
-            "start": start_time,
-            "end": end_time,
-            "label": label,
-            "confidence": 1  # Can increment this for reinforcement
-        })
-        self._save_routines()
+        with self._lock:
+            user_phone, user_data = self._user(user_phone)
+            day_routines = user_data.setdefault("weekly", {}).setdefault(day_of_week, [])
+
+            # Check duplicates
+            for r in day_routines:
+                if r['start'] == start_time and r['label'] == label:
+                    return # Already exists
+
+            item = {
+                "start": start_time,
+                "end": end_time,
+                "label": label,
+                "confidence": 1  # Can increment this for reinforcement
+            }
+            day_routines.append(item)
+            self._index_item(user_phone, day_of_week, item)
+        self._schedule_save()
         logger.info(f"📅 Added Routine for {user_phone}: {day_of_week} {start_time}-{end_time} ({label})")
 
     def set_dnd(self, user_phone, until_dt):
         """Sets extensive Do Not Disturb until specific datetime."""
-        if user_phone not in self.routines:
-            self.routines[user_phone] = {"dnd_until": None, "weekly": {}}
-            
-        self.routines[user_phone]["dnd_until"] = until_dt.isoformat()
-        self._save_routines()
+        with self._lock:
+            user_phone, user_data = self._user(user_phone)
+            user_data["dnd_until"] = until_dt.isoformat()
+            self._dnd[user_phone] = until_dt
+        self._schedule_save()
         logger.info(f"🤫 DND Set for {user_phone} until {until_dt}")
 
+    def is_dnd(self, user_phone, current_dt):
+        until = self._dnd.get(str(user_phone))
+        return bool(until and current_dt < until)
+
     def check_routine_triggers(self, user_phone, current_dt):
         """
         Checks if:
         1. DND just finished (Welcome Back).
         2. A routine is about to start or just finished.
         """
+        user_phone = str(user_phone)
         triggers = []
-        user_data = self.routines.get(user_phone)
-        if not user_data: return []
-        
+
         # 1. Check DND
-        dnd_str = user_data.get("dnd_until")
-        if dnd_str:
-            dnd_dt = datetime.fromisoformat(dnd_str)
-            if current_dt > dnd_dt:
-                # DND Expired!
-                triggers.append({"type": "dnd_expired", "context": "User is free now via DND expiry"})
-                user_data["dnd_until"] = None # Clear it
-                self._save_routines()
+        dnd_dt = self._dnd.get(user_phone)
+        if dnd_dt and current_dt > dnd_dt:
+            # DND Expired!
+            triggers.append({"type": "dnd_expired", "context": "User is free now via DND expiry"})
+            with self._lock:
+                self._dnd.pop(user_phone, None)
+                self.routines[user_phone]["dnd_until"] = None # Clear it
+            self._schedule_save()
 
         # 2. Check Weekly Routines
-        day_name = current_dt.strftime("%A")
-        time_str = current_dt.strftime("%H:%M")
-        
-        daily_items = user_data.get("weekly", {}).get(day_name, [])
-        for item in daily_items:
-            # POST-ACTIVITY CHECK (e.g. Lecture just finished)
-            # Simple check: if current time matches end time
-            if item['end'] == time_str:
-                triggers.append({
-                    "type": "activity_finished", 
-                    "label": item['label']
-                })
-        
+        # POST-ACTIVITY CHECK (e.g. Lecture just finished): exact end-time lookup
+        key = (user_phone, current_dt.strftime("%A"), current_dt.strftime("%H:%M"))
+        for label in self._end_index.get(key, []):
+            triggers.append({
+                "type": "activity_finished",
+                "label": label
+            })
+
         return triggers
 
+    # --- Analyst Patterns (global list, separate file) ---
+    def get_patterns(self):
+        try:
+            with open(PATTERNS_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, list) else []
+        except (OSError, ValueError):
+            return []
+
+    def save_patterns(self, patterns):
+        try:
+            atomic_write_json(PATTERNS_FILE, json.dumps(patterns, indent=2))
+        except Exception as e:
+            logger.error(f"Routine Patterns Save Error: {e}")
+
 routine_db = RoutineManager()
@@ -0,0 +1,162 @@
+import os
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+
+from database_adapter import db
+from gemini_engine import embed_texts
+
+logger = logging.getLogger(__name__)
+
+# Optional: without numpy, recall() quietly returns [] and the bot works as before
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+    logger.warning("⚠️ numpy not installed. Semantic memory disabled.")
+
+# ==========================================
+# SEMANTIC LONG-TERM MEMORY
+# ==========================================
+# history rows are embedded in the background (batchEmbedContents, 100/call) and stored
+# in history.embedding as float16 blobs (768 dims -> 1.5KB/row instead of ~10KB of JSON text).
+# Each user gets an in-memory L2-normalised matrix; recall() is one mat-vec + top-k.
+
+EMBED_BATCH = 100
+EMBED_MIN_CHARS = 15        # "ok", "hi" etc. are not worth recalling
+RECALL_MIN_SCORE = float(os.getenv("RECALL_MIN_SCORE", "0.6"))
+
+
+def to_blob(vector):
+    return np.asarray(vector, dtype=np.float16).tobytes()
+
+def from_blob(blob):
+    return np.frombuffer(blob, dtype=np.float16)
+
+
+class UserVectorIndex:
+    def __init__(self):
+        self.ids = []
+        self.texts = []
+        self.matrix = None  # (n, dim) float32, rows L2-normalised
+        self.last_id = 0
+
+    def extend(self, rows):
+        """rows: [(id, role, content, blob)] in id order."""
+        vecs = []
+        for hid, role, content, blob in rows:
+            vec = from_blob(blob).astype(np.float32)
+            norm = np.linalg.norm(vec)
+            if not norm:
+                continue
+            vecs.append(vec / norm)
+            self.ids.append(hid)
+            self.texts.append(f"{'User' if role == 'user' else 'Jarvis'}: {content}")
+        if rows:
+            self.last_id = rows[-1][0]
+        if vecs:
+            block = np.vstack(vecs)
+            self.matrix = block if self.matrix is None else np.vstack([self.matrix, block])
+
+    def top_k(self, query_vec, k, before_id=None):
+        if self.matrix is None:
+            return []
+        scores = self.matrix @ query_vec
+        if before_id is not None:
+            # Rows newer than before_id are already in the prompt as raw turns
+            cutoff = int(np.searchsorted(np.asarray(self.ids), before_id, side="right"))
+            scores = scores[:cutoff]
+        if not len(scores):
+            return []
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(float(scores[i]), self.ids[i], self.texts[i]) for i in best]
+
+
+class SemanticMemory:
+    def __init__(self, max_users=200):
+        self.max_users = max_users
+        self.indexes = OrderedDict()      # user_id -> UserVectorIndex (LRU)
+        self._query_cache = OrderedDict() # query text -> normalised vector
+        self._lock = threading.Lock()     # _index runs in worker threads (see recall)
+
+    def _index(self, user_id):
+        """Loads lazily, then only pulls rows embedded since the last call. Blocking (sqlite + gzip)."""
+        with self._lock:
+            return self._index_locked(user_id)
+
+    def _index_locked(self, user_id):
+        idx = self.indexes.get(user_id)
+        if idx is None:
+            idx = UserVectorIndex()
+            self.indexes[user_id] = idx
+            while len(self.indexes) > self.max_users:
+                self.indexes.popitem(last=False)
+            # Turns compacted into history_archive keep their vectors: load those first
+            archived = db.get_archived_embeddings(user_id)
+            if archived:
+                idx.extend(sorted(archived))
+        self.indexes.move_to_end(user_id)
+        fresh = db.get_embedded_history(user_id, idx.last_id)
+        if fresh:
+            idx.extend(fresh)
+        return idx
+
+    async def embed_pending(self, keys):
+        """Background: embeds one batch of new history rows. Returns rows processed."""
+        if not HAS_NUMPY:
+            return 0
+        rows = db.get_unembedded(EMBED_BATCH)
+        if not rows:
+            return 0
+
+        skipped = [(hid, b"") for hid, _, content in rows if len((content or "").strip()) < EMBED_MIN_CHARS]
+        todo = [(hid, content) for hid, _, content in rows if len((content or "").strip()) >= EMBED_MIN_CHARS]
+
+        saved = list(skipped)
+        if todo:
+            vectors = None
+            for key in keys:
+                vectors = await embed_texts([c[:2000] for _, c in todo], key)
+                if vectors:
+                    break
+            if not vectors or len(vectors) != len(todo):
+                return 0  # Retry next run (a short answer would leave holes behind the index watermark)
+            saved += [(hid, to_blob(vec)) for (hid, _), vec in zip(todo, vectors)]
+
+        db.save_embeddings(saved)
+        logger.info(f"🧬 Embedded {len(todo)} history rows ({len(skipped)} skipped)")
+        return len(rows)
+
+    async def _query_vector(self, query, keys):
+        vec = self._query_cache.get(query)
+        if vec is not None:
+            return vec
+        for key in keys:
+            vectors = await embed_texts([query], key, task_type="RETRIEVAL_QUERY")
+            if vectors:
+                vec = np.asarray(vectors[0], dtype=np.float32)
+                vec /= (np.linalg.norm(vec) or 1.0)
+                self._query_cache[query] = vec
+                while len(self._query_cache) > 256:
+                    self._query_cache.popitem(last=False)
+                return vec
+        return None
+
+    async def recall(self, user_id, query, keys, k=3, before_id=None):
+        """Top-k old turns most similar to `query` (score >= RECALL_MIN_SCORE), best first."""
+        if not HAS_NUMPY or not query:
+            return []
+        # First load decompresses the user's archive: keep it off the event loop
+        idx = await asyncio.to_thread(self._index, str(user_id))
+        if idx.matrix is None:
+            return []
+        qvec = await self._query_vector(query, keys)
+        if qvec is None or qvec.shape[0] != idx.matrix.shape[1]:
+            return []
+        return [text for score, _, text in idx.top_k(qvec, k, before_id) if score >= RECALL_MIN_SCORE]
+
+semantic_memory = SemanticMemory()
@@ -1,121 +1,13 @@
 import urllib.parse
+from slang_engine import SLANG_MAP, match_slang
 
 # ==========================================
 # AMAZON SHOPPING ENGINE
 # ==========================================
 
 # MAPPING: GenX/Brainrot Slang -> Real Amazon Search Terms
-GENX_SLANG_MAP = {
-    "horny": "adult toys",
-    "sex": "adult wellness",
-    "porn": "adult novelties",
-    "xxx": "adult party accessories",
-    "lube": "personal lubricant",
-    "condom": "condoms",
-    "gyat": "lingerie",
-    "rizz": "grooming kit",
-    "drip": "streetwear fashion",
-    "sus": "among us merch",
-    "sigma": "patrick bateman poster",
-    "baddie": "trendy fashion women",
-    "rand": "adult wellness",
-    "randi": "adult wellness", 
-    "chinnal": "adult wellness",
-    "raand": "adult wellness",
-    "gb road": "adult wellness", 
-    "tharki": "adult party accessories",   # Context: "Lusty" -> Fun/Party
-    "hawas": "adult wellness",            # Context: "Lust"
-    "hila": "personal lubricant",         # Context: "To shake/hand solo"
-    "mutth": "personal lubricant",        # Context: "Hand solo"
-    "blue film": "adult novelties",
-    "nude": "art & photography books",    # Safe mapping
-    "nudes": "art & photography books",
-    "leaked": "security software",        # Divert to safety/security
-    "mms": "security software",
-    "viral": "trending fashion",
-    
-    # --- Meme/Misspelled NSFW (Very Common in India) ---
-    "bobs": "lingerie",                   # Meme spelling for "Boobs"
-    "vegana": "adult wellness",           # Meme spelling for "Vagina"
-    "vegna": "adult wellness",
-    "sax": "adult wellness",              # Common misspelling
-    "sux": "adult wellness",
-    "fuddi": "adult wellness",
-    "lund": "adult novelties",
-    "chut": "adult wellness",
-    "boob": "lingerie",
-    "chooche": "lingerie",
-    "saax": "adult wellness",
-    # --- Existing (Preserved) ---
-    "horny": "adult toys",
-    "sex": "adult wellness",
-    "porn": "adult novelties",
-    "xxx": "adult party accessories",
-    "lube": "personal lubricant",
-    "condom": "condoms",
-    "gyat": "shapewear & lingerie",  # Updated for accuracy (often refers to curves)
-    "rizz": "grooming kit & cologne",
-    "drip": "streetwear & sneakers",
-    "sus": "security cameras & mystery games",
-    "sigma": "gym gear & suits",
-    "baddie": "trendy fashion & makeup",
-
-    # --- Global Gen Z Slang ---
-    "delulu": "manifestation journals",
-    "aesthetic": "room decor & lighting",
-    "slay": "party wear & high heels",
-    "touch grass": "camping gear & plants",
-    "cottagecore": "floral dresses & gardening tools",
-    "goblincore": "thrifty fashion & mushroom decor",
-    "normcore": "basic tees & jeans",
-    "simp": "flowers & chocolates",
-    "cap": "hats & caps", # Pun mapping
-    "no cap": "authentic brands",
-    "bet": "gaming consoles",
-    "yeet": "sports equipment",
-    "finna": "travel accessories",
-    "glow up": "skincare & haircare",
-    "gatekeep": "exclusive releases",
-    "girl math": "sale items & bundles",
-    "boy math": "investment books & tools",
-    "main character": "statement jewelry & sunglasses",
-    "npc": "plain t-shirts & cargo pants",
-    "tea": "kettles & tea sets",
-    "salty": "snacks & savory food",
-    "ghost": "horror books & halloween costumes",
-    "ick": "cleaning supplies",
-    "mid": "budget friendly items",
-    "cheugy": "vintage & retro items",
-    "dank": "gaming merch & posters",
-    "based": "classic literature & philosophy",
-
-    # --- Indian Local & Internet Slang ---
-    "jugaad": "DIY tools & repair kits",
-    "chapri": "neon hair dye & flashy sunglasses", # Context: flashy/kitschy style
-    "nibba": "couple gifts & teddy bears",
-    "nibbi": "couple gifts & chocolates",
-    "scene": "event tickets & party supplies",
-    "sorted": "organizers & planners",
-    "vella": "video games & board games",
-    "timepass": "snacks & puzzle books",
-    "paisa vasool": "value packs & discounts",
-    "kanjoos": "piggy banks & budget planners",
-    "pataka": "party poppers & festival wear",
-    "dhinchak": "sequin clothing & bling",
-    "bhau": "thick chains & bracelets",
-    "machayenge": "speakers & sound systems",
-    "bindass": "adventure gear",
-    "ghanta": "alarm clocks", # Pun mapping
-    "bhasad": "stress balls & fidget toys",
-    "shag": "coffee & energy drinks", # Note: In India, often means 'exhausted'
-    "bt": "headache balm & comfort food", # 'Bad Trip' (Bad mood/situation)
-    "moye moye": "sad playlist headphones & tissues",
-    "system": "smartwatches & tech gadgets", # Elvish Yadav/Systumm context
-    "systumm": "loudspeakers & car accessories",
-    "bawa": "mens grooming & accessories", # Parsi/Bombay slang
-    "kadak": "strong coffee & premium tea",
-    "kalti": "travel bags & luggage",
-}
+# Consolidated with ContextEngine's table in slang_engine (compiled once at import)
+GENX_SLANG_MAP = SLANG_MAP
 
 def generate_amazon_link(query):
     """Generates an Amazon Search URL with Affiliate Tag."""
@@ -135,13 +27,11 @@ async def handle_shopping(text, user_phone, send_msg_func, refined_query=None, m
     search_query = clean_text
     
     # Check for slang first (overrides context if specific)
-    import re
     slang_term = None
-    for slang, mapped_term in GENX_SLANG_MAP.items():
-        if re.search(r'\b' + re.escape(slang) + r'\b', clean_text):
-            slang_term = slang
-            search_query = GENX_SLANG_MAP[slang_term]
-            break
+    slang = match_slang(clean_text)
+    if slang:
+        slang_term = slang.term
+        search_query = slang.rewrite
             
     # If no slang and query is vague (e.g. "shoes", "gift", "clothes"), refine it.
     is_vague = len(clean_text.split()) < 3 and not slang_term
@@ -1,20 +1,38 @@
-import requests
-import urllib.parse
-import json
 import os
+import logging
+from network_utils import get_client, TTLCache
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_TTL = 600   # 10 min (RapidAPI quota is precious)
+DETAILS_CACHE_TTL = 3600
 
 class AmazonAPI:
     def __init__(self):
         self.api_key = os.getenv("RAPID_AMAZON_KEY", "YOUR_RAPID_API_KEY")
         self.host = "real-time-amazon-data.p.rapidapi.com"
         self.base_url = "https://real-time-amazon-data.p.rapidapi.com"
+        self.headers = {
+            "x-rapidapi-key": self.api_key,
+            "x-rapidapi-host": self.host
+        }
+        # (query, page, sort, country) -> products
+        self.search_cache = TTLCache(ttl=SEARCH_CACHE_TTL, max_items=200)
+        self.details_cache = TTLCache(ttl=DETAILS_CACHE_TTL, max_items=500)
 
-    def search_products(self, query, country="IN", page=1, sort_by="RELEVANCE"):
+    async def search_products(self, query, country="IN", page=1, sort_by="RELEVANCE"):
         """
         Fetches product search results from Amazon via RapidAPI.
+        Cached per (query, page, sort, country); identical in-flight queries share one call.
         """
+        key = (query.lower().strip(), int(page), sort_by, country)
+        products = await self.search_cache.get_or_fetch(
+            key, lambda: self._fetch_search(query, country, page, sort_by)
+        )
+        return products or []
+
+    async def _fetch_search(self, query, country, page, sort_by):
         url = f"{self.base_url}/search"
-        
         querystring = {
             "query": query,
             "page": str(page),
@@ -22,36 +40,32 @@ class AmazonAPI:
             "sort_by": sort_by
         }
 
-        headers = {
-            "x-rapidapi-key": self.api_key,
-            "x-rapidapi-host": self.host
-        }
-
         try:
-            response = requests.get(url, headers=headers, params=querystring, timeout=10)
+            response = await get_client().get(url, headers=self.headers, params=querystring, timeout=10.0)
             if response.status_code == 200:
                 data = response.json()
                 return data.get("data", {}).get("products", [])
             else:
-                print(f"Amazon API Error {response.status_code}: {response.text}")
+                logger.warning(f"Amazon API Error {response.status_code}: {response.text[:200]}")
                 return []
         except Exception as e:
-            print(f"Amazon API Exception: {e}")
+            logger.error(f"Amazon API Exception: {e}")
             return []
 
-    def get_product_details(self, asin, country="IN"):
+    async def get_product_details(self, asin, country="IN"):
         """
         Fetches detailed info for a specific ASIN.
         """
+        return await self.details_cache.get_or_fetch(
+            (asin, country), lambda: self._fetch_details(asin, country)
+        )
+
+    async def _fetch_details(self, asin, country):
         url = f"{self.base_url}/product-details"
         querystring = {"asin": asin, "country": country}
-        headers = {
-            "x-rapidapi-key": self.api_key,
-            "x-rapidapi-host": self.host
-        }
-        
+
         try:
-            response = requests.get(url, headers=headers, params=querystring, timeout=10)
+            response = await get_client().get(url, headers=self.headers, params=querystring, timeout=10.0)
             if response.status_code == 200:
                 return response.json().get("data", {})
             return None
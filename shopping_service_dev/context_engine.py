@@ -1,104 +1,12 @@
 import re
+from slang_engine import SLANG_MAP, match_slang
 
 class ContextEngine:
     def __init__(self):
         # Comprehensive Slang Mapping (Source: Reddit, Indian Internet, GenZ)
-        self.slang_map = {
-            # --- Explicit / Intimate (Amazon Specific) ---
-            "sex toys": "personal body wand massager vibration",
-            "vibrator": "cordless body massager for women",
-            "dildo": "silicone body massager tool",
-            "fleshlight": "male stimulation sleeve",
-            "fuck my date": "condoms and massage oil", 
-            "i wanna fuck": "condoms and lubricants",
-            "horny": "adult pleasure accessories",
-            "masturbate": "personal massager vibration",
-            "sex": "intimate wellness products",
-            "toys": "personal body massager",
-            "lubricant": "personal lubricant gel",
-            "oil": "sensual massage oil",
-            "condom": "durex condoms for men",
-            
-            # --- Indian Locality / Desi Internet Slang ---
-            "chapri": "neon sunglasses and skinny jeans",  # Stereotypical fashion
-            "nibba": "large teddy bear gift",             # "Couple" gifts
-            "nibbi": "chocolates and heart pillow",
-            "jugaad": "diy repair tool kit",
-            "systumm": "loud bass speakers",              # Elvish Yadav / Car culture
-            "system": "smartwatches and gadgets",
-            "mahaul": "party speakers and disco lights",
-            "scene": "party wear clothes",                # "Kya scene hai?" -> Party
-            "shag": "energy drinks",                      # Indian context: "Too tired/shagged" -> Energy
-            "bt": "headache balm and stress relief",      # "Bad Trip" -> Stress relief
-            "bhasad": "fidget toys for stress",
-            "kalti": "travel bags",                       # "Kalti maar" -> Travel/Escape
-            "pataka": "ethnic party wear for women",
-            "tot": "crop tops and trendy fashion",        # "Totta"
-            "kadak": "premium intense coffee",
-            "bawa": "leather jackets and accessories",    # Parsi/Mumbai slang
-            "dhinchak": "sequin shiny clothing",
-            "timepass": "snacks and munchies",
-            
-            # --- Reddit / Global GenZ / Internet Culture ---
-            "drip": "streetwear aesthetics",
-            "riz": "men's grooming kit",
-            "rizz": "men's grooming and perfume",
-            "gymrat": "creatine and whey protein",
-            "touch grass": "hiking gear and camping",
-            "based": "gigachad meme merch",
-            "delulu": "manifestation journal",
-            "aesthetic": "sunset lamp and vines",
-            "coquette": "bows and lace dresses",
-            "cottagecore": "floral dresses and tea sets",
-            "dark academia": "tweed blazers and fountain pens",
-            "goblincore": "mushroom decor and earthy clothes",
-            "normcore": "plain white tees and denim",
-            "old money": "polo shirts and linen trousers",
-            "y2k": "baggy jeans and baby tees",
-            "simp": "bouquets and chocolates",
-            "girl math": "sale items under 500",
-            "boy math": "expensive gaming consoles",
-            "cap": "baseball caps",
-            "no cap": "authentic branded shoes",
-            "slay": "party heels and dresses",
-            "main character": "sunglasses and statement jewelry",
-            "npc": "grey hoodies and plain cargo pants",
-            "sus": "spy cameras",
-            "yeet": "throwing frisbee",
-            "uwu": "kawaii plushies and anime merch",
-            "waifu": "anime body pillow",
-            "ick": "cleaning supplies and hygiene",
-            "mid": "budget earphones",                    # "Mid" -> Average/Budget
-            
-            # --- Trendy / Viral / Aesthetics ---
-            "trendy": "viral trending products instagram",
-            "viral": "tiktok made me buy it products",
-            "hot": "bestsellers current month",
-            "cool": "newest tech gadgets",
-            "latest": "new launch products 2024",
-            "fyp": "trending aesthetically pleasing items",
-            "aesthetic": "pinterest room decor",
-            "pinterest": "aesthetic room decor and outfits",
-            "instagramable": "photogenic props and lighting",
-            "influencer": "ring lights and tripods",
-            
-            # --- Rich / Luxury / Status ---
-            "rich": "luxury branded watches and perfumes",
-            "classy": "minimalist old money outfits",
-            "premium": "high end electronics",
-            "lux": "luxury home decor gold accents",
-            "expensive": "branded designer accessories",
-            "flex": "apple products and accessories",
-            "status": "premium leather goods",
-            "boujee": "high end fashion accessories",
-            
-            # --- Tech / Gaming Specific ---
-            "pc mr": "rtx graphic cards",                 # PC Master Race
-            "console peasant": "playstation 5 games",
-            "keeb": "mechanical keyboard",
-            "battlestation": "rgb led strips",
-            "setup": "monitor arms and desk mats",
-        }
+        # Shared table + compiled matcher live in slang_engine (also used by shopping_engine)
+        self.slang_map = SLANG_MAP
+
     def analyze_context(self, text, mood=None, past_history=None):
         """
         Extracts:
@@ -124,16 +32,14 @@ class ContextEngine:
                  pass # Logic to bias vague terms
 
         # 1. Slang Detection & Mapping
-        # Sort by length to match longer phrases first (e.g. "fuck my date" before "fuck")
+        # Compiled trie returns the longest phrase (e.g. "fuck my date" before "fuck") in one pass
         cleaned = text.lower()
-        sorted_keys = sorted(self.slang_map.keys(), key=len, reverse=True)
-        
-        for slang in sorted_keys:
-            if slang in cleaned:
-                # If specific slang found, override query or append
-                analysis["query"] = self.slang_map[slang]
-                analysis["is_slang"] = True
-                break
+        slang = match_slang(cleaned)
+        if slang:
+            # If specific slang found, override query
+            analysis["query"] = slang.rewrite
+            analysis["is_slang"] = True
+            analysis["slang_category"] = slang.category
 
         # 1.5 Clean Noise/Fillers
         # Remove common non-search words to avoid generic searches
@@ -175,8 +81,4 @@ class ContextEngine:
 
     def is_slang_detected(self, text):
         """Public check for slang existence."""
-        cleaned = text.lower()
-        # Fast generic check first
-        for s in self.slang_map:
-             if s in cleaned: return True
-        return False
+        return match_slang(text) is not None
@@ -0,0 +1,86 @@
+import re
+from array import array
+from itertools import compress
+
+_PRICE_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+def parse_price(raw):
+    """'₹1,299.00' / '$12' / 1299 -> float. Missing/unparsable -> 0 (never filtered out)."""
+    if raw is None:
+        return 0.0
+    if isinstance(raw, (int, float)):
+        return float(raw)
+    m = _PRICE_RE.search(str(raw))
+    return float(m.group(0).replace(",", "")) if m else 0.0
+
+def _to_float(raw):
+    try:
+        return float(raw or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _to_int(raw):
+    try:
+        return int(str(raw or 0).replace(",", ""))
+    except (TypeError, ValueError):
+        return 0
+
+
+class ProductColumns:
+    """
+    Columnar store for one search's products.
+    Each product is parsed ONCE on arrival (price, rating, reviews, prime, score);
+    ranking / budget filtering / re-sorting then only touch the typed arrays.
+    stdlib array on purpose: a stream holds ~100 rows at most, where numpy (an optional
+    extra here, used only by semantic memory) would add import cost and no speed.
+    """
+    def __init__(self):
+        self.products = []          # Raw dicts (for the card renderer)
+        self.price = array("d")
+        self.rating = array("d")
+        self.reviews = array("q")
+        self.prime = array("b")
+        self.score = array("d")     # rating * sqrt(reviews), precomputed
+
+    def __len__(self):
+        return len(self.products)
+
+    def extend(self, products):
+        """Normalises a batch from AmazonAPI. Returns the range of new row indices."""
+        start = len(self.products)
+        for p in products:
+            rating = _to_float(p.get("product_star_rating"))
+            reviews = _to_int(p.get("product_num_ratings"))
+            self.products.append(p)
+            self.price.append(parse_price(p.get("product_price")))
+            self.rating.append(rating)
+            self.reviews.append(reviews)
+            self.prime.append(1 if p.get("is_prime") else 0)
+            # Simple Score: Square-root review count boost * Star rating
+            self.score.append(rating * (reviews ** 0.5))
+        return range(start, len(self.products))
+
+    def rank(self, rows=None, budget=None):
+        """
+        Row indices sorted by score (desc), optionally limited to `rows` and price <= budget.
+        Works purely on the columns: no re-parsing, no re-fetching.
+        """
+        if rows is None:
+            rows = range(len(self.products))
+        if budget:
+            price = self.price
+            rows = list(compress(rows, [price[i] <= budget for i in rows]))
+        return sorted(rows, key=self.score.__getitem__, reverse=True)
+
+    def retain(self, rows):
+        """
+        Drops every row not in `rows` (kept in their current order).
+        Returns {old_index: new_index} so callers can remap their row lists.
+        """
+        keep = sorted(set(rows))
+        remap = {old: new for new, old in enumerate(keep)}
+        self.products = [self.products[i] for i in keep]
+        for name in ("price", "rating", "reviews", "prime", "score"):
+            col = getattr(self, name)
+            setattr(self, name, array(col.typecode, (col[i] for i in keep)))
+        return remap
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+from .product_columns import ProductColumns
+
+logger = logging.getLogger(__name__)
+
+class ProductStream:
+    """
+    Lazy, paginated view over RapidAPI search results for ONE shopping session.
+    - Fetches further pages only when the user gets close to the end.
+    - Ranks each page as it arrives (already-shown cards never move).
+    - Dedupes ASINs across pages.
+    - Holds at most `max_buffer` products (older cards slide out of the window).
+    - Parses every product once into ProductColumns; budget refinements re-rank those columns.
+    """
+    def __init__(self, api, ctx, max_pages=5, max_buffer=60, prefetch_within=3):
+        self.api = api
+        self.ctx = ctx
+        self.query = ctx["query"]
+        self.max_pages = max_pages
+        self.max_buffer = max_buffer
+        self.prefetch_within = prefetch_within
+
+        self.columns = ProductColumns()  # Parsed products (compacted to the window, see _trim_window)
+        self.items = []        # Ranked row indices (into self.columns) in the current window
+        self.base = 0          # Global index of items[0]
+        self.seen_asins = set()
+        self.next_page = 1
+        self.exhausted = False
+        self._pending = None   # asyncio.Task for the next page
+
+    @property
+    def end(self):
+        """Global index one past the last loaded product."""
+        return self.base + len(self.items)
+
+    async def _fetch_next_page(self):
+        if self.exhausted:
+            return 0
+        page = self.next_page
+        self.next_page += 1
+
+        raw = await self.api.search_products(self.query, page=page)
+        if not raw:
+            self.exhausted = True
+            return 0
+        if self.next_page > self.max_pages:
+            self.exhausted = True
+
+        fresh = []
+        for p in raw:
+            asin = p.get("asin")
+            if asin:
+                if asin in self.seen_asins:
+                    continue
+                self.seen_asins.add(asin)
+            fresh.append(p)
+
+        rows = self.columns.extend(fresh)
+        ranked = self.columns.rank(rows, budget=self.ctx.get("budget"))
+        self.items.extend(ranked)
+        self._trim_window()
+
+        logger.info(f"🛒 Stream '{self.query}': page {page} -> +{len(ranked)} (window {self.base}-{self.end})")
+        return len(ranked)
+
+    def _trim_window(self):
+        # Bound memory: slide the window forward
+        overflow = len(self.items) - self.max_buffer
+        if overflow > 0:
+            del self.items[:overflow]
+            self.base += overflow
+        # ...and drop the parsed rows that slid out (or never made the budget cut) with it
+        if len(self.columns) > self.max_buffer:
+            remap = self.columns.retain(self.items)
+            self.items = [remap[i] for i in self.items]
+
+    async def refine(self, ctx):
+        """
+        New stream for the SAME query with a new budget ("under 300").
+        Re-ranks the already parsed columns - no re-fetch, no re-parse - and continues paging after them.
+        """
+        if self._pending:
+            await self._load_more()  # Let the in-flight page land in the columns first
+
+        refined = ProductStream(self.api, ctx, self.max_pages, self.max_buffer, self.prefetch_within)
+        refined.columns = self.columns
+        refined.seen_asins = self.seen_asins
+        refined.next_page = self.next_page
+        refined.exhausted = self.exhausted
+        # Keep the best `max_buffer` (trimming the front here would drop the top picks)
+        refined.items = self.columns.rank(budget=ctx.get("budget"))[:self.max_buffer]
+        return refined
+
+    async def _load_more(self):
+        """Awaits the in-flight prefetch if any, else fetches directly."""
+        if self._pending:
+            try:
+                await asyncio.shield(self._pending)
+            except Exception:
+                pass  # Logged by _prefetch_done
+        else:
+            await self._fetch_next_page()
+
+    def _prefetch_done(self, task):
+        # Clear as soon as the page lands, so the NEXT prefetch isn't blocked by a finished task
+        if self._pending is task:
+            self._pending = None
+        if not task.cancelled() and task.exception():
+            logger.error(f"Stream Prefetch Error: {task.exception()}")
+
+    def maybe_prefetch(self, offset):
+        """Kicks a background fetch once the user is within `prefetch_within` cards of the end."""
+        if self.exhausted or self._pending:
+            return
+        if self.end - offset <= self.prefetch_within:
+            self._pending = asyncio.ensure_future(self._fetch_next_page())
+            self._pending.add_done_callback(self._prefetch_done)
+
+    async def get(self, offset):
+        """Returns the product at global index `offset` (or None past the end)."""
+        while offset >= self.end and not self.exhausted:
+            await self._load_more()
+        if offset < self.base or offset >= self.end:
+            return None
+        self.maybe_prefetch(offset)
+        return self.columns.products[self.items[offset - self.base]]
+
+    def peek(self, offset):
+        """Already-loaded product at `offset` without triggering any fetch (None if not loaded)."""
+        if self.base <= offset < self.end:
+            return self.columns.products[self.items[offset - self.base]]
+        return None
+
+    def has_next(self, offset):
+        return offset + 1 < self.end or not self.exhausted
@@ -1,12 +1,13 @@
 import sys
 import os
+import asyncio
 
 # Ensure we can import from parent directory
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from shopping_service_dev.shopping_bot import ShoppingBot
 
-def run():
+async def run():
     bot = ShoppingBot()
     user_id = "cli_user"
     
@@ -16,16 +17,16 @@ def run():
     
     while True:
         try:
-            user_input = input("\nYou: ")
+            user_input = await asyncio.to_thread(input, "\nYou: ")
             if user_input.lower() in ["exit", "quit"]:
                 break
                 
             # Changed to use process_message which handles pagination internally
-            results = bot.process_message(user_id, user_input, user_mood="Neutral")
+            results = await bot.process_message(user_id, user_input, user_mood="Neutral")
             print(results)
                     
         except KeyboardInterrupt:
             break
 
 if __name__ == "__main__":
-    run()
+    asyncio.run(run())
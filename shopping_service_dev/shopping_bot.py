@@ -1,15 +1,16 @@
 from .amazon_api import AmazonAPI
 from .context_engine import ContextEngine
 from .card_renderer import ProductCardRenderer
+from .product_stream import ProductStream
 
 class ShoppingBot:
     def __init__(self):
         self.api = AmazonAPI()
         self.context_engine = ContextEngine()
         self.renderer = ProductCardRenderer()
-        self.sessions = {} # user_id -> {products: [], offset: 0, query: ""}
+        self.sessions = {} # user_id -> {stream: ProductStream, offset: 0, query: ""}
 
-    def process_message(self, user_id, text, user_mood=None):
+    async def process_message(self, user_id, text, user_mood=None):
         """
         Main Handler.
         If text is 'next' or 'more', fetches next page from session.
@@ -19,12 +20,12 @@ class ShoppingBot:
         
         # 1. Handle Pagination
         if clean_text in ["next", "more", "show more", "show me", "continue"] and user_id in self.sessions:
-            return self.get_next_page(user_id)
+            return await self.get_next_page(user_id)
             
         # 2. New Search
-        return self.new_search(user_id, text, user_mood)
+        return await self.new_search(user_id, text, user_mood)
 
-    def new_search(self, user_id, text, user_mood):
+    async def new_search(self, user_id, text, user_mood):
         # Analyze Context
         ctx = self.context_engine.analyze_context(text, mood=user_mood)
         
@@ -52,65 +53,60 @@ class ShoppingBot:
 
         print(f"🧠 Context Analysis: {ctx}")
         
-        # Fetch Data (Fetch more to allow pagination, e.g. 20 items)
-        raw_products = self.api.search_products(ctx["query"], page=1)
-        
-        # Rank
-        ranked_products = self._rank_products(raw_products, ctx)
+        # Lazy Stream: page 1 now, further pages fetched + ranked on demand
+        if is_refinement and "stream" in self.sessions[user_id]:
+            # Same product, new budget -> re-rank the parsed columns we already have
+            stream = await self.sessions[user_id]["stream"].refine(ctx)
+        else:
+            stream = ProductStream(self.api, ctx)
+        await stream.get(0)  # Page 1 now; the stream prefetches page 2 in the background
         
         # Save Session
         # If refinement, keep the base query as the "main" one? Or update it?
         # Update it so "under 300" state is preserved if they say "under 200" next.
         self.sessions[user_id] = {
-            "products": ranked_products,
+            "stream": stream,
             "offset": 0,
             "query": ctx["query"]
         }
         
-        return self.get_next_page(user_id, direction="current")
+        return await self.get_next_page(user_id, direction="current")
 
-    def get_next_page(self, user_id, direction="next"):
+    async def get_next_page(self, user_id, direction="next"):
         session = self.sessions.get(user_id)
         if not session:
             return "❌ No active search. Type a product name to start shopping."
             
-        products = session["products"]
+        stream = session["stream"]
         offset = session["offset"]
         limit = 1 # Single Card Mode
         
-        # Calculate New Offset
+        # Calculate New Offset (Prev can't go behind the stream's memory window)
         if direction == "next":
             new_offset = offset + limit
         elif direction == "prev":
-            new_offset = max(0, offset - limit)
+            new_offset = max(stream.base, offset - limit)
         else:
             new_offset = offset
             
-        # Check Bounds
-        if new_offset >= len(products):
-            # If next goes out of bounds, maybe fetch more? For now, loop or stop.
-            # Let's stop.
+        # Check Bounds (Stream fetches the next RapidAPI page if needed - usually already prefetched)
+        product = await stream.get(new_offset)
+        if not product:
             return "🏁 End of results. Try a different search?"
             
         # Update Session
         session["offset"] = new_offset
         
-        # Slice batch
-        batch = products[new_offset : new_offset + limit]
-        
-        if not batch:
-             return "🏁 End of results."
-        
         # Render Single Card
-        product_data = self.renderer.render_card(batch[0], index=new_offset + 1)
+        product_data = self.renderer.render_card(product, index=new_offset + 1)
         
         # Navigation Buttons
         nav_buttons = []
-        if new_offset > 0:
+        if new_offset > stream.base:
             nav_buttons.append({"text": "⬅️ Prev", "callback_data": "shopping_prev"})
         
-        # Always allow next (unless last item? API might have more pages, but for now we have fixed list)
-        if new_offset < len(products) - 1:
+        # Allow next while the stream has loaded items or more pages to fetch
+        if stream.has_next(new_offset):
             nav_buttons.append({"text": "Next ➡️", "callback_data": "shopping_next"})
         
         # Construct Response Object (Dict)
@@ -124,41 +120,13 @@ class ShoppingBot:
             ]
         }
 
-    def _rank_products(self, products, context):
-        """
-        Sorts products based on:
-        - Budget compliance
-        - Rating (Stars * Count)
-        - Price/Value ratio
-        """
-        scored = []
-        for p in products:
-            price_raw = p.get("product_price")
-            if not price_raw:
-                price_str = "0"
-            else:
-                price_str = str(price_raw).replace('$', '').replace('₹', '').replace(',', '')
-                
-            try:
-                price = float(price_str)
-            except:
-                price = 0
-                
-            # Filter by Budget
-            if context["budget"] and price > context["budget"]:
-                continue
-                
-            rating = float(p.get("product_star_rating", 0) or 0)
-            reviews = int(p.get("product_num_ratings", 0) or 0)
-            
-            # Simple Score: Logarithmic review count boost + Star rating
-            score = rating * (reviews ** 0.5) 
-            
-            scored.append((score, p))
-            
-        # Sort descending by score
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return [item[1] for item in scored]
-        
+    def peek_photo(self, user_id, step=1):
+        """Image URL of the card `step` positions away (for pre-warming), if already loaded."""
+        session = self.sessions.get(user_id)
+        if not session:
+            return None
+        product = session["stream"].peek(session["offset"] + step)
+        return product.get("product_photo") if product else None
+
     def is_slang(self, text):
         return self.context_engine.is_slang_detected(text)
@@ -0,0 +1,218 @@
+import re
+from collections import namedtuple
+
+# ==========================================
+# UNIFIED SLANG REWRITE TABLE
+# ==========================================
+# Single source of truth for ContextEngine (RapidAPI shopping) and shopping_engine
+# (affiliate links). Compiled ONCE at import into a word-level trie, so matching is
+# one left-to-right pass per message instead of a loop over every key.
+
+SLANG_CATEGORIES = {
+    # --- Explicit / Intimate (Amazon-safe wellness mappings) ---
+    "nsfw": {
+        "sex toys": "personal body wand massager vibration",
+        "vibrator": "cordless body massager for women",
+        "dildo": "silicone body massager tool",
+        "fleshlight": "male stimulation sleeve",
+        "fuck my date": "condoms and massage oil",
+        "i wanna fuck": "condoms and lubricants",
+        "horny": "adult pleasure accessories",
+        "masturbate": "personal massager vibration",
+        "sex": "intimate wellness products",
+        "toys": "personal body massager",
+        "lubricant": "personal lubricant gel",
+        "oil": "sensual massage oil",
+        "condom": "durex condoms for men",
+        "porn": "adult novelties",
+        "xxx": "adult party accessories",
+        "lube": "personal lubricant",
+        "gyat": "shapewear & lingerie",
+        "rand": "adult wellness",
+        "randi": "adult wellness",
+        "chinnal": "adult wellness",
+        "raand": "adult wellness",
+        "gb road": "adult wellness",
+        "tharki": "adult party accessories",   # Context: "Lusty" -> Fun/Party
+        "hawas": "adult wellness",            # Context: "Lust"
+        "hila": "personal lubricant",         # Context: "To shake/hand solo"
+        "mutth": "personal lubricant",        # Context: "Hand solo"
+        "blue film": "adult novelties",
+        # Meme/Misspelled NSFW (Very Common in India)
+        "bobs": "lingerie",                   # Meme spelling for "Boobs"
+        "vegana": "adult wellness",           # Meme spelling for "Vagina"
+        "vegna": "adult wellness",
+        "sax": "adult wellness",              # Common misspelling
+        "sux": "adult wellness",
+        "fuddi": "adult wellness",
+        "lund": "adult novelties",
+        "chut": "adult wellness",
+        "boob": "lingerie",
+        "chooche": "lingerie",
+        "saax": "adult wellness",
+    },
+
+    # --- Diversions (steer away from harmful searches) ---
+    "safety": {
+        "nude": "art & photography books",
+        "nudes": "art & photography books",
+        "leaked": "security software",
+        "mms": "security software",
+    },
+
+    # --- Indian Locality / Desi Internet Slang ---
+    "desi": {
+        "chapri": "neon sunglasses and skinny jeans",  # Stereotypical fashion
+        "nibba": "large teddy bear gift",             # "Couple" gifts
+        "nibbi": "chocolates and heart pillow",
+        "jugaad": "diy repair tool kit",
+        "systumm": "loud bass speakers",              # Elvish Yadav / Car culture
+        "system": "smartwatches and gadgets",
+        "mahaul": "party speakers and disco lights",
+        "scene": "party wear clothes",                # "Kya scene hai?" -> Party
+        "shag": "energy drinks",                      # Indian context: "Too tired/shagged" -> Energy
+        "bt": "headache balm and stress relief",      # "Bad Trip" -> Stress relief
+        "bhasad": "fidget toys for stress",
+        "kalti": "travel bags",                       # "Kalti maar" -> Travel/Escape
+        "pataka": "ethnic party wear for women",
+        "tot": "crop tops and trendy fashion",        # "Totta"
+        "kadak": "premium intense coffee",
+        "bawa": "leather jackets and accessories",    # Parsi/Mumbai slang
+        "dhinchak": "sequin shiny clothing",
+        "timepass": "snacks and munchies",
+        "sorted": "organizers & planners",
+        "vella": "video games & board games",
+        "paisa vasool": "value packs & discounts",
+        "kanjoos": "piggy banks & budget planners",
+        "bhau": "thick chains & bracelets",
+        "machayenge": "speakers & sound systems",
+        "bindass": "adventure gear",
+        "ghanta": "alarm clocks",                     # Pun mapping
+        "moye moye": "sad playlist headphones & tissues",
+    },
+
+    # --- Reddit / Global GenZ / Internet Culture ---
+    "genz": {
+        "drip": "streetwear aesthetics",
+        "riz": "men's grooming kit",
+        "rizz": "men's grooming and perfume",
+        "gymrat": "creatine and whey protein",
+        "touch grass": "hiking gear and camping",
+        "based": "gigachad meme merch",
+        "delulu": "manifestation journal",
+        "coquette": "bows and lace dresses",
+        "cottagecore": "floral dresses and tea sets",
+        "dark academia": "tweed blazers and fountain pens",
+        "goblincore": "mushroom decor and earthy clothes",
+        "normcore": "plain white tees and denim",
+        "old money": "polo shirts and linen trousers",
+        "y2k": "baggy jeans and baby tees",
+        "simp": "bouquets and chocolates",
+        "girl math": "sale items under 500",
+        "boy math": "expensive gaming consoles",
+        "cap": "baseball caps",
+        "no cap": "authentic branded shoes",
+        "slay": "party heels and dresses",
+        "main character": "sunglasses and statement jewelry",
+        "npc": "grey hoodies and plain cargo pants",
+        "sus": "spy cameras",
+        "yeet": "throwing frisbee",
+        "uwu": "kawaii plushies and anime merch",
+        "waifu": "anime body pillow",
+        "ick": "cleaning supplies and hygiene",
+        "mid": "budget earphones",                    # "Mid" -> Average/Budget
+        "sigma": "gym gear & suits",
+        "baddie": "trendy fashion & makeup",
+        "bet": "gaming consoles",
+        "finna": "travel accessories",
+        "glow up": "skincare & haircare",
+        "gatekeep": "exclusive releases",
+        "tea": "kettles & tea sets",
+        "salty": "snacks & savory food",
+        "ghost": "horror books & halloween costumes",
+        "cheugy": "vintage & retro items",
+        "dank": "gaming merch & posters",
+    },
+
+    # --- Trendy / Viral / Aesthetics ---
+    "trend": {
+        "trendy": "viral trending products instagram",
+        "viral": "tiktok made me buy it products",
+        "hot": "bestsellers current month",
+        "cool": "newest tech gadgets",
+        "latest": "new launch products 2024",
+        "fyp": "trending aesthetically pleasing items",
+        "aesthetic": "pinterest room decor",
+        "pinterest": "aesthetic room decor and outfits",
+        "instagramable": "photogenic props and lighting",
+        "influencer": "ring lights and tripods",
+    },
+
+    # --- Rich / Luxury / Status ---
+    "luxury": {
+        "rich": "luxury branded watches and perfumes",
+        "classy": "minimalist old money outfits",
+        "premium": "high end electronics",
+        "lux": "luxury home decor gold accents",
+        "expensive": "branded designer accessories",
+        "flex": "apple products and accessories",
+        "status": "premium leather goods",
+        "boujee": "high end fashion accessories",
+    },
+
+    # --- Tech / Gaming Specific ---
+    "tech": {
+        "pc mr": "rtx graphic cards",                 # PC Master Race
+        "console peasant": "playstation 5 games",
+        "keeb": "mechanical keyboard",
+        "battlestation": "rgb led strips",
+        "setup": "monitor arms and desk mats",
+    },
+}
+
+# Flat view: slang -> rewrite (kept for callers that just need the mapping)
+SLANG_MAP = {term: rewrite for cat in SLANG_CATEGORIES.values() for term, rewrite in cat.items()}
+
+SlangMatch = namedtuple("SlangMatch", ["term", "rewrite", "category"])
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_END = "$"  # Trie terminal marker
+
+
+def _build_trie():
+    """Word-level trie: one node per token, so matches always respect word boundaries."""
+    root = {}
+    for category, table in SLANG_CATEGORIES.items():
+        for term, rewrite in table.items():
+            node = root
+            for tok in _TOKEN_RE.findall(term):
+                node = node.setdefault(tok, {})
+            node[_END] = SlangMatch(term, rewrite, category)
+    return root
+
+_TRIE = _build_trie()
+
+
+def match_slang(text):
+    """
+    Returns the LONGEST slang phrase in text (ties -> earliest) as SlangMatch, or None.
+    "fuck my date" beats "fuck"; "bta" does NOT match "bt".
+    """
+    if not text:
+        return None
+    tokens = _TOKEN_RE.findall(text.lower())
+    best = None
+    for i in range(len(tokens)):
+        node = _TRIE
+        for tok in tokens[i:]:
+            node = node.get(tok)
+            if node is None:
+                break
+            hit = node.get(_END)
+            if hit and (best is None or len(hit.term) > len(best.term)):
+                best = hit
+    return best
+
+
+def has_slang(text):
+    return match_slang(text) is not None
@@ -0,0 +1,120 @@
+import re
+import time
+import logging
+from telegram.constants import ParseMode
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# STREAMING TELEGRAM RENDERER
+# ==========================================
+# Posts the first chunk as soon as there's something worth reading, then coalesces
+# edit_message_text calls (Telegram allows roughly 1 edit/sec per chat before 429s).
+# Control tags the reply parser consumes later ([YOUTUBE: ...], [SEARCH: ...], [VOICE])
+# are hidden while streaming, including half-received ones like "[YOUT".
+
+STREAM_EDIT_INTERVAL = 1.0    # Seconds between edits
+STREAM_FIRST_CHUNK = 24       # Chars before the first send (avoid a 1-word bubble)
+TELEGRAM_MAX_CHARS = 4000     # Hard limit is 4096; leave room
+
+_TAG_RE = re.compile(r"\[(?:YOUTUBE|SEARCH):[^\]]*\]|\[VOICE\]")
+_PARTIAL_TAG_RE = re.compile(r"\[[A-Z]*(?::[^\]]*)?$")
+YOUTUBE_TAG_RE = re.compile(r"\[YOUTUBE:\s*(.*?)\]")
+
+def visible_text(raw):
+    """Streamed text minus control tags (complete or still arriving)."""
+    text = _PARTIAL_TAG_RE.sub("", _TAG_RE.sub("", raw))
+    return re.sub(r"[ \t]{2,}", " ", text).strip()
+
+
+class TelegramStreamRenderer:
+    def __init__(self, bot, chat_id, interval=STREAM_EDIT_INTERVAL, first_chunk=STREAM_FIRST_CHUNK):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.interval = interval
+        self.first_chunk = first_chunk
+        self.raw = ""
+        self.messages = []   # Sent Message objects (long replies spill into several)
+        self.shown = []      # Text currently shown in each message
+        self._last_edit = 0.0
+
+    @property
+    def started(self):
+        return bool(self.messages)
+
+    async def feed(self, delta):
+        self.raw += delta
+        text = visible_text(self.raw)
+        if not self.started:
+            if len(text) >= self.first_chunk:
+                await self._render(text)
+            return
+        if time.monotonic() - self._last_edit >= self.interval:
+            await self._render(text)
+
+    async def finish(self, repost=False):
+        """
+        Final render (with Markdown). Returns the full RAW reply (tags included) for the parsers.
+        repost=True deletes the streamed messages and sends the reply fresh, so it lands
+        below anything posted meanwhile (e.g. a suggestion found mid-stream).
+        """
+        if repost:
+            old, self.messages, self.shown = self.messages, [], []
+            for message in old:
+                try:
+                    await message.delete()
+                except Exception as e:
+                    logger.warning(f"Stream Repost: delete failed: {e}")
+        text = visible_text(self.raw)
+        if text:
+            await self._render(text, final=True)
+        return self.raw
+
+    def _chunks(self, text):
+        """Splits at the last newline/space before the limit (words stay whole)."""
+        chunks = []
+        while len(text) > TELEGRAM_MAX_CHARS:
+            cut = max(text.rfind("\n", 0, TELEGRAM_MAX_CHARS), text.rfind(" ", 0, TELEGRAM_MAX_CHARS))
+            if cut <= 0:
+                cut = TELEGRAM_MAX_CHARS
+            chunks.append(text[:cut].rstrip())
+            text = text[cut:].lstrip()
+        chunks.append(text)
+        return chunks
+
+    async def _render(self, text, final=False):
+        self._last_edit = time.monotonic()
+        for i, chunk in enumerate(self._chunks(text)):
+            if i < len(self.shown) and self.shown[i] == chunk and not final:
+                continue
+            try:
+                if i < len(self.messages):
+                    await self._edit(self.messages[i], chunk, final)
+                else:
+                    self.messages.append(await self._send(chunk, final))
+                    self.shown.append(chunk)
+                self.shown[i] = chunk
+            except Exception as e:
+                # Rate limited / "message is not modified": the next render catches up
+                logger.warning(f"Stream Render Skipped: {e}")
+                return
+
+    async def _send(self, chunk, final):
+        if final:
+            try:
+                return await self.bot.send_message(chat_id=self.chat_id, text=chunk, parse_mode=ParseMode.MARKDOWN)
+            except Exception:
+                pass  # Model Markdown isn't always valid Telegram Markdown
+        return await self.bot.send_message(chat_id=self.chat_id, text=chunk)
+
+    async def _edit(self, message, chunk, final):
+        # Partial Markdown (an unclosed '*') would be rejected mid-stream: plain text until final
+        if final:
+            try:
+                await message.edit_text(chunk, parse_mode=ParseMode.MARKDOWN)
+                return
+            except Exception as e:
+                if "not modified" in str(e).lower():
+                    return
+        if self.shown[self.messages.index(message)] != chunk:
+            await message.edit_text(chunk)
@@ -0,0 +1,75 @@
+import re
+import time
+
+from slang_engine import SLANG_MAP, match_slang
+
+# Micro-benchmark: legacy per-message slang scans vs the compiled trie (slang_engine).
+# Both sides use the same consolidated table so only the algorithm differs.
+
+MESSAGES = [
+    "suggest me some drip for the party tonight",
+    "i wanna fuck my date lol what should i buy",
+    "Amazon product bta fir",
+    "Mujhe bt ho rahi hai kuch de",
+    "gift for mom under 500",
+    "best mechanical keeb for my battlestation setup",
+    "need old money outfits for the wedding, no cap",
+    "wireless earphones with good bass",
+]
+ROUNDS = 2000
+
+# --- LEGACY (copied from pre-consolidation ContextEngine / shopping_engine) ---
+def legacy_context_engine(text):
+    cleaned = text.lower()
+    sorted_keys = sorted(SLANG_MAP.keys(), key=len, reverse=True)  # Re-sorted every call
+    for slang in sorted_keys:
+        if slang in cleaned:
+            return SLANG_MAP[slang]
+    return None
+
+def legacy_is_slang(text):
+    cleaned = text.lower()
+    for s in SLANG_MAP:
+        if s in cleaned: return True
+    return False
+
+def legacy_genx(text):
+    for slang, mapped in SLANG_MAP.items():
+        if re.search(r'\b' + re.escape(slang) + r'\b', text.lower()):
+            return mapped
+    return None
+
+def legacy_message(text):
+    # telegram_main: is_slang() then ShoppingBot -> analyze_context(); links go via GENX scan
+    legacy_is_slang(text)
+    legacy_context_engine(text)
+    legacy_genx(text)
+
+def new_message(text):
+    match_slang(text)
+
+def bench(fn):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for msg in MESSAGES:
+            fn(msg)
+    return (time.perf_counter() - start) / (ROUNDS * len(MESSAGES)) * 1e6
+
+def run_benchmark():
+    print("🧪 Slang Matcher Benchmark")
+    print("-----------------------------------")
+    print(f"Table: {len(SLANG_MAP)} phrases | {len(MESSAGES)} messages x {ROUNDS} rounds")
+
+    t_old = bench(legacy_message)
+    t_new = bench(new_message)
+    print(f"⏱️ Legacy (sort + substring + regex scans): {t_old:8.2f} µs/message")
+    print(f"⚡ Compiled trie (single pass):             {t_new:8.2f} µs/message")
+    print(f"🚀 Speedup: {t_old / t_new:.1f}x")
+
+    print("\n🔎 Sample Matches:")
+    for msg in MESSAGES:
+        m = match_slang(msg)
+        print(f"   '{msg}' -> {m.term + ' [' + m.category + '] -> ' + m.rewrite if m else 'None'}")
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -1,5 +1,5 @@
 import random
-import math
+from road_distance import road_estimator
 
 class TaxiEngine:
     def __init__(self):
@@ -221,10 +221,10 @@ class TaxiEngine:
 
     # --- Helpers ---
     def _calculate_distance(self, user_id):
-        # If real coords exist, use Haversine. Else mock.
+        # If real coords exist, use the offline Road Model (Haversine x Detour Grid). Else mock.
         data = self.user_states[user_id]["data"]
         if data.get("pickup_lat") and data.get("drop_lat"):
-             return self._haversine(data["pickup_lat"], data["pickup_lon"], data["drop_lat"], data["drop_lon"])
+             return road_estimator.road_km(data["pickup_lat"], data["pickup_lon"], data["drop_lat"], data["drop_lon"])
         return random.randint(3, 15) # Mock 3-15km
 
     def cancel_ride(self, user_id):
@@ -258,14 +258,6 @@ class TaxiEngine:
             })
         return options
 
-    def _haversine(self, lat1, lon1, lat2, lon2):
-        R = 6371  # Earth radius in km
-        dlat = math.radians(lat2 - lat1)
-        dlon = math.radians(lon2 - lon1)
-        a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        return round(R * c, 1)
-
     def _assign_driver(self, vehicle_name):
         names = ["Rajesh", "Suresh", "Ramesh", "Vikram", "Sunil"]
         cars = ["Swift Dzire", "WagonR", "Honda City", "Hyundai Aura"]
@@ -6,7 +6,6 @@ import json
 import urllib.parse
 import traceback
 import io
-import PIL.Image
 import pytz
 from datetime import datetime, timedelta
 from telegram import Update, InputMediaPhoto, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
@@ -18,7 +17,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # --- JARVIS MODULES ---
-from network_utils import safe_post, KeyManager, close_client
+from network_utils import safe_post, KeyManager, close_client, get_client
 from metro_engine import handle_metro, METRO_GRAPH
 # from shopping_engine import handle_shopping, generate_amazon_link # Legacy Removed
 from shopping_service_dev.shopping_bot import ShoppingBot # New Engine
@@ -27,8 +26,15 @@ from ride_card_renderer import RideCardRenderer
 from location_service import LocationService
 from intent_engine import decide_intent_ai
 from memory_core import memory_db
-from gemini_engine import generate_gemini_text, generate_gemini_vision
+from gemini_engine import generate_gemini_text, generate_gemini_vision, stream_gemini_text
 from knowledge_engine import get_genz_news, get_weather, get_stock_price
+from news_digest import news_digests, prefetch_news_digests, profile_location, NEWS_PREFETCH_INTERVAL
+from media_cache import media_cache, is_broken_media_error
+from vision_pipeline import pick_photo_size, prepare_image, caption_intent, vision_cache
+from voice_pipeline import voice_pipeline
+from prompt_builder import PromptBuilder, KEEP_HEAD, KEEP_TAIL, format_user_routines
+from stream_renderer import TelegramStreamRenderer, YOUTUBE_TAG_RE
+from semantic_memory import semantic_memory
 
 # ==========================================
 # CONFIGURATION
@@ -226,8 +232,8 @@ def update_history(user_id, role, text):
     memory_db.log_chat(user_id, role, text)
 
 def get_history_text(user_id):
-    """Fetches from Brain DB (Persistent)."""
-    return memory_db.get_recent_context(user_id, limit=10)
+    """Fetches from Brain DB (Persistent): rolling summary + recent raw turns."""
+    return memory_db.get_tiered_context(user_id)
     return "\n".join(lines)
 
 # ==========================================
@@ -283,6 +289,8 @@ async def generate_groq_response(prompt_text):
 # --- Simple Response Cache (TTL 1 Hour) ---
 RESPONSE_CACHE = {}
 
+AI_FALLBACK_REPLY = "Abhi mere pass time ni hai, badme batata."
+
 async def generate_ai_response(prompt_text, tier="standard", use_background_keys=False):
     """
     Generates AI response using Groq (Fast) or Gemini (Smart).
@@ -344,7 +352,103 @@ async def generate_ai_response(prompt_text, tier="standard", use_background_keys
         return fallback_res
 
     # Ultimate Fallback
-    return "Abhi mere pass time ni hai, badme batata."
+    return AI_FALLBACK_REPLY
+
+# ==========================================
+# STREAMING (time-to-first-token for long replies)
+# ==========================================
+STREAM_TIERS = {"standard", "premium"}
+STREAM_CUT_NOTICE = "\n\n_(Connection dropped, reply cut short. Ask again?)_"
+
+async def stream_groq_response(prompt_text, status=None):
+    """
+    Groq (OpenAI-compatible) SSE stream. Async generator of text deltas.
+    status (optional dict): status["complete"] is set True only once [DONE] arrives.
+    """
+    for _ in range(2):
+        key = mgr_groq.get_next_key()
+        if not key: break
+        
+        url = "https://api.groq.com/openai/v1/chat/completions"
+        headers = {"Authorization": f"Bearer {key}"}
+        payload = {
+            "model": "llama-3.3-70b-versatile",
+            "messages": [{"role": "user", "content": prompt_text}],
+            "temperature": 0.7,
+            "max_tokens": 1024,
+            "stream": True
+        }
+        got_any = False
+        try:
+            async with get_client().stream("POST", url, json=payload, headers=headers, timeout=30.0) as resp:
+                if resp.status_code == 429:
+                    logger.warning("Groq Rate Limit - Rotate Key")
+                    mgr_groq.report_status(key, 429)
+                    continue
+                if resp.status_code != 200:
+                    logger.error(f"Groq Stream Error: {resp.status_code}")
+                    continue
+                async for line in resp.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        if status is not None:
+                            status["complete"] = True
+                        break
+                    try:
+                        delta = json.loads(data)["choices"][0]["delta"].get("content")
+                    except (ValueError, KeyError, IndexError):
+                        continue
+                    if delta:
+                        got_any = True
+                        yield delta
+        except Exception as e:
+            logger.error(f"Groq Stream Error: {e}")
+        if got_any:
+            return  # Even if cut short: deltas are already on screen, a retry would repeat them
+
+async def stream_ai_response(prompt_text, tier="standard", use_background_keys=False):
+    """
+    Streaming twin of generate_ai_response (same cache, same Gemini -> Groq fallback).
+    Async generator of text deltas; a key that fails before its first token is skipped.
+    A stream cut off mid-reply ends with STREAM_CUT_NOTICE and is never cached.
+    """
+    cache_key = hash(prompt_text.strip())
+    now = datetime.now()
+    if cache_key in RESPONSE_CACHE:
+        timestamp, cached_resp = RESPONSE_CACHE[cache_key]
+        if now - timestamp < timedelta(hours=1):
+            logger.info("⚡ Cache Hit! Serving saved response.")
+            yield cached_resp
+            return
+
+    parts = []
+    status = {"complete": False}
+    if tier != "lightning":
+        keys = BACKGROUND_KEYS if use_background_keys else PRIMARY_KEYS
+        for key in keys:
+            async for delta in stream_gemini_text(prompt_text, key, status=status):
+                parts.append(delta)
+                yield delta
+            if parts:
+                break
+
+    if not parts:
+        if tier != "lightning":
+            logger.info("⚠️ Gemini Stream Failed. Falling back to Groq.")
+        async for delta in stream_groq_response(prompt_text, status=status):
+            parts.append(delta)
+            yield delta
+
+    if parts and status["complete"]:
+        RESPONSE_CACHE[cache_key] = (now, "".join(parts))
+    elif parts:
+        logger.warning("⚠️ AI Stream cut off mid-reply (not cached).")
+        yield STREAM_CUT_NOTICE
+    else:
+        # Ultimate Fallback
+        yield AI_FALLBACK_REPLY
 
 # ==========================================
 # SUBCONSCIOUS (Background Analysis)
@@ -488,13 +592,9 @@ async def run_behavioral_checks(context):
 
             # [PHASE 36] Sleep Mode Check 🛑
             # If DND is set in routine_db, Skip Proactive Thoughts completely.
-            user_routine = routine_db.get_routines().get(user_id, {})
-            dnd_until = user_routine.get("dnd_until")
-            if dnd_until:
-                 dnd_dt = datetime.fromisoformat(dnd_until)
-                 if datetime.now() < dnd_dt:
-                      # User is asleep/busy. Silence.
-                      continue
+            if routine_db.is_dnd(user_id, datetime.now()):
+                 # User is asleep/busy. Silence.
+                 continue
 
             # [PHASE 37] Timetable Check (Dynamic)
             from timetable_manager import timetable_manager
@@ -504,7 +604,7 @@ async def run_behavioral_checks(context):
             now_ist = datetime.now(IST)
             
             # 1. Check for Pre-Class Nudges (15 mins before)
-            upcoming = timetable_manager.get_upcoming_event(now_ist, buffer_minutes=15)
+            upcoming = timetable_manager.get_upcoming_event(user_id, now_ist, buffer_minutes=15)
             # Check if we already notified for this specific event to prevent spam
             # We use a volatile memory for this: notified_events = set() (need global or profile storage)
             # Hack: Store in profile transiently
@@ -528,13 +628,13 @@ async def run_behavioral_checks(context):
                 
             # 2. Morning Brief (8:00 AM)
             if now_ist.hour == 8 and now_ist.minute == 0:
-                events = timetable_manager.get_day_events(now_ist.strftime("%A"))
+                events = timetable_manager.get_day_events(user_id, now_ist.strftime("%A"))
                 if events:
                     schedule_str = "\n".join([f"• {e['start']} - {e['label']}" for e in events])
                     await sender(user_id, f"☀️ **Good Morning!**\n\nHere is your plan for today:\n{schedule_str}\n\nLet's crush it! 💪")
                     return
 
-            is_busy, busy_label = timetable_manager.is_busy(now_ist)
+            is_busy, busy_label = timetable_manager.is_busy(user_id, now_ist)
             timetable_context = f"Busy ({busy_label})" if is_busy else "Free"
             
             # Anti-Spam Check (4 Hour Cooldown)
@@ -578,6 +678,52 @@ async def run_behavioral_checks(context):
     except Exception as e:
         logger.error(f"Behavioral Check Fail: {e}")
 
+async def background_ai_response(prompt_text, tier="standard"):
+    """
+    generate_ai_response on the BACKGROUND key pool (keeps primary keys free for users).
+    Returns None instead of the chatty fallback line, so jobs never store it as data.
+    """
+    reply = await generate_ai_response(prompt_text, tier=tier, use_background_keys=True)
+    return None if reply == AI_FALLBACK_REPLY else reply
+
+async def embedding_job(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Scheduled Job: Batch-embeds new history rows for semantic recall (background keys).
+    """
+    try:
+        await semantic_memory.embed_pending(BACKGROUND_KEYS)
+    except Exception as e:
+        logger.error(f"Embedding Job Fail: {e}")
+
+async def compaction_job(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Scheduled Job (daily): Moves summarised history older than HISTORY_HOT_DAYS into
+    the compressed archive and frees the pages, so brain.db (and its backups) stay small.
+    """
+    try:
+        await asyncio.to_thread(memory_db.compact_history)
+    except Exception as e:
+        logger.error(f"Compaction Job Fail: {e}")
+
+async def summary_job(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Scheduled Job: Folds older turns into each active user's rolling summary.
+    """
+    for uid in memory_db.get_users_needing_summary():
+        try:
+            await memory_db.update_rolling_summary(uid, background_ai_response)
+        except Exception as e:
+            logger.error(f"Summary Job Fail ({uid}): {e}")
+
+async def news_digest_job(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Scheduled Job: Prefetches news digests for the top user locations.
+    """
+    try:
+        await prefetch_news_digests(memory_db, background_ai_response)
+    except Exception as e:
+        logger.error(f"News Digest Job Fail: {e}")
+
 async def check_events(context: ContextTypes.DEFAULT_TYPE):
     """
     Scheduled Job: Runs every 1 minute.
@@ -774,7 +920,7 @@ async def handle_shopping_nav(update: Update, context: ContextTypes.DEFAULT_TYPE
         direction = "prev"
     
     # Fetch Page
-    response = shopping_bot.get_next_page(user_id, direction=direction)
+    response = await shopping_bot.get_next_page(user_id, direction=direction)
     
     if isinstance(response, dict) and response.get("type") == "photo_card":
         # Formats
@@ -794,18 +940,24 @@ async def handle_shopping_nav(update: Update, context: ContextTypes.DEFAULT_TYPE
         
         # Edit Media
         try:
-            # Check if photo is valid URL
-            if not photo: photo = "https://via.placeholder.com/300?text=No+Image"
+            # Cached file_id (no remote fetch) > URL > placeholder for known-broken URLs
+            media = media_cache.resolve(photo)
             
             # Use InputMediaPhoto to update image + caption cleanly
-            await query.edit_message_media(
-                media=InputMediaPhoto(media=photo, caption=caption, parse_mode=ParseMode.MARKDOWN),
+            edited = await query.edit_message_media(
+                media=InputMediaPhoto(media=media, caption=caption, parse_mode=ParseMode.MARKDOWN),
                 reply_markup=keyboard
             )
+            media_cache.remember(photo, edited)
         except Exception as e:
             logger.error(f"Shopping Edit Error: {e}")
+            if is_broken_media_error(e):
+                media_cache.mark_bad(photo)  # Telegram can't fetch this URL: placeholder from now on
             # Fallback if text only
             await query.edit_message_caption(caption=caption, reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN)
+        
+        # Pre-warm the next card's image while the user looks at this one
+        media_cache.prewarm(shopping_bot.peek_photo(user_id, step=1 if direction == "next" else -1), context.bot)
             
     else:
         # String response (End of results)
@@ -897,8 +1049,9 @@ async def handle_live_location(update: Update, context: ContextTypes.DEFAULT_TYP
         logger.info(f"📍 User {user_id} Live Loc: {loc.latitude}, {loc.longitude}")
         # In future, update driver routing here
 
-async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user_text = update.message.text
+async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE, override_text: str = None):
+    # override_text: transcribed voice notes reuse the full text pipeline
+    user_text = override_text or update.message.text
     user_id = str(update.effective_user.id)
     user_name = update.effective_user.first_name
     
@@ -1041,9 +1194,8 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         profile = memory_db.get_profile(user_id)["profile"]
         
         # Detect Mood
-        from mood_manager import detect_mood_from_emojis
-        emoji_mood = detect_mood_from_emojis(user_text)
-        shopping_mood = emoji_mood if emoji_mood else "Neutral"
+        from mood_manager import mood_state
+        shopping_mood = mood_state.observe_text(user_id, user_text)
         
         # 2. Delegate to ShoppingBot 
         # [PHASE 45] Hybrid Logic: Slang (Deterministic) vs Natural Language (AI Refined)
@@ -1075,14 +1227,13 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
                  final_query = refined.strip().replace('"', '')
                  logger.info(f"🛒 AI Refined Query: '{user_text}' -> '{final_query}'")
 
-        response = shopping_bot.process_message(user_id, final_query, user_mood=shopping_mood)
+        response = await shopping_bot.process_message(user_id, final_query, user_mood=shopping_mood)
         
         # 3. Handle Structured Response
         if isinstance(response, dict) and response.get("type") == "photo_card":
              # Send Photo Message
              caption = response["caption"]
              photo = response["photo"]
-             if not photo: photo = "https://via.placeholder.com/300?text=No+Image"
              
              buttons = []
              for row in response["buttons"]:
@@ -1095,7 +1246,25 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 buttons.append(btn_row)
             
              keyboard = InlineKeyboardMarkup(buttons)
-             await context.bot.send_photo(chat_id=user_id, photo=photo, caption=caption, parse_mode=ParseMode.MARKDOWN, reply_markup=keyboard)
+             try:
+                 sent = await context.bot.send_photo(chat_id=user_id, photo=media_cache.resolve(photo), caption=caption, parse_mode=ParseMode.MARKDOWN, reply_markup=keyboard)
+             except Exception as e:
+                 logger.error(f"Shopping Photo Error: {e}")
+                 try:
+                     if is_broken_media_error(e):
+                         # Telegram couldn't fetch the URL -> never try it again, send placeholder
+                         media_cache.mark_bad(photo)
+                         sent = await context.bot.send_photo(chat_id=user_id, photo=media_cache.resolve(photo), caption=caption, parse_mode=ParseMode.MARKDOWN, reply_markup=keyboard)
+                     else:
+                         # Caption Markdown / transient error: same image, plain caption
+                         sent = await context.bot.send_photo(chat_id=user_id, photo=media_cache.resolve(photo), caption=caption, reply_markup=keyboard)
+                 except Exception as retry_error:
+                     # Still no photo: the card as text, so the user isn't left with nothing
+                     logger.error(f"Shopping Photo Retry Error: {retry_error}")
+                     sent = None
+                     await send_tg_msg(user_id, caption, reply_markup=keyboard)
+             media_cache.remember(photo, sent)
+             media_cache.prewarm(shopping_bot.peek_photo(user_id, step=1), context.bot)
         else:
              # Regular Text Response (e.g. "End of results" string)
              await send_tg_msg(user_id, str(response))
@@ -1117,12 +1286,8 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     elif intent in ["NEWS", "WEATHER", "FINANCE"]:
         # Quick Mood Check
-        from mood_manager import get_mood_persona, detect_mood_from_emojis
-        current_mood = "Neutral"
-        try:
-             emo = detect_mood_from_emojis(user_text)
-             if emo: current_mood = emo
-        except: pass
+        from mood_manager import get_mood_persona, mood_state
+        current_mood = mood_state.observe_text(user_id, user_text)
         
         persona_obj = get_mood_persona(current_mood)
         await handle_knowledge(intent, user_text, user_id, send_tg_msg, generate_ai_response, persona=persona_obj)
@@ -1135,7 +1300,16 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         # 1. Update History (User)
         update_history(user_id, "user", user_text)
-        history_str = get_history_text(user_id)
+        summary_str = memory_db.get_conversation_summary(user_id)
+        history_str = memory_db.get_unsummarised_context(user_id)
+        
+        # Long-term semantic recall (old turns relevant to THIS message, not already in the raw tail)
+        memories = []
+        try:
+            memories = await asyncio.wait_for(semantic_memory.recall(user_id, user_text, PRIMARY_KEYS, k=3), timeout=2.0)
+            memories = [m for m in memories if m not in history_str]
+        except Exception as e:
+            logger.warning(f"Semantic Recall Skipped: {e}")
         
         # 2. Get Profile Context
         profile_data = memory_db.get_profile(user_id)
@@ -1147,8 +1321,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         avoids = profile.get("avoid_list", [])
         
         # [PHASE 22] Deep Memory context
-        context_data = profile.get("context", {})
-        media_history = context_data.get("media_history", [])
+        media_history = memory_db.recent_media(user_id, 5)
         psych_profile = profile.get("psych_profile", {})
         preferences = profile.get("preferences", {}) # Fix NameError
         
@@ -1171,23 +1344,9 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # 2. SYSTEM PROMPT (Deep Persona)
         # ---------------------------------------------------------
         
-        # Read the latest mood
-        current_mood = "Neutral"
-        try:
-            if os.path.exists("behavior_logs.json"):
-                with open("behavior_logs.json", "r") as f:
-                    logs = json.load(f)
-                    if logs and isinstance(logs, list):
-                        last_entry = logs[-1]
-                        current_mood = last_entry.get("mood", "Neutral")
-        except: pass
-            
-        from mood_manager import get_mood_persona, detect_mood_from_emojis
-        
-        # [PHASE 18] Emoji Fast-Path Override
-        emoji_mood = detect_mood_from_emojis(user_text)
-        if emoji_mood:
-            current_mood = emoji_mood
+        # Current mood: in-memory per-user state ([PHASE 18] emojis in this message update it first)
+        from mood_manager import get_mood_persona, mood_state
+        current_mood = mood_state.observe_text(user_id, user_text)
         
         persona = get_mood_persona(current_mood)
 
@@ -1200,19 +1359,25 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         from routine_manager import routine_db
         
         day_name = datetime.now(IST).strftime("%A")
-        todays_events = timetable_manager.get_day_events(day_name)
+        todays_events = timetable_manager.get_day_events(user_id, day_name)
         schedule_str = "\n".join([f"- {e['start']}: {e['label']}" for e in todays_events]) if todays_events else "No fixed events."
         
-        routines = routine_db.get_routines()
-        routine_str = str(routines) if routines else "Standard Routine."
+        # Only THIS user's routine for today (not every user's routine dict)
+        routine_str = format_user_routines(routine_db.get_routines().get(user_id), day_name)
 
-        system_prompt = (
-            f"You are Jarvis 3.0 (Aura Edition). User: {nickname}. Relationship: {mode}.\n"
+        # [PERF] Token-budgeted assembly: priority 0 never dropped, higher numbers shrink first
+        prompt = PromptBuilder()
+        prompt.add("persona", f"You are Jarvis 3.0 (Aura Edition). User: {nickname}. Relationship: {mode}.")
+        prompt.add("context", (
             f"--- DEEP PSYCHE & CONTEXT ---\n"
             f"TIME: {time_now}\n"
-            f"SCHEDULE: {schedule_str}\n"
-            f"MOOD: {current_mood} {persona['prefix']}\n"
-            f"RECENT MEDIA: {recent_media_str}\n"
+            f"MOOD: {current_mood} {persona['prefix']}"
+        ))
+        prompt.add("schedule", f"SCHEDULE:\n{schedule_str}", priority=2, keep=KEEP_HEAD)
+        if routine_str:
+            prompt.add("routine", f"ROUTINE TODAY:\n{routine_str}", priority=3, keep=KEEP_HEAD)
+        prompt.add("media", f"RECENT MEDIA:\n{recent_media_str}", priority=4, keep=KEEP_HEAD)
+        prompt.add("instructions", (
             f"--- INSTRUCTION ---\n"
             f"ADAPTIVE: {persona['instruction']}\n"
             f"STYLE: {persona['style']}\n"
@@ -1220,12 +1385,17 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "PRIME DIRECTIVE 2: IF asked for TEA/GOSSIP -> SPILL IT. Don't say 'I don't have gossip'. Invent playful/harmless tea or hype up the news.\n"
             "PRIME DIRECTIVE 3: Use Hinglish if user does. Keep replies short (1-2 sentences). No essays.\n"
             "PRIME DIRECTIVE 4: Support the User's grind. Hyping them up gives +1000 Aura.\n"
-            "PRIME DIRECTIVE 5: You have an AMAZON SHOPPING module. If asked for products/drip, assume Shopping Intent.\n"
-            f"AVOID: {avoids}\n"
-            f"USER RULES: {preferences.get('rules', [])}\n"
-            f"HISTORY:\n{history_str}\n"
-            f"Jarvis (Aura Mode):"
-        )    
+            "PRIME DIRECTIVE 5: You have an AMAZON SHOPPING module. If asked for products/drip, assume Shopping Intent."
+        ))
+        rules_str = "\n".join(
+            ([f"AVOID: {avoids}"] if avoids else []) +
+            [f"USER RULE: {r}" for r in preferences.get("rules", [])]
+        )
+        prompt.add("rules", rules_str, priority=1, keep=KEEP_HEAD)
+        if summary_str:
+            prompt.add("summary", f"EARLIER IN THIS CHAT (summary):\n{summary_str}", priority=2, keep=KEEP_HEAD)
+        if memories:
+            prompt.add("memories", "RELEVANT OLD MEMORIES:\n" + "\n".join(f"- {m}" for m in memories), priority=3, keep=KEEP_HEAD)
         # [PHASE 35] Smart Follow-Up Logic (Busy/Bye Handler)
         text_lower = user_text.lower()
         is_night = datetime.now().hour >= 22 or datetime.now().hour < 6
@@ -1242,7 +1412,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
              logger.info(f"🌙 Sleep Mode Activated for {user_id} until {wake_time}")
              
              # Let the AI know so it can say a final goodnight
-             system_prompt += "\nNOTE: User is going to sleep. Say a warm goodnight and stop messaging until morning."
+             prompt.add("note", "NOTE: User is going to sleep. Say a warm goodnight and stop messaging until morning.")
         
         # 2. Busy Mode Trigger (Daytime)
         elif any(w in text_lower for w in ["bye", "class", "lecture", "busy", "meeting", "chhod", "baad me"]) and not is_night:
@@ -1277,24 +1447,44 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
              context.job_queue.run_once(follow_up_job, delay_mins * 60)
              logger.info(f"⏳ Proactive Follow-up scheduled for {user_id} in {delay_mins} mins.")
     
-        # 3. Inject History into Prompt
-        final_prompt = f"{system_prompt}\n\nCONVERSATION HISTORY:\n{history_str}\n\nJarvis:"
-        
-        reply = await generate_ai_response(final_prompt, tier=tier)
+        # 3. Inject History into Prompt (once; newest lines survive truncation)
+        prompt.add("history_header", "\nCONVERSATION HISTORY:", requires="history")
+        prompt.add("history", history_str, priority=1, keep=KEEP_TAIL)
+        prompt.add("footer", "\nJarvis (Aura Mode):", requires="history")
+        final_prompt, prompt_stats = prompt.build()
+        
+        async def send_youtube_suggestion(yt_query):
+            # Generate Search Link (Always Valid)
+            yt_url = f"https://www.youtube.com/results?search_query={urllib.parse.quote(yt_query)}"
+            keyboard = InlineKeyboardMarkup([[InlineKeyboardButton(f"▶️ Play: {yt_query.title()}", url=yt_url)]])
+            await send_tg_msg(user_id, f"🎶 **Suggestion:** {yt_query}", reply_markup=keyboard)
+
+        # Long replies stream into a progressively edited message (tags hidden until parsed below)
+        streamed = tier in STREAM_TIERS
+        yt_sent = False
+        if streamed:
+            renderer = TelegramStreamRenderer(context.bot, user_id)
+            repost = False
+            async for delta in stream_ai_response(final_prompt, tier=tier):
+                await renderer.feed(delta)
+                match = None if yt_sent else YOUTUBE_TAG_RE.search(renderer.raw)
+                if match:
+                    # The suggestion goes ABOVE the reply (as before streaming)
+                    await send_youtube_suggestion(match.group(1))
+                    yt_sent = True
+                    repost = renderer.started  # Reply already on screen: move it below
+            reply = await renderer.finish(repost=repost)
+        else:
+            reply = await generate_ai_response(final_prompt, tier=tier)
         
         # 4. Parsers (Amazon & YouTube)
         
         # YouTube Match
-        if "[YOUTUBE:" in reply:
-             import re
-             match = re.search(r'\[YOUTUBE:\s*(.*?)\]', reply)
-             if match:
-                 yt_query = match.group(1)
-                 reply = reply.replace(match.group(0), "").strip()
-                 # Generate Search Link (Always Valid)
-                 yt_url = f"https://www.youtube.com/results?search_query={urllib.parse.quote(yt_query)}"
-                 keyboard = InlineKeyboardMarkup([[InlineKeyboardButton(f"▶️ Play: {yt_query.title()}", url=yt_url)]])
-                 await send_tg_msg(user_id, f"🎶 **Suggestion:** {yt_query}", reply_markup=keyboard)
+        match = YOUTUBE_TAG_RE.search(reply)
+        if match:
+            reply = reply.replace(match.group(0), "").strip()
+            if not yt_sent:
+                await send_youtube_suggestion(match.group(1))
 
         # Amazon Match
         search_tag = None
@@ -1311,7 +1501,9 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             # Send Audio concurrently
             context.application.create_task(send_voice_reply(context, user_id, reply))
 
-        await send_tg_msg(user_id, reply)
+        if not streamed or not renderer.started:
+            # Non-streamed tier, or every streamed send failed / nothing visible was streamed
+            await send_tg_msg(user_id, reply)
         
         if search_tag:
             amazon_url = f"https://www.amazon.in/s?k={urllib.parse.quote(search_tag)}&tag=shopsy05-21"
@@ -1509,8 +1701,13 @@ async def handle_knowledge(intent: str, text: str, user_id: str, send_msg_func,
     if intent == "NEWS":
         # Get location from profile
         prof = memory_db.get_profile(user_id)
-        # Try finding explicit location in text first
-        loc = prof.get("location", "India").split("GPS")[0].strip() # rudimentary cleanup
+        loc = profile_location(prof)
+        
+        # Prefetched digest (background job) -> instant, no RSS / LLM call
+        digest = news_digests.get(loc, style, persona)
+        if digest:
+            await send_msg_func(user_id, digest)
+            return
         
         intro = "☕ Pouring the tea... wait a sec!" if style == "CASUAL" else "📰 Fetching briefing..."
         await send_msg_func(user_id, intro)
@@ -1532,7 +1729,7 @@ async def handle_knowledge(intent: str, text: str, user_id: str, send_msg_func,
              await send_msg_func(user_id, msg)
              return
              
-        response = get_weather((coords_dict["lat"], coords_dict["lon"]))
+        response = await get_weather((coords_dict["lat"], coords_dict["lon"]))
         await send_msg_func(user_id, response)
         return
 
@@ -1544,13 +1741,10 @@ async def handle_knowledge(intent: str, text: str, user_id: str, send_msg_func,
         intro = "💸 Checking the stonks..." if style=="CASUAL" else "📉 Checking market data..."
         await send_msg_func(user_id, intro)
         
-        response = get_stock_price(symbol)
+        response = await get_stock_price(symbol)
         await send_msg_func(user_id, response)
         return
 
-import PIL.Image
-import io
-
 async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Handles Photo Messages using Gemini Vision.
@@ -1558,43 +1752,50 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
     user_name = update.effective_user.first_name
     
-    # 1. Download Photo
-    photo_file = await update.message.photo[-1].get_file()
+    # 1. Download the smallest photo size that's still big enough
+    photo_size = pick_photo_size(update.message.photo)
+    photo_file = await photo_size.get_file()
     photo_bytes = await photo_file.download_as_bytearray()
     
-    # 2. Prepare Image for Gemini
-    img = PIL.Image.open(io.BytesIO(photo_bytes))
+    # 2. Prepare Image for Gemini (downscale + JPEG + perceptual hash, off the event loop)
+    try:
+        image_bytes, image_hash = await prepare_image(photo_bytes)
+    except Exception as e:
+        logger.warning(f"Vision Preprocess Failed (sending original): {e}")
+        image_bytes, image_hash = bytes(photo_bytes), None
     
     # 3. Context
     caption = update.message.caption or "Analyze this image."
+    intent = caption_intent(update.message.caption)
     profile = memory_db.get_profile(user_id)["profile"]
     nickname = profile.get("nickname", "Boss")
     
-    # 4. Prompt
-    prompt = (
-        f"You are Jarvis 2.0. User: {nickname}. "
-        f"User sent an image with caption: '{caption}'. "
-        "Analyze the image visually and respond as a helpful AI Assistant. "
-        "Short & Concise."
-    )
-    
-    # 5. Call Vision Model (Pure REST)
-    
-    # [PHASE 38] Key Manager for Vision
-    key_to_use = key_manager.get_key("vision")
-    if not key_to_use:
-         await update.message.reply_text("⚠️ Vision Error: No API Keys available.")
-         return
+    # Forwarded memes / screenshots seen before -> answer from cache
+    reply = vision_cache.get(image_hash, intent, nickname) if image_hash is not None else None
+    if reply:
+        logger.info(f"👁️ Vision Cache Hit ({image_hash}, '{intent}')")
+    else:
+        # 4. Prompt
+        prompt = (
+            f"You are Jarvis 2.0. User: {nickname}. "
+            f"User sent an image with caption: '{caption}'. "
+            "Analyze the image visually and respond as a helpful AI Assistant. "
+            "Short & Concise."
+        )
+        
+        # 5. Call Vision Model (Pure REST)
+        
+        # [PHASE 38] Key Manager for Vision
+        key_to_use = key_manager.get_key("vision")
+        if not key_to_use:
+             await update.message.reply_text("⚠️ Vision Error: No API Keys available.")
+             return
 
-    await update.message.reply_text("👀 Analyzing visual data...", parse_mode=ParseMode.MARKDOWN)
+        await update.message.reply_text("👀 Analyzing visual data...", parse_mode=ParseMode.MARKDOWN)
 
-    # Robust Model Selection Loop (REST Version)
-    # We loop models if one fails (handled inside engine? No, engine takes one model)
-    # But gemini_engine defaults to 1.5-pro. Let's try explicit loop if needed, 
-    # OR just trust 1.5-pro as per instruction.
-    # Instruction said: "Vision REST (recommended) ... Endpoint: ... gemini-1.5-pro"
-    
-    reply = await generate_gemini_vision(prompt, photo_bytes, key_to_use, model="gemini-2.5-flash")
+        reply = await generate_gemini_vision(prompt, image_bytes, key_to_use, model="gemini-2.5-flash")
+        if reply and image_hash is not None:
+            vision_cache.set(image_hash, intent, nickname, reply)
             
     if reply:
         # Update History
@@ -1616,93 +1817,46 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Handles Voice Notes (Listening).
+    Transcribes via the voice pipeline, then routes the text through handle_message
+    so voice gets the same intent routing as typed messages.
     """
     user_id = str(update.effective_user.id)
     
-    # 1. Download
+    # 1. Download (in memory)
     file = await update.message.voice.get_file()
     file_bytes = await file.download_as_bytearray()
     
-    # 2. Transcribe (Using Gemini Flash Audio Capabilities or Speech API)
-    # For now, we will send to Gemini as a file part
     # [PHASE 38] Key Manager for Audio
     key_to_use = key_manager.get_key("vision") 
-    if key_to_use:
-        genai.configure(api_key=key_to_use)
+    if not key_to_use:
+        await update.message.reply_text("⚠️ Voice Error: No API Keys available.")
+        return
     
     msg = await update.message.reply_text("👂 Listening...", parse_mode=ParseMode.MARKDOWN)
     
-    try:
-        # Save temp file logic...
-        import tempfile
-        with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as temp:
-            temp.write(file_bytes)
-            temp_path = temp.name
-
-        gemini_file = genai.upload_file(temp_path, mime_type="audio/ogg")
-        prompt = "Listen to this audio and respond naturally as Jarvis."
-
-        # Robust Model Loop
-        potential_models = ['gemini-1.5-flash-latest', 'gemini-1.5-flash', 'gemini-1.5-flash-001']
-        response = None
-        
-        for m_name in potential_models:
-            try:
-                model = genai.GenerativeModel(m_name)
-                response = await model.generate_content_async([prompt, gemini_file])
-                if response and response.text: break
-            except: continue
-            
-        if response:
-            reply = response.text
-            await msg.edit_text(reply, parse_mode=ParseMode.MARKDOWN)
-        else:
-            await msg.edit_text("⚠️ I couldn't process the audio (Models busy).")
-
-        os.remove(temp_path)
-
-    except Exception as e:
-        logger.error(f"Voice Error: {e}")
-        await msg.edit_text(f"⚠️ Audio Error: {str(e)}")
-    return # End function safely
+    # 2. Transcribe (Gemini inline audio, bounded concurrency, cached by audio hash)
+    mime_type = update.message.voice.mime_type or "audio/ogg"
+    transcript = await voice_pipeline.transcribe(file_bytes, key_to_use, mime_type=mime_type)
+    if not transcript:
+        await msg.edit_text("⚠️ I couldn't hear that clearly. Try again or type it?")
+        return
     
     try:
-        # We need to save bytes to a temp file for GenAI upload sometimes, 
-        # or pass bytes if supported. GenAI File API usually needs upload.
-        # Quick hack: Save to temp OGG
-        import tempfile
-        with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as temp:
-            temp.write(file_bytes)
-            temp_path = temp.name
-            
-        # Upload to Gemini
-        gemini_file = genai.upload_file(temp_path, mime_type="audio/ogg")
-        
-        # Prompt
-        prompt = "Listen to this audio and respond naturally as Jarvis."
-        response = model.generate_content([prompt, gemini_file])
-        reply = response.text
-        
-        await msg.edit_text(reply, parse_mode=ParseMode.MARKDOWN)
-        
-        # Cleanup
-        os.remove(temp_path)
-        
-    except Exception as e:
-        logger.error(f"Voice Error: {e}")
-        await msg.edit_text("⚠️ I couldn't hear that clearly.")
+        await msg.edit_text(f"🎙️ _{transcript}_", parse_mode=ParseMode.MARKDOWN)
+    except Exception:
+        await msg.edit_text(f"🎙️ {transcript}")
+    
+    # 3. Full intent routing
+    await handle_message(update, context, override_text=transcript)
 
 async def send_voice_reply(context, chat_id, text):
     """
     Generates and sends an Audio Note (Speaking).
+    Cached by text hash on disk + Telegram file_id, so repeated phrases cost nothing.
     """
-    from voice_engine import generate_voice_note
+    from voice_engine import tts_service
     try:
-        audio_path = generate_voice_note(text)
-        if audio_path and os.path.exists(audio_path):
-            await context.bot.send_voice(chat_id=chat_id, voice=open(audio_path, 'rb'))
-            # Cleanup
-            # os.remove(audio_path) # Maybe keep cache or clean later
+        await tts_service.send_voice(context.bot, chat_id, text)
     except Exception as e:
         logger.error(f"TTS Error: {e}")
 
@@ -1734,7 +1888,7 @@ def main():
 
     async def connect_youtube(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("🔗 Opening Google Login... Check your PC Screen.")
-        success = youtube_link.authenticate()
+        success = youtube_link.authenticate(owner_id=str(update.effective_user.id))
         if success:
             await update.message.reply_text("✅ **YouTube Linked Successfully!**\nI can now see your 'Liked Videos'.")
         else:
@@ -1742,26 +1896,43 @@ def main():
 
     async def sync_youtube(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = str(update.effective_user.id)
-        # 1. Fetch
-        videos = youtube_link.get_latest_liked_videos()
+        owner = youtube_link.owner()
+        if owner and owner != user_id:
+            # One linked Google account: its likes/mood must never land in someone else's memory
+            await update.message.reply_text("⚠️ The linked YouTube account isn't yours. Run /connect_youtube to link your own.")
+            return
+        youtube_link.restore_session()
+        # 1. Fetch (only likes since the last sync)
+        videos, cursor_update = await youtube_link.fetch_new_liked_videos(user_id, memory_db)
         if not videos:
             await update.message.reply_text("⚠️ No new liked videos found (or not connected).")
             return
             
-        # 2. Analyze
-        comment = await youtube_link.analyze_and_sync_mood(videos, user_id, generate_ai_response, memory_db)
+        # 2. Analyze + batch write
+        comment = await youtube_link.analyze_and_sync_mood(videos, user_id, generate_ai_response, memory_db, cursor_update=cursor_update)
         
         # 3. Report
         msg = f"🎧 **YouTube Sync Report**\nFound {len(videos)} new tracks.\n\nAI Insight: {comment}"
         await update.message.reply_text(msg)
 
+    async def youtube_sync_job(context: ContextTypes.DEFAULT_TYPE):
+        """Scheduled Job: incremental sync for the owner of the linked account (mostly 304s)."""
+        owner = youtube_link.owner()
+        if not owner or owner not in memory_db.get_synced_users("youtube"):
+            return  # Unknown owner (linked before owners were recorded): /connect_youtube again
+        if not youtube_link.restore_session():
+            return
+        try:
+            videos, cursor_update = await youtube_link.fetch_new_liked_videos(owner, memory_db)
+            if videos:
+                await youtube_link.analyze_and_sync_mood(videos, owner, background_ai_response, memory_db, cursor_update=cursor_update)
+        except Exception as e:
+            logger.error(f"YouTube Sync Job Fail ({owner}): {e}")
+
     async def clear_memory(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = str(update.effective_user.id)
-        # Reset Context
-        user_data = memory_db.get_profile(user_id)
-        if "profile" in user_data and "context" in user_data["profile"]:
-            user_data["profile"]["context"]["media_history"] = []
-            memory_db.save_memory(user_id, user_data)
+        # Reset Media Timeline (+ YouTube sync cursor, else /sync_youtube stops at the old head)
+        memory_db.clear_media(user_id)
         await update.message.reply_text("🧹 **Memory Wiped.**\nOld songs forgotten. Run /sync_youtube to re-learn.")
 
     # Initialize Application
@@ -1783,6 +1954,11 @@ def main():
     # Start Scheduler (Using PTB's built-in JobQueue)
     application.job_queue.run_repeating(check_events, interval=60, first=10) 
     logger.info("🕒 Scheduler Active (Every 1 min).")
+    application.job_queue.run_repeating(news_digest_job, interval=NEWS_PREFETCH_INTERVAL, first=30)
+    application.job_queue.run_repeating(summary_job, interval=300, first=60)
+    application.job_queue.run_repeating(embedding_job, interval=120, first=90)
+    application.job_queue.run_repeating(youtube_sync_job, interval=int(os.getenv("YOUTUBE_SYNC_INTERVAL", "3600")), first=120)
+    application.job_queue.run_repeating(compaction_job, interval=86400, first=600)
     
     
     
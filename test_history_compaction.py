@@ -0,0 +1,82 @@
+import os
+import sys
+import sqlite3
+import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Regression tests for DatabaseAdapter.compact_history (run: python -m pytest test_history_compaction.py)
+
+OLD = (datetime.datetime.now() - datetime.timedelta(days=60)).isoformat()
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # brain.db is relative: keep it out of the repo
+    from database_adapter import DatabaseAdapter
+    return DatabaseAdapter()
+
+def _insert(rows):
+    conn = sqlite3.connect("brain.db")
+    ids = []
+    for user_id, content, embedding in rows:
+        cur = conn.execute(
+            "INSERT INTO history (user_id, role, content, timestamp, embedding) VALUES (?, 'user', ?, ?, ?)",
+            (user_id, content, OLD, embedding))
+        ids.append(cur.lastrowid)
+    conn.commit()
+    conn.close()
+    return ids
+
+
+def test_unsummarised_user_is_not_archived(db):
+    _insert([("nosum", f"old turn {i}", b"") for i in range(5)])
+    assert db.compact_history(hot_days=30) == 0
+    assert len(db.get_history("nosum", 10)) == 5
+
+def test_only_rows_up_to_summary_cursor_are_archived(db):
+    ids = _insert([("u", f"old turn {i}", b"") for i in range(5)])
+    db.save_summary("u", "summary", ids[2])
+    assert db.compact_history(hot_days=30) == 3
+    assert [h["content"] for h in db.get_history("u", 10)] == ["old turn 3", "old turn 4"]
+
+def test_archived_rows_keep_their_embeddings(db):
+    blob = bytes(range(16))
+    ids = _insert([("u", "I adopted a cat called Miso", blob), ("u", "ok", b""), ("u", "not embedded yet", None)])
+    db.save_summary("u", "summary", ids[-1])
+    assert db.compact_history(hot_days=30) == 2  # The unembedded row waits for the embedding job
+    assert db.get_archived_embeddings("u") == [(ids[0], "user", "I adopted a cat called Miso", blob)]
+
+def test_compaction_never_runs_full_vacuum_on_legacy_db(db):
+    conn = sqlite3.connect("brain.db")
+    conn.execute("PRAGMA auto_vacuum = NONE")
+    conn.execute("VACUUM")
+    conn.commit()
+    conn.close()
+    statements = []
+    real_connect = sqlite3.connect
+
+    def tracing_connect(*args, **kwargs):
+        conn = real_connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    ids = _insert([("u", "old turn", b"")])
+    db.save_summary("u", "summary", ids[0])
+    sqlite3.connect = tracing_connect
+    try:
+        assert db.compact_history(hot_days=30) == 1
+    finally:
+        sqlite3.connect = real_connect
+    assert not [s for s in statements if s.strip().upper() == "VACUUM"]
+
+def test_new_db_uses_incremental_vacuum(db):
+    conn = sqlite3.connect("brain.db")
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
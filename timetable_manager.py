@@ -1,108 +1,247 @@
 
 import json
 import os
+import bisect
 import logging
 from datetime import datetime, timedelta
 import dateparser
 
+from database_adapter import db
+
 logger = logging.getLogger(__name__)
-TIMETABLE_FILE = "timetable.json"
+TIMETABLE_FILE = "timetable.json"  # Legacy global schedule (imported once into brain.db)
+
+# ==========================================
+# TIMETABLE INDEX (per user, per week)
+# ==========================================
+# Every event is an interval in minutes since Monday 00:00 ("minute of week"), stored
+# as-is (overlapping events stay separate, so each keeps its own nudge and can be
+# removed on its own). Two sorted views per user:
+#   events -> by start time: get_upcoming_event / get_day_events are one bisect
+#   busy   -> the same intervals merged: is_busy is one bisect even with overlaps
+# A Sunday-night event ending after midnight adds a second busy segment at minute 0.
+# Rows live in brain.db (timetable table); every change touches only its own row.
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DAY_MINUTES = 24 * 60
+WEEK_MINUTES = 7 * DAY_MINUTES
+SHARED = "*"  # Legacy timetable.json entries: used for users who have no timetable of their own
+
+def to_minutes(hhmm):
+    h, m = map(int, hhmm.strip().split(":"))
+    if not (0 <= h and 0 <= m < 60 and h * 60 + m <= DAY_MINUTES):
+        raise ValueError(f"bad time {hhmm!r}")
+    return h * 60 + m
+
+def minute_of_week(dt):
+    return dt.weekday() * DAY_MINUTES + dt.hour * 60 + dt.minute
+
+def _hhmm(minute):
+    minute %= DAY_MINUTES
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+def _segments(event):
+    """Busy segments of one event inside the week (wrap-around part starts at minute 0)."""
+    start, end = event[0], event[1]
+    if end <= WEEK_MINUTES:
+        return [(start, end)]
+    return [(start, WEEK_MINUTES), (0, end - WEEK_MINUTES)]
+
+
+class UserTimetable:
+    """(start, end, label, row_id) events sorted by start + merged busy blocks."""
+    def __init__(self):
+        self.starts = []
+        self.events = []
+        self.busy_starts = []
+        self.busy = []  # Merged, non-overlapping (start, end)
+        self.wraps = []  # Sunday-night events ending after Monday 00:00
+
+    def insert(self, event):
+        i = bisect.bisect_right(self.starts, event[0])
+        self.starts.insert(i, event[0])
+        self.events.insert(i, event)
+        self._rebuild_busy()
+
+    def remove(self, event):
+        i = self.events.index(event)
+        del self.starts[i]
+        del self.events[i]
+        self._rebuild_busy()
+
+    def _rebuild_busy(self):
+        merged = []
+        for start, end in sorted(seg for ev in self.events for seg in _segments(ev)):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        self.busy = merged
+        self.busy_starts = [b[0] for b in merged]
+        self.wraps = [ev for ev in self.events if ev[1] > WEEK_MINUTES]
+
+    def at(self, minute):
+        """Labels of the events running at `minute` ([] if free)."""
+        i = bisect.bisect_right(self.busy_starts, minute) - 1
+        if i < 0 or self.busy[i][1] <= minute:
+            return []
+        # Only events starting inside this busy block can cover `minute`
+        lo = bisect.bisect_left(self.starts, self.busy[i][0])
+        hi = bisect.bisect_right(self.starts, minute)
+        labels = [ev[2] for ev in self.events[lo:hi] if ev[1] > minute]
+        if self.busy[i][0] == 0:  # Sunday-night events spilling into Monday
+            labels += [ev[2] for ev in self.wraps if ev[1] - WEEK_MINUTES > minute]
+        return labels
+
+    def next_after(self, minute):
+        """First event starting strictly after `minute` (wraps into next week)."""
+        i = bisect.bisect_right(self.starts, minute)
+        if i < len(self.events):
+            return self.events[i], 0
+        return (self.events[0], WEEK_MINUTES) if self.events else (None, 0)
+
+    def between(self, start, end):
+        i = bisect.bisect_left(self.starts, start)
+        j = bisect.bisect_left(self.starts, end)
+        return self.events[i:j]
+
+
+def _parse_span(day, start, end):
+    """(start, end) minute of week, or None if unparseable. Past-midnight ends roll over."""
+    try:
+        day_start = DAYS.index(day.strip().title()) * DAY_MINUTES
+        s, e = to_minutes(start), to_minutes(end)
+    except (ValueError, AttributeError):
+        return None
+    if e <= s:
+        e += DAY_MINUTES  # Runs past midnight (Sunday: into next Monday)
+    return day_start + s, day_start + e
+
+def _as_event(event):
+    start, end, label, _ = event
+    return {"start": _hhmm(start), "end": _hhmm(end), "label": label}
+
 
 class TimetableManager:
     def __init__(self):
-        self.schedule = self._load()
+        self.users = {}  # user_id -> UserTimetable
+        self._load()
 
     def _load(self):
-        if os.path.exists(TIMETABLE_FILE):
-            try:
-                with open(TIMETABLE_FILE, "r") as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
-
-    def _save(self):
-        with open(TIMETABLE_FILE, "w") as f:
-            json.dump(self.schedule, f, indent=2)
-
-    def is_busy(self, current_dt):
+        for row_id, user_id, start, end, label in db.get_timetable():
+            self.users.setdefault(user_id, UserTimetable()).insert((start, end, label, row_id))
+        self._migrate_file()
+
+    def _migrate_file(self):
+        if not os.path.exists(TIMETABLE_FILE):
+            return
+        try:
+            with open(TIMETABLE_FILE, "r") as f:
+                legacy = json.load(f)
+            owner = os.getenv("TIMETABLE_OWNER_ID", SHARED)
+            failed = 0
+            for day, events in (legacy or {}).items():
+                for e in events:
+                    start, end = e.get("start", ""), e.get("end", "")
+                    if not _parse_span(day, start, end):
+                        # e.g. "UNKNOWN" times: never usable, nothing to retry
+                        logger.warning(f"📅 timetable.json: dropped {day} {start}-{end} ({e.get('label')})")
+                        continue
+                    if not self.add_event(owner, day, start, end, e.get("label", "Busy")):
+                        failed += 1
+            if failed:
+                # Keep the file so nothing is lost; already-imported events are skipped next time
+                logger.warning(f"📅 timetable.json: {failed} events could not be imported, file kept.")
+                return
+            os.replace(TIMETABLE_FILE, TIMETABLE_FILE + ".migrated")
+            logger.info(f"📅 Migrated timetable.json into brain.db (owner: {owner}).")
+        except Exception as e:
+            logger.error(f"Timetable Migration Error: {e}")
+
+    def _table(self, user_id):
+        """The user's own timetable, else the shared legacy one."""
+        table = self.users.get(str(user_id))
+        if table and table.events:
+            return table
+        return self.users.get(SHARED)
+
+    def is_busy(self, user_id, current_dt):
         """
         Checks if user is currently in a scheduled block (Class/Meeting).
         """
-        day_name = current_dt.strftime("%A") # Monday, Tuesday...
-        if day_name not in self.schedule:
-            return False, None
-
-        current_time_str = current_dt.strftime("%H:%M")
-        
-        for event in self.schedule[day_name]:
-            start = event.get("start")
-            end = event.get("end")
-            label = event.get("label", "Busy")
-            
-            # Simple String Comparison for Time (HH:MM is comparable directly)
-            if start <= current_time_str < end:
-                return True, label
-                
+        table = self._table(user_id)
+        labels = table.at(minute_of_week(current_dt)) if table else []
+        if labels:
+            return True, " / ".join(labels)
         return False, None
 
-    def add_event(self, day, start, end, label):
+    def add_event(self, user_id, day, start, end, label):
         """
-        Adds an event to the schedule. 
+        Adds an event to the user's schedule (overlapping events are kept separately).
         day: "Monday"
         start: "09:00"
         end: "11:00"
+        Returns False if it couldn't be parsed or saved.
         """
-        day = day.title()
-        if day not in self.schedule:
-            self.schedule[day] = []
-            
-        # Remove overlaps (simple logic: just append for now)
-        self.schedule[day].append({
-            "start": start,
-            "end": end,
-            "label": label
-        })
-        self._save()
-        logger.info(f"📅 Added Schedule: {day} {start}-{end} ({label})")
-
-    def get_context(self, current_dt):
-        busy, label = self.is_busy(current_dt)
+        user_id = str(user_id)
+        span = _parse_span(day, start, end)
+        if not span:
+            logger.warning(f"📅 Skipped Schedule (unparseable): {day} {start}-{end} ({label})")
+            return False
+        s, e = span
+
+        table = self.users.setdefault(user_id, UserTimetable())
+        if any(ev[:3] == (s, e, label) for ev in table.between(s, s + 1)):
+            return True  # Already known (the learner re-reports the same lecture)
+
+        row_id = db.add_timetable_interval(user_id, s, e, label)
+        if row_id is None:
+            return False
+        table.insert((s, e, label, row_id))
+        logger.info(f"📅 Added Schedule for {user_id}: {day} {start}-{end} ({label})")
+        return True
+
+    def get_context(self, user_id, current_dt):
+        busy, label = self.is_busy(user_id, current_dt)
         if busy:
             return f"BUSY ({label})"
         return "FREE"
 
-    def get_day_events(self, day_name):
-        return self.schedule.get(day_name, [])
+    def get_day_events(self, user_id, day_name):
+        table = self._table(user_id)
+        if not table or day_name not in DAYS:
+            return []
+        day_start = DAYS.index(day_name) * DAY_MINUTES
+        return [_as_event(iv) for iv in table.between(day_start, day_start + DAY_MINUTES)]
 
-    def get_upcoming_event(self, current_dt, buffer_minutes=15):
+    def get_upcoming_event(self, user_id, current_dt, buffer_minutes=15):
         """
         Returns an event that starts within buffer_minutes.
         Used for proactive reminders.
         """
-        day_name = current_dt.strftime("%A")
-        if day_name not in self.schedule: return None
-
-        now_str = current_dt.strftime("%H:%M")
-        future_dt = current_dt + timedelta(minutes=buffer_minutes)
-        future_str = future_dt.strftime("%H:%M")
-
-        for event in self.schedule[day_name]:
-            # If event starts between NOW and NOW+BUFFER
-            # AND we haven't already notified (Need state tracking in main, or simplified here)
-            # For simplicity, we just return it, main loop handles "once per event" logic
-            if now_str < event["start"] <= future_str:
-                return event
+        table = self._table(user_id)
+        if not table:
+            return None
+        now = minute_of_week(current_dt)
+        # Main loop handles "once per event" logic
+        nxt, wrap = table.next_after(now)
+        if nxt and nxt[0] + wrap <= now + buffer_minutes:
+            return _as_event(nxt)
         return None
 
-    def remove_event(self, day, label_keyword):
+    def remove_event(self, user_id, day, label_keyword):
+        table = self.users.get(str(user_id))
         day = day.title()
-        if day in self.schedule:
-            original_len = len(self.schedule[day])
-            self.schedule[day] = [e for e in self.schedule[day] if label_keyword.lower() not in e["label"].lower()]
-            if len(self.schedule[day]) < original_len:
-                self._save()
-                return True
-        return False
+        if not table or day not in DAYS:
+            return False
+        day_start = DAYS.index(day) * DAY_MINUTES
+        doomed = [ev for ev in table.between(day_start, day_start + DAY_MINUTES)
+                  if label_keyword.lower() in ev[2].lower()]
+        if not doomed:
+            return False
+        db.delete_timetable_intervals([ev[3] for ev in doomed])
+        for ev in doomed:
+            table.remove(ev)
+        return True
 
 timetable_manager = TimetableManager()
@@ -12,7 +12,7 @@ async def check_proactive_triggers(user_id, send_msg_func):
     Expected to run every minute via Scheduler.
     """
     try:
-        routines = routine_db.get_routines()
+        routines = routine_db.get_patterns()
         if not routines:
             return
 
@@ -0,0 +1,98 @@
+import io
+import os
+import re
+import time
+import hashlib
+import asyncio
+import logging
+from collections import OrderedDict
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# VISION PREPROCESSING
+# ==========================================
+# Gemini tiles images at ~768px anyway: anything bigger is wasted upload + latency.
+VISION_MAX_DIM = int(os.getenv("VISION_MAX_DIM", "768"))
+VISION_JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", "85"))
+
+def pick_photo_size(photo_sizes, target=VISION_MAX_DIM):
+    """Smallest Telegram PhotoSize whose long edge still covers `target` (else the largest)."""
+    for size in sorted(photo_sizes, key=lambda p: p.width * p.height):
+        if max(size.width, size.height) >= target:
+            return size
+    return photo_sizes[-1]
+
+def _dhash(img, size=8):
+    """64-bit difference hash: survives re-compression and small resizes."""
+    small = img.convert("L").resize((size + 1, size), Image.LANCZOS)
+    px = list(small.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = px[row * (size + 1) + col]
+            right = px[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+def _prepare_blocking(raw_bytes, max_dim):
+    img = Image.open(io.BytesIO(raw_bytes))
+    img = ImageOps.exif_transpose(img)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    img.thumbnail((max_dim, max_dim), Image.LANCZOS)  # Only ever shrinks
+
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=VISION_JPEG_QUALITY, optimize=True)
+    jpeg = out.getvalue()
+    # dHash alone collides on look-alike images (same layout, different text): pin it to the bytes
+    return jpeg, f"{_dhash(img):016x}-{hashlib.sha256(jpeg).hexdigest()[:16]}"
+
+async def prepare_image(raw_bytes, max_dim=VISION_MAX_DIM):
+    """Downscale + re-encode to JPEG and hash, in the thread pool. Returns (jpeg_bytes, image_key)."""
+    return await asyncio.get_running_loop().run_in_executor(None, _prepare_blocking, bytes(raw_bytes), max_dim)
+
+# ==========================================
+# VISION RESULT CACHE
+# ==========================================
+_GENERIC_CAPTIONS = {"", "analyze this image", "what is this", "whats this", "what is it", "explain", "describe"}
+
+def caption_intent(caption):
+    """Normalises the caption so 'What's this??' and no caption hit the same entry."""
+    text = re.sub(r"[^a-z0-9 ]+", "", (caption or "").lower())
+    text = " ".join(text.split())
+    return "describe" if text in _GENERIC_CAPTIONS else text
+
+class VisionResultCache:
+    """
+    (image key, caption intent, nickname) -> reply. Exact-key lookups only (O(1)): a
+    near-duplicate dHash can be a different screenshot, and a wrong answer costs more than a
+    Gemini call. The nickname is part of the key because the prompt addresses the user.
+    """
+    def __init__(self, ttl=86400, max_items=500):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._data = OrderedDict()  # (image_key, intent, nickname) -> (stored_at, reply)
+
+    def get(self, image_key, intent, nickname):
+        key = (image_key, intent, nickname)
+        if key not in self._data:
+            return None
+        now = time.time()
+        stored_at, reply = self._data[key]
+        if now - stored_at > self.ttl:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return reply
+
+    def set(self, image_key, intent, nickname, reply):
+        key = (image_key, intent, nickname)
+        self._data[key] = (time.time(), reply)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_items:
+            self._data.popitem(last=False)
+
+vision_cache = VisionResultCache()
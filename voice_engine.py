@@ -1,7 +1,9 @@
 import logging
 import os
 import asyncio
-from datetime import datetime
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -13,31 +15,123 @@ except ImportError:
     HAS_TTS = False
     logger.warning("⚠️ gTTS not installed. Voice features disabled.")
 
+# ==========================================
+# TTS SERVICE (content-addressed disk cache)
+# ==========================================
+VOICE_DIR = "static/voice_notes"
+VOICE_CACHE_MAX_MB = float(os.getenv("VOICE_CACHE_MAX_MB", "50"))
+VOICE_TTS_WORKERS = int(os.getenv("VOICE_TTS_WORKERS", "2"))
+
+# gTTS is blocking network I/O: give it its own small pool so it can't starve the default executor
+_TTS_POOL = ThreadPoolExecutor(max_workers=VOICE_TTS_WORKERS, thread_name_prefix="tts")
+
+
+def voice_key(text, lang="en", slow=False):
+    """Same text + lang (+ speed) -> same file. No more same-second filename collisions."""
+    return hashlib.sha1(f"{lang}|{int(slow)}|{text.strip()}".encode("utf-8")).hexdigest()[:20]
+
+def _save_gtts(text, lang, slow, filepath):
+    tts = gTTS(text=text, lang=lang, slow=slow)
+    tmp_path = filepath + ".part"
+    tts.save(tmp_path)
+    os.replace(tmp_path, filepath)  # Never expose a half-written MP3
+
+def _enforce_cap(output_dir, max_bytes):
+    """LRU by mtime (cache hits touch their file). Deletes the oldest until under the cap."""
+    entries = []
+    total = 0
+    for entry in os.scandir(output_dir):
+        if entry.is_file() and entry.name.endswith(".mp3"):
+            st = entry.stat()
+            entries.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+    if total <= max_bytes:
+        return 0
+    removed = 0
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+        if total <= max_bytes:
+            break
+    return removed
+
+
+class TTSService:
+    def __init__(self, output_dir=VOICE_DIR, max_mb=VOICE_CACHE_MAX_MB, max_file_ids=2000):
+        self.output_dir = output_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_file_ids = max_file_ids
+        self.file_ids = OrderedDict()  # voice_key -> Telegram file_id (LRU; repeat phrases skip the upload)
+        self._inflight = {}  # voice_key -> asyncio.Future (same phrase synthesised once)
+
+    def path_for(self, key):
+        return os.path.join(self.output_dir, f"voice_{key}.mp3")
+
+    async def synthesize(self, text, lang="en", slow=False):
+        """Returns path to the MP3 for this text (cached on disk), or None."""
+        if not HAS_TTS or not text:
+            return None
+        key = voice_key(text, lang, slow)
+        filepath = self.path_for(key)
+
+        if os.path.exists(filepath):
+            os.utime(filepath)  # LRU touch
+            return filepath
+
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(self._render(text, lang, slow, filepath))
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(fut)
+
+    async def _render(self, text, lang, slow, filepath):
+        loop = asyncio.get_running_loop()
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            await loop.run_in_executor(_TTS_POOL, _save_gtts, text, lang, slow, filepath)
+        except Exception as e:
+            logger.error(f"Voice Gen Failed: {e}")
+            return None
+        removed = await loop.run_in_executor(_TTS_POOL, _enforce_cap, self.output_dir, self.max_bytes)
+        if removed:
+            logger.info(f"🗑️ Voice Cache: evicted {removed} old notes")
+        return filepath
+
+    async def send_voice(self, bot, chat_id, text, lang="en"):
+        """Sends `text` as a voice note. Reuses Telegram's file_id for phrases sent before."""
+        key = voice_key(text, lang)
+        file_id = self.file_ids.get(key)
+        if file_id:
+            self.file_ids.move_to_end(key)
+            try:
+                return await bot.send_voice(chat_id=chat_id, voice=file_id)
+            except Exception as e:
+                logger.warning(f"Voice file_id expired, re-uploading: {e}")
+                self.file_ids.pop(key, None)
+
+        filepath = await self.synthesize(text, lang)
+        if not filepath:
+            return None
+        with open(filepath, "rb") as f:
+            msg = await bot.send_voice(chat_id=chat_id, voice=f)
+        media = getattr(msg, "voice", None) or getattr(msg, "audio", None)
+        if media:
+            self.file_ids[key] = media.file_id
+            self.file_ids.move_to_end(key)
+            while len(self.file_ids) > self.max_file_ids:
+                self.file_ids.popitem(last=False)
+        return msg
+
+tts_service = TTSService()
+
 async def generate_audio_note(text, lang='en', slow=False):
     """
     Generates an MP3 audio note from text.
-    Returns: (path_to_file, duration_seconds) or None
+    Returns: path_to_file or None
     """
-    if not HAS_TTS:
-        return None
-        
-    try:
-        # Create 'voice_notes' dir if needed
-        output_dir = "static/voice_notes"
-        os.makedirs(output_dir, exist_ok=True)
-        
-        filename = f"voice_{int(datetime.now().timestamp())}.mp3"
-        filepath = os.path.join(output_dir, filename)
-        
-        # Sync run in executor to avoid blocking
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, _save_gtts, text, lang, slow, filepath)
-        
-        return filepath
-    except Exception as e:
-        logger.error(f"Voice Gen Failed: {e}")
-        return None
-
-def _save_gtts(text, lang, slow, filepath):
-    tts = gTTS(text=text, lang=lang, slow=slow)
-    tts.save(filepath)
+    return await tts_service.synthesize(text, lang, slow)
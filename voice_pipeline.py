@@ -0,0 +1,51 @@
+import os
+import asyncio
+import hashlib
+import logging
+
+from gemini_engine import generate_gemini_audio
+from network_utils import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# VOICE TRANSCRIPTION PIPELINE
+# ==========================================
+# Voice note -> transcript (Gemini inline audio, no temp files), then the transcript is
+# routed through handle_message like typed text. Concurrency is bounded so a burst of
+# voice notes queues up instead of hammering the API (and the keys) all at once.
+
+VOICE_MAX_CONCURRENCY = int(os.getenv("VOICE_MAX_CONCURRENCY", "3"))
+VOICE_MODELS = ["gemini-2.5-flash", "gemini-2.0-flash", "gemini-1.5-flash"]
+
+TRANSCRIBE_PROMPT = (
+    "Transcribe this voice note exactly as spoken. "
+    "If it mixes Hindi and English, write it in Hinglish (Latin script). "
+    "Output ONLY the transcript, no commentary."
+)
+
+class VoicePipeline:
+    def __init__(self, max_concurrency=VOICE_MAX_CONCURRENCY, models=VOICE_MODELS):
+        self.models = models
+        self._slots = asyncio.Semaphore(max_concurrency)  # FIFO waiters = the queue
+        # sha1(audio) -> transcript; forwarded voice notes & retries are free
+        self.cache = TTLCache(ttl=86400, max_items=500)
+
+    async def _transcribe(self, audio_bytes, key, mime_type):
+        async with self._slots:
+            for model in self.models:
+                text, status = await generate_gemini_audio(TRANSCRIBE_PROMPT, audio_bytes, key, model=model, mime_type=mime_type)
+                if text:
+                    return text
+                # 404 (model gone) / 429 / 5xx / network -> next model; 400 = bad audio, stop
+                if status == 400:
+                    break
+            return None
+
+    async def transcribe(self, audio_bytes, key, mime_type="audio/ogg"):
+        """Returns the transcript (or None). Identical audio is transcribed once."""
+        audio_bytes = bytes(audio_bytes)
+        digest = hashlib.sha1(audio_bytes).hexdigest()
+        return await self.cache.get_or_fetch(digest, lambda: self._transcribe(audio_bytes, key, mime_type))
+
+voice_pipeline = VoicePipeline()
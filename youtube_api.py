@@ -1,10 +1,12 @@
 import os
 import pickle
+import asyncio
 import logging
 import datetime
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
 logger = logging.getLogger(__name__)
 
@@ -12,17 +14,24 @@ logger = logging.getLogger(__name__)
 SCOPES = ['https://www.googleapis.com/auth/youtube.readonly']
 CLIENT_SECRET_FILE = 'client_secret.json'
 TOKEN_FILE = 'token.pickle'
+TOKEN_OWNER_FILE = 'token_owner.txt'  # Telegram user id whose Google account token.pickle is
+
+SYNC_SOURCE = "youtube"
+PAGE_SIZE = 50  # API max per page
+YOUTUBE_SYNC_MAX_PAGES = int(os.getenv("YOUTUBE_SYNC_MAX_PAGES", "4"))      # Incremental sync
+YOUTUBE_INITIAL_SYNC_PAGES = int(os.getenv("YOUTUBE_INITIAL_SYNC_PAGES", "1"))  # First sync: no backfill storm
 
 class YouTubeNeuralLink:
     def __init__(self):
         self.service = None
         self.creds = None
     
-    def authenticate(self):
+    def authenticate(self, owner_id=None):
         """
         Handles OAuth 2.0 Flow. 
         If token.pickle exists, loads it.
         Else, opens browser for User Login.
+        owner_id: the Telegram user linking it (the only user whose timeline it may feed).
         """
         self.creds = None
         # 1. Load existing token
@@ -56,47 +65,129 @@ class YouTubeNeuralLink:
         # 3. Build Service
         try:
             self.service = build('youtube', 'v3', credentials=self.creds)
+            if owner_id is not None:
+                with open(TOKEN_OWNER_FILE, 'w', encoding='utf-8') as f:
+                    f.write(str(owner_id))
             logger.info("🔗 YouTube Neural Link Connected.")
             return True
         except Exception as e:
             logger.error(f"YouTube Service Build Error: {e}")
             return False
 
-    def get_latest_liked_videos(self, max_results=5):
-        """Fetches the most recent liked videos."""
-        if not self.service: return []
-        
+    def restore_session(self):
+        """
+        Non-interactive connect for background jobs: uses token.pickle only, never opens a browser.
+        """
+        if self.service: return True
+        if not os.path.exists(TOKEN_FILE): return False
         try:
+            with open(TOKEN_FILE, 'rb') as token:
+                self.creds = pickle.load(token)
+            if not self.creds.valid and self.creds.expired and self.creds.refresh_token:
+                self.creds.refresh(Request())
+            if not self.creds.valid:
+                return False
+            self.service = build('youtube', 'v3', credentials=self.creds)
+            return True
+        except Exception as e:
+            logger.warning(f"YouTube Session Restore Failed: {e}")
+            return False
+
+    @staticmethod
+    def owner():
+        """Telegram user id the stored credential belongs to (None if never recorded)."""
+        try:
+            with open(TOKEN_OWNER_FILE, 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    @staticmethod
+    def _to_video(item):
+        snippet = item["snippet"]
+        return {
+            "source": SYNC_SOURCE,
+            "item_id": item["id"],  # playlistItem id (sync cursor)
+            "title": snippet.get("title", "Unknown"),
+            "channel": snippet.get("videoOwnerChannelTitle", "Unknown"),  # Missing for deleted videos
+            "url": f"https://www.youtube.com/watch?v={item['contentDetails']['videoId']}",
+            "liked_at": snippet.get("publishedAt")  # When it was liked (approx)
+        }
+
+    def _fetch_since(self, cursor):
+        """
+        Blocking: pages the Liked list (newest first) until the last seen item.
+        Page 1 is sent with If-None-Match so an unchanged list costs one 304.
+        Returns (new_videos, head) where head = (last_item_id, etag) for the cursor, or None if unchanged.
+        """
+        last_id = (cursor or {}).get("last_item_id")
+        etag = (cursor or {}).get("etag")
+        max_pages = YOUTUBE_SYNC_MAX_PAGES if last_id else YOUTUBE_INITIAL_SYNC_PAGES
+
+        videos = []
+        head = None
+        page_token = None
+        for page in range(max_pages):
             # 'LL' is the special ID for "Liked List" of the authenticated user
             request = self.service.playlistItems().list(
                 part="snippet,contentDetails",
                 playlistId="LL",
-                maxResults=max_results
+                maxResults=PAGE_SIZE,
+                pageToken=page_token
             )
-            response = request.execute()
-            
-            videos = []
-            for item in response.get("items", []):
-                snippet = item["snippet"]
-                videos.append({
-                    "title": snippet["title"],
-                    "channel": snippet["videoOwnerChannelTitle"],
-                    "url": f"https://www.youtube.com/watch?v={item['contentDetails']['videoId']}",
-                    "published_at": snippet["publishedAt"] # When it was liked (approx)
-                })
-            return videos
+            if page == 0 and etag:
+                request.headers["If-None-Match"] = etag
+            try:
+                response = request.execute()
+            except HttpError as e:
+                if e.resp.status == 304:
+                    return [], None  # Nothing new
+                raise
+
+            items = response.get("items", [])
+            if page == 0:
+                head = (items[0]["id"] if items else last_id, response.get("etag"))
+
+            for item in items:
+                if item["id"] == last_id:
+                    return videos, head
+                videos.append(self._to_video(item))
+
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+        return videos, head
+
+    async def fetch_new_liked_videos(self, user_id, memory_db):
+        """
+        Incremental sync: only likes newer than the stored cursor (blocking client runs in a thread).
+        Returns (videos, cursor_update). Pass cursor_update to analyze_and_sync_mood so rows and
+        cursor are committed together.
+        """
+        if not self.service: return [], None
+        
+        try:
+            cursor = memory_db.get_sync_cursor(user_id, SYNC_SOURCE)
+            videos, head = await asyncio.to_thread(self._fetch_since, cursor)
         except Exception as e:
             logger.error(f"YouTube Fetch Error: {e}")
-            return []
+            return [], None
 
-    async def analyze_and_sync_mood(self, videos, user_id, ai_generator, memory_db):
+        cursor_update = (SYNC_SOURCE, *head) if head else None
+        if cursor_update and not videos:
+            # List changed (e.g. an un-like) but nothing new: just move the cursor
+            memory_db.set_sync_cursor(user_id, *cursor_update)
+            cursor_update = None
+        return videos, cursor_update
+
+    async def analyze_and_sync_mood(self, videos, user_id, ai_generator, memory_db, cursor_update=None):
         """
-        Uses AI to infer mood from video list and syncs to DB.
+        Uses AI to infer mood from video list and syncs to DB (one batch write).
         """
         if not videos: return
 
-        # Prepare Data for AI
-        video_titles = [f"- {v['title']} (by {v['channel']})" for v in videos]
+        # Prepare Data for AI (newest 25 is plenty for a mood read)
+        video_titles = [f"- {v['title']} (by {v['channel']})" for v in videos[:25]]
         video_str = "\n".join(video_titles)
         
         # AI Prompt
@@ -112,23 +203,24 @@ class YouTubeNeuralLink:
             "Example: 'Nostalgic|Missing someone? These songs hit deep.'"
         )
         
-        response = await ai_generator(prompt, tier="speed")
+        response = await ai_generator(prompt, tier="speed") or ""
         if "|" in response:
             mood, comment = response.split("|", 1)
-        else:
+        elif response:
             mood, comment = "Neutral", response
+        else:
+            mood, comment = "", ""  # No AI answer: store the likes, leave the user's mood alone
             
         mood = mood.strip()
         comment = comment.strip()
         
-        # Update Memory
-        # log_media handles the list, but we also want to set the MAIN mood
-        for v in videos:
-             memory_db.log_media(user_id, v['url'], v['title'], mood=mood)
+        # Update Memory: all rows + sync cursor in ONE transaction
+        memory_db.log_media_batch(user_id, videos, mood=mood or None, cursor_update=cursor_update)
              
-        # Update current mood in mood_manager (handled via behavior logs usually, but let's force a log)
-        # We can simulate a "User Text" event that sets the mood? 
-        # Or just return the comment for the bot to say.
+        # Update current mood (what they're listening to says a lot)
+        if mood:
+            from mood_manager import mood_state
+            mood_state.set_mood(user_id, mood, source="youtube")
         
         logger.info(f"🎧 YouTube Mood: {mood} | {comment}")
         return comment